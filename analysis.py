@@ -1,17 +1,18 @@
 import logging
 import numpy as np
-import json
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler
-import pickle
-import os
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
-from sklearn.ensemble import IsolationForest
-import cv2
-import mediapipe as mp
-
-from models import TrainingLog, VideoAnalysis, UserProfile, Sport, db, Progress
+from datetime import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from providers import cv2
+import inference_config
+from models import TrainingLog, UserProfile, db
+from landmark_store import empty_landmarks, arrays_to_pose_data, LandmarkWriter
+from pose_frame import PoseFrame, landmarks_array
+from rules import get_rule_set
+import kinematics
+from pose_metrics import (as_landmark_array, badminton_metrics, posture_alignment, hip_oscillation,
+                          knee_angles, asymmetry, LEFT_SHOULDER, RIGHT_SHOULDER)
 
 # Dictionary of sport-specific feedback templates
 FEEDBACK_TEMPLATES = {
@@ -53,71 +54,51 @@ INJURY_RECOMMENDATIONS = {
     "High": "Reduce training volume immediately. Consult with a sports medicine professional. Focus on recovery and corrective exercises."
 }
 
+# Messages shown with the injury risk on the analysis page
+REPORT_RISK_MESSAGES = {
+    'Low': 'Your form looks good! Keep up the good work and maintain proper technique.',
+    'Medium': 'Some areas need attention. Focus on improving your form to reduce injury risk.',
+    'High': 'Significant risk detected. Please consult with a coach or trainer to improve your technique.'
+}
+
+# Version of the feedback and risk logic. Stored reports generated by a
+# different version are recomputed, so bump this whenever analysis output changes.
+ANALYZER_VERSION = '4'
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def analyze_badminton_pose(landmarks):
-    """Analyzes badminton-specific pose landmarks."""
-    try:
-        # Wrist angles (simplified example - needs refinement for accuracy)
-        right_wrist = np.array([landmarks[16]['x'], landmarks[16]['y']])
-        right_elbow = np.array([landmarks[14]['x'], landmarks[14]['y']])
-        right_shoulder = np.array([landmarks[12]['x'], landmarks[12]['y']])
-
-        left_wrist = np.array([landmarks[15]['x'], landmarks[15]['y']])
-        left_elbow = np.array([landmarks[13]['x'], landmarks[13]['y']])
-        left_shoulder = np.array([landmarks[11]['x'], landmarks[11]['y']])
-
-        vec1_r = right_wrist - right_elbow
-        vec2_r = right_elbow - right_shoulder
-        vec1_l = left_wrist - left_elbow
-        vec2_l = left_elbow - left_shoulder
-
-        cosine_angle_r = np.dot(vec1_r, vec2_r) / (np.linalg.norm(vec1_r) * np.linalg.norm(vec2_r))
-        cosine_angle_l = np.dot(vec1_l, vec2_l) / (np.linalg.norm(vec1_l) * np.linalg.norm(vec2_l))
-
-        right_wrist_angle = np.arccos(np.clip(cosine_angle_r, -1.0, 1.0)) * 180 / np.pi
-        left_wrist_angle = np.arccos(np.clip(cosine_angle_l, -1.0, 1.0)) * 180 / np.pi
-
-        # Knee angles (simplified example)
-        right_hip = np.array([landmarks[24]['x'], landmarks[24]['y']])
-        right_knee = np.array([landmarks[26]['x'], landmarks[26]['y']])
-        right_ankle = np.array([landmarks[28]['x'], landmarks[28]['y']])
+# Frames each shard re-processes before its range when analyzing in parallel
+SHARD_WARMUP_FRAMES = 15
 
-        left_hip = np.array([landmarks[23]['x'], landmarks[23]['y']])
-        left_knee = np.array([landmarks[25]['x'], landmarks[25]['y']])
-        left_ankle = np.array([landmarks[27]['x'], landmarks[27]['y']])
+# Shortest frame range worth handing to a separate process
+MIN_SHARD_FRAMES = 120
 
-        vec1_r = right_hip - right_knee
-        vec2_r = right_ankle - right_knee
-        vec1_l = left_hip - left_knee
-        vec2_l = left_ankle - left_knee
+# Longest frame side (pixels) fed to MediaPipe during video analysis. The
+# detector works on ~256px inputs, so larger frames only cost conversion time.
+DECODE_MAX_SIDE = 960
 
-        cosine_angle_r = np.dot(vec1_r, vec2_r) / (np.linalg.norm(vec1_r) * np.linalg.norm(vec2_r))
-        cosine_angle_l = np.dot(vec1_l, vec2_l) / (np.linalg.norm(vec1_l) * np.linalg.norm(vec2_l))
+# Mean landmark displacement between samples (normalized image units) above
+# which adaptive sampling switches to denser strides
+ADAPTIVE_MOTION_THRESHOLD = 0.01
 
-        right_knee_angle = np.arccos(np.clip(cosine_angle_r, -1.0, 1.0)) * 180 / np.pi
-        left_knee_angle = np.arccos(np.clip(cosine_angle_l, -1.0, 1.0)) * 180 / np.pi
+class AnalysisCancelled(Exception):
+    """Raised by a progress callback to abort a running video analysis."""
 
-        # Shoulder-hip rotation (simplified example)
-        right_shoulder = np.array([landmarks[12]['x'], landmarks[12]['y']])
-        right_hip = np.array([landmarks[24]['x'], landmarks[24]['y']])
-        left_shoulder = np.array([landmarks[11]['x'], landmarks[11]['y']])
-        left_hip = np.array([landmarks[23]['x'], landmarks[23]['y']])
-
-
-        shoulder_rotation = np.arctan2(right_shoulder[1] - left_shoulder[1], right_shoulder[0] - left_shoulder[0]) * 180 / np.pi
-        hip_rotation = np.arctan2(right_hip[1] - left_hip[1], right_hip[0] - left_hip[0]) * 180 / np.pi
+def analyze_badminton_pose(landmarks):
+    """Analyzes badminton-specific pose landmarks (a PoseFrame or any form PoseFrame.coerce accepts)."""
+    try:
+        metrics = badminton_metrics(PoseFrame.coerce(landmarks).batch)
 
         return {
-            'wrist_angles': {'right': right_wrist_angle, 'left': left_wrist_angle},
-            'knee_angles': {'right': right_knee_angle, 'left': left_knee_angle},
-            'shoulder_rotation': shoulder_rotation,
-            'hip_rotation': hip_rotation
+            'wrist_angles': {side: float(v[0]) for side, v in metrics['wrist_angles'].items()},
+            'knee_angles': {side: float(v[0]) for side, v in metrics['knee_angles'].items()},
+            'shoulder_rotation': float(metrics['shoulder_rotation'][0]),
+            'hip_rotation': float(metrics['hip_rotation'][0])
         }
 
-    except (KeyError, IndexError) as e:
+    except (KeyError, IndexError, ValueError, AttributeError) as e:
         logging.error(f"Error in analyze_badminton_pose: {e}")
         return {'wrist_angles': {'right': 90, 'left': 90}, 'knee_angles': {'right': 90, 'left': 90},
                 'shoulder_rotation': 0, 'hip_rotation': 0}
@@ -145,48 +126,20 @@ def analyze_movement(pose_data, sport_name):
     # Basic analysis - this would be more sophisticated in a real implementation
     try:
         # Check if we have pose data
-        if not pose_data or not pose_data.get("pose_data"):
+        if not pose_data or not (pose_data.get("pose_data") or len(pose_data.get("landmarks", ()))):
             return "Insufficient pose data for analysis", "Please upload a clearer video with full body visibility"
 
-        # Get some sample frames to analyze
-        frame_indices = list(pose_data["pose_data"].keys())
-        if not frame_indices:
+        # All frames with a full set of landmarks as one (frames, 33, 4) array
+        frame_indices, landmarks = as_landmark_array(pose_data)
+        if len(frame_indices) == 0:
             return "No valid pose data detected", "Please upload a clearer video with better lighting"
 
         # For demonstration, we'll implement some basic heuristic analysis
         # In a real system, this would be much more sophisticated
 
-        # Check posture (based on shoulder and hip alignment)
-        posture_score = 0
-        frame_count = 0
-
-        for frame_idx in frame_indices:
-            landmarks = pose_data["pose_data"][frame_idx]
-            if len(landmarks) < 33:  # MediaPipe provides 33 landmarks
-                continue
-
-            # Get shoulder landmarks
-            left_shoulder = np.array([landmarks[11]['x'], landmarks[11]['y']])
-            right_shoulder = np.array([landmarks[12]['x'], landmarks[12]['y']])
-
-            # Get hip landmarks
-            left_hip = np.array([landmarks[23]['x'], landmarks[23]['y']])
-            right_hip = np.array([landmarks[24]['x'], landmarks[24]['y']])
-
-            # Calculate shoulder line angle relative to horizontal
-            shoulder_angle = np.arctan2(right_shoulder[1] - left_shoulder[1], 
-                                       right_shoulder[0] - left_shoulder[0]) * 180 / np.pi
-
-            # Calculate hip line angle relative to horizontal
-            hip_angle = np.arctan2(right_hip[1] - left_hip[1], 
-                                  right_hip[0] - left_hip[0]) * 180 / np.pi
-
-            # Check if shoulders and hips are relatively aligned (parallel)
-            angle_diff = abs(shoulder_angle - hip_angle)
-            if angle_diff < 10:  # Good alignment
-                posture_score += 1
-
-            frame_count += 1
+        # Check posture: shoulder and hip lines roughly parallel
+        frame_count = len(frame_indices)
+        posture_score = int(np.count_nonzero(posture_alignment(landmarks, tolerance=10)))
 
         # Calculate overall posture quality
         if frame_count > 0:
@@ -201,79 +154,26 @@ def analyze_movement(pose_data, sport_name):
 
             feedback_parts.append(f"Your overall posture shows {posture_feedback}.")
 
-        # Sport-specific analysis
-        if sport_name == "Basketball":
-            feedback_parts.append(templates["general"].format(quality="reasonable technique"))
-
-            # Additional basketball-specific feedback would go here
-            # For example, analyzing jump shot form
-
-        elif sport_name == "Tennis":
-            feedback_parts.append(templates["general"].format(quality="adequate form"))
-
-            # Additional tennis-specific feedback would go here
-            # For example, analyzing serve or forehand technique
-
-        elif sport_name == "Football":
-            feedback_parts.append(templates["general"].format(quality="good technique"))
-
-            # Additional football-specific feedback would go here
-
-        elif sport_name == "Badminton":
-            for frame_idx, landmarks in pose_data["pose_data"].items():
-                metrics = analyze_badminton_pose(landmarks)
-
-                # Analyze wrist angles (critical for smash and clear shots)
-                if any(angle > 100 for angle in metrics['wrist_angles'].values()):
-                    feedback_parts.append(f"At frame {frame_idx}: Excessive wrist flexion detected. "
-                                       "Keep wrist firm during shots to prevent injury.")
-
-                # Check knee angles for proper stance
-                if any(angle < 130 for angle in metrics['knee_angles'].values()):
-                    feedback_parts.append(f"At frame {frame_idx}: Deep knee bend observed. "
-                                       "Maintain moderate knee flexion for quick movements.")
-
-                # Analyze shoulder-hip rotation (important for power generation)
-                rotation_diff = abs(metrics['shoulder_rotation'] - metrics['hip_rotation'])
-                if rotation_diff > 45:
-                    feedback_parts.append(f"At frame {frame_idx}: Excessive upper body rotation. "
-                                       "Coordinate shoulder and hip rotation for better shot control.")
-
-            # Add general form assessment
-            if len(feedback_parts) == 0:
-                feedback_parts.append(templates["general"].format(quality="good form"))
-            else:
-                feedback_parts.append("\nFocus on maintaining proper form throughout your shots.")
-
-        elif sport_name == "Running":
-            feedback_parts.append(templates["form"].format(quality="adequate technique"))
-
-            # Check vertical oscillation (less is usually better for running efficiency)
-            vertical_movements = []
-
-            for frame_idx in frame_indices:
-                landmarks = pose_data["pose_data"][frame_idx]
-                if len(landmarks) < 33:
-                    continue
-
-                # Track hip height as proxy for vertical oscillation
-                left_hip_y = landmarks[23]['y']
-                right_hip_y = landmarks[24]['y']
-                avg_hip_y = (left_hip_y + right_hip_y) / 2
-                vertical_movements.append(avg_hip_y)
-
-            if vertical_movements:
-                oscillation = np.std(vertical_movements)
-                if oscillation < 0.02:
-                    feedback_parts.append("Your vertical oscillation is minimal, which is excellent for running efficiency.")
-                elif oscillation < 0.04:
-                    feedback_parts.append("Your vertical oscillation is moderate. Try to minimize up-and-down movement for better efficiency.")
-                else:
-                    feedback_parts.append("Your vertical oscillation is high. Focus on reducing bouncing for better running economy.")
-
+        # Sport rules evaluated over every frame at once (see rules.SPORT_RULES)
+        issues = get_rule_set(sport_name).evaluate(landmarks).clip_summary(frame_indices)
+        for issue in issues:
+            feedback_parts.append(f"{issue['message'].rstrip('.')} (in {issue['frames']} of {frame_count} frames, "
+                                  f"first at frame {issue['first_frame']}).")
+        if issues:
+            feedback_parts.append("Focus on maintaining proper form throughout your movement.")
         else:
-            # Default feedback
-            feedback_parts.append(templates["general"].format(quality="reasonable form"))
+            feedback_parts.append(templates["general"].format(quality="good form"))
+
+        if sport_name == "Running":
+            # Check vertical oscillation (less is usually better for running efficiency),
+            # using hip height as a proxy
+            oscillation = hip_oscillation(landmarks)
+            if oscillation < 0.02:
+                feedback_parts.append("Your vertical oscillation is minimal, which is excellent for running efficiency.")
+            elif oscillation < 0.04:
+                feedback_parts.append("Your vertical oscillation is moderate. Try to minimize up-and-down movement for better efficiency.")
+            else:
+                feedback_parts.append("Your vertical oscillation is high. Focus on reducing bouncing for better running economy.")
 
         # Generate recommendations
         recommendations = [
@@ -388,60 +288,83 @@ def extract_pose_features(pose_data):
     # In a real system, this would be much more sophisticated
 
     try:
-        frames = pose_data.get("pose_data", {})
-        if not frames:
+        frame_indices, landmarks = as_landmark_array(pose_data)
+        if not (pose_data.get("pose_data") or len(frame_indices)):
             return [0.5, 0.5]  # Default values if no data
 
-        knee_angles = []
-        shoulder_heights = []
-
-        for frame_idx, landmarks in frames.items():
-            if len(landmarks) < 33:  # Need full body landmarks
-                continue
-
-            # Calculate knee angles
-            # Right leg
-            right_hip = np.array([landmarks[24]['x'], landmarks[24]['y'], landmarks[24].get('z', 0)])
-            right_knee = np.array([landmarks[26]['x'], landmarks[26]['y'], landmarks[26].get('z', 0)])
-            right_ankle = np.array([landmarks[28]['x'], landmarks[28]['y'], landmarks[28].get('z', 0)])
+        # Knee angles in 3D for every frame
+        left_knee, right_knee = knee_angles(landmarks, dims=3)
+        knee_variability = np.std(asymmetry(left_knee, right_knee)) / 180.0  # Normalize to 0-1
 
-            vec1 = right_hip - right_knee
-            vec2 = right_ankle - right_knee
+        # Shoulder height difference
+        shoulder_imbalance = np.mean(asymmetry(landmarks[:, LEFT_SHOULDER, 1], landmarks[:, RIGHT_SHOULDER, 1]))
 
-            cosine_angle = np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
-            right_knee_angle = np.arccos(np.clip(cosine_angle, -1.0, 1.0)) * 180 / np.pi
+        return [float(knee_variability), float(shoulder_imbalance)]
 
-            # Left leg
-            left_hip = np.array([landmarks[23]['x'], landmarks[23]['y'], landmarks[23].get('z', 0)])
-            left_knee = np.array([landmarks[25]['x'], landmarks[25]['y'], landmarks[25].get('z', 0)])
-            left_ankle = np.array([landmarks[27]['x'], landmarks[27]['y'], landmarks[27].get('z', 0)])
-
-            vec1 = left_hip - left_knee
-            vec2 = left_ankle - left_knee
-
-            cosine_angle = np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
-            left_knee_angle = np.arccos(np.clip(cosine_angle, -1.0, 1.0)) * 180 / np.pi
-
-            knee_angles.append((right_knee_angle, left_knee_angle))
+    except Exception as e:
+        logging.error(f"Error extracting pose features: {str(e)}")
+        return [0.5, 0.5]  # Default values on error
 
-            # Get shoulder heights
-            left_shoulder_y = landmarks[11]['y']
-            right_shoulder_y = landmarks[12]['y']
+def training_history_key(user_id):
+    """
+    Fingerprint of the user data predict_injury_risk depends on
 
-            shoulder_heights.append((left_shoulder_y, right_shoulder_y))
+    Changes whenever a training log is added or removed or the profile is
+    created or updated, so cached reports can be invalidated cheaply.
+    """
+    count, last_id, last_created = db.session.query(
+        db.func.count(TrainingLog.id), db.func.max(TrainingLog.id), db.func.max(TrainingLog.created_at)
+    ).filter(TrainingLog.user_id == user_id).one()
+    profile = db.session.query(UserProfile.id, UserProfile.updated_at).filter_by(user_id=user_id).first()
+    profile_key = f"{profile.id}@{profile.updated_at}" if profile else "none"
+    return f"{count}:{last_id}:{last_created}:{profile_key}"
+
+def result_summary(result):
+    """
+    Clip duration and frame counts of an analyze_video result, for list views
 
-        # Calculate features
-        knee_angle_diffs = [abs(right - left) for right, left in knee_angles]
-        knee_variability = np.std(knee_angle_diffs) / 180.0  # Normalize to 0-1
+    Stored in VideoAnalysis.summary so pages listing analyses never need to
+    load the (large) result itself.
+    """
+    fps = result.get('fps') or 0
+    frame_count = result.get('frame_count') or 0
+    return {
+        'duration': round(frame_count / fps, 1) if fps else None,
+        'frame_count': frame_count,
+        'detected_frames': result.get('detected_frames')
+    }
 
-        shoulder_height_diffs = [abs(left - right) for left, right in shoulder_heights]
-        shoulder_imbalance = np.mean(shoulder_height_diffs)
+def build_report(pose_data, user_id, sport_name):
+    """
+    Build the feedback and injury risk report shown on the analysis page
 
-        return [knee_variability, shoulder_imbalance]
+    Args:
+        pose_data: Analysis result with landmarks (dict or compact arrays)
+        user_id: User ID for history lookup
+        sport_name: Name of the sport
 
-    except Exception as e:
-        logging.error(f"Error extracting pose features: {str(e)}")
-        return [0.5, 0.5]  # Default values on error
+    Returns:
+        Dictionary with 'feedback', 'injury_risk' and 'kinematics' sections
+    """
+    feedback_text, recommendations = analyze_movement(pose_data, sport_name)
+    injury_risk = predict_injury_risk(pose_data, user_id, sport_name)
+    frame_indices, landmarks = as_landmark_array(pose_data)
+
+    return {
+        'feedback': [
+            {
+                'status': 'good',
+                'message': feedback_text
+            }
+        ],
+        'injury_risk': {
+            'risk_level': injury_risk.lower(),
+            'risk_percentage': 15 if injury_risk == 'Low' else 50 if injury_risk == 'Medium' else 85,
+            'message': REPORT_RISK_MESSAGES.get(injury_risk, 'No specific recommendations available.'),
+            'recommendations': recommendations.split('\n') if recommendations else []
+        },
+        'kinematics': kinematics.summarize(landmarks, frame_indices, pose_data.get('fps'))
+    }
 
 def simplified_risk_assessment(pose_data, sport_name):
     """
@@ -472,70 +395,341 @@ def simplified_risk_assessment(pose_data, sport_name):
         logging.error(f"Error in simplified risk assessment: {str(e)}")
         return "Medium"  # Default to medium
 
-def analyze_video(filepath):
+def _probe_video(filepath):
+    """Return (frame count, frames per second) reported by the container."""
+    cap = cv2.VideoCapture(filepath)
+    try:
+        if not cap.isOpened():
+            raise ValueError("Could not open video file")
+        return int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0), float(cap.get(cv2.CAP_PROP_FPS) or 0.0)
+    finally:
+        cap.release()
+
+class _FrameConverter:
+    """Downscale and colour-convert decoded frames into reusable buffers.
+    
+    MediaPipe resizes its input to a few hundred pixels internally, so
+    converting full-resolution 4K frames to RGB is wasted work. Frames are
+    shrunk so their longest side is at most `max_side` before the colour
+    conversion, and the decode, resize and RGB buffers are allocated once
+    and reused for every frame of the same size. The aspect ratio is kept,
+    so normalized landmark coordinates are unaffected.
+    """
+    
+    def __init__(self, max_side=None):
+        self.max_side = max_side
+        self.frame = None  # decode buffer, pass to cap.read()
+        self._small = None
+        self._rgb = None
+    
+    def __call__(self, frame):
+        height, width = frame.shape[:2]
+        source = frame
+        if self.max_side and max(height, width) > self.max_side:
+            scale = self.max_side / max(height, width)
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            if self._small is None or self._small.shape[:2] != (size[1], size[0]):
+                self._small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            cv2.resize(frame, size, dst=self._small, interpolation=cv2.INTER_AREA)
+            source = self._small
+        if self._rgb is None or self._rgb.shape != source.shape:
+            self._rgb = np.empty(source.shape, dtype=np.uint8)
+        cv2.cvtColor(source, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        return self._rgb
+
+def _landmark_motion(previous, current):
+    """Mean 2D displacement of landmarks between two samples, in normalized units."""
+    if previous is None:
+        return None
+    return float(np.mean(np.linalg.norm(current - previous, axis=1)))
+
+class PoseStream:
+    """
+    Iterate over the poses detected in frames [start, stop) of a video.
+    
+    Yields (frame index, (33, 4) landmark array) for every sampled frame
+    with a detected pose, as the video is decoded, so consumers can process
+    a clip of any length without collecting it first. After iteration,
+    `frames_read` is the index of the first frame not read and `sampled`
+    the number of frames in range that went through the detector.
+    
+    Args:
+        filepath: Path to the video file
+        start: First frame index to yield
+        stop: Frame index to stop at (None reads to the end of the video)
+        warmup: Number of frames before `start` to run through the detector
+            without yielding, so tracking mode has context at shard boundaries
+        progress_callback: Optional callable, see analyze_video
+        stride: Run the detector on every `stride`-th frame; skipped frames
+            are grabbed from the decoder but never converted or processed
+        adaptive: Treat `stride` as the maximum and shrink it while landmarks
+            move more than `motion_threshold` between samples
+        motion_threshold: Mean landmark displacement between samples that
+            triggers denser sampling in adaptive mode
+        max_side: Downscale frames so their longest side is at most this many
+            pixels before detection (None keeps full resolution)
+        pose_settings: Dict of inference_config.PoseSettings fields (default:
+            the 'upload' workload settings)
+    """
+    
+    def __init__(self, filepath, start=0, stop=None, warmup=0, progress_callback=None,
+                 stride=1, adaptive=False, motion_threshold=ADAPTIVE_MOTION_THRESHOLD,
+                 max_side=DECODE_MAX_SIDE, pose_settings=None):
+        self.filepath = filepath
+        self.start = start
+        self.stop = stop
+        self.warmup = warmup
+        self.progress_callback = progress_callback
+        self.stride = stride
+        self.adaptive = adaptive
+        self.motion_threshold = motion_threshold
+        self.max_side = max_side
+        self.pose_settings = pose_settings
+        self.frames_read = 0
+        self.sampled = 0
+    
+    def __iter__(self):
+        start, stop, progress_callback = self.start, self.stop, self.progress_callback
+        settings = inference_config.PoseSettings(**self.pose_settings) if self.pose_settings else None
+        pose = inference_config.create_pose('upload', settings)
+        cap = cv2.VideoCapture(self.filepath)
+        try:
+            if not cap.isOpened():
+                raise ValueError("Could not open video file")
+            
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+            frame_idx = max(0, start - self.warmup)
+            if frame_idx > 0:
+                # OpenCV seeks to the preceding keyframe and decodes forward
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+            
+            self.frames_read = frame_idx
+            self.sampled = 0
+            
+            max_stride = max(1, int(self.stride))
+            current_stride = max_stride
+            # Fixed strides sample the same global frame indices regardless of shard boundaries
+            next_sample = -(-frame_idx // max_stride) * max_stride
+            previous_points = None
+            converter = _FrameConverter(self.max_side)
+            
+            while stop is None or frame_idx < stop:
+                if frame_idx < next_sample:
+                    # Skip without converting or processing the frame
+                    if not cap.grab():
+                        break
+                    frame_idx += 1
+                    self.frames_read = frame_idx
+                    if progress_callback:
+                        progress_callback(frame_idx, max(total_frames, frame_idx))
+                    continue
+                
+                ret, frame = cap.read(converter.frame)
+                if not ret:
+                    break
+                converter.frame = frame
+                
+                # Downscale and convert BGR to RGB
+                rgb_frame = converter(frame)
+                
+                # Process frame
+                results = pose.process(rgb_frame)
+                landmarks = landmarks_array(results.pose_landmarks) if results.pose_landmarks else None
+                
+                if frame_idx >= start:
+                    self.sampled += 1
+                    if landmarks is not None:
+                        yield frame_idx, landmarks
+                
+                if self.adaptive:
+                    points = landmarks[:, :2] if landmarks is not None else None
+                    motion = _landmark_motion(previous_points, points) if points is not None else None
+                    if motion is not None and motion > self.motion_threshold:
+                        # Fast movement: sample densely
+                        current_stride = max(1, current_stride // 2)
+                    elif motion is not None and motion < self.motion_threshold / 2:
+                        current_stride = min(max_stride, current_stride * 2)
+                    previous_points = points
+                    next_sample = frame_idx + current_stride
+                else:
+                    next_sample = frame_idx + max_stride
+                
+                frame_idx += 1
+                self.frames_read = frame_idx
+                
+                if progress_callback:
+                    progress_callback(frame_idx, max(total_frames, frame_idx))
+        finally:
+            cap.release()
+            pose.close()
+
+def _extract_pose_range(filepath, start=0, stop=None, warmup=0, progress_callback=None, **sampling):
+    """
+    Run pose detection over frames [start, stop) of a video and collect the results.
+    
+    Arguments are those of PoseStream.
+        
+    Returns:
+        Tuple of (original frame indices of detected poses, (N, 33, 4)
+        landmark array, index of the first frame not read, number of
+        frames sampled)
+    """
+    stream = PoseStream(filepath, start, stop, warmup, progress_callback, **sampling)
+    detected_frames = []
+    detected_landmarks = []
+    for frame_idx, landmarks in stream:
+        detected_frames.append(frame_idx)
+        detected_landmarks.append(landmarks)
+    
+    if detected_frames:
+        frame_indices = np.array(detected_frames, dtype=np.int32)
+        landmarks = np.stack(detected_landmarks)
+    else:
+        frame_indices, landmarks = empty_landmarks()
+    return frame_indices, landmarks, stream.frames_read, stream.sampled
+
+def _extract_pose_shard(args):
+    """Process pool entry point for one frame range."""
+    filepath, start, stop, warmup, sampling = args
+    return _extract_pose_range(filepath, start, stop, warmup, **sampling)
+
+def _plan_shards(total_frames, workers, warmup):
+    """Split [0, total_frames) into contiguous ranges for parallel extraction.
+    
+    Uses a few shards per worker to balance uneven decode cost, but keeps
+    each shard long enough that the warm-up overlap stays a small fraction
+    of the work. The last shard is open-ended so frames beyond the
+    container's (sometimes inaccurate) frame count are still processed.
+    """
+    min_shard = max(MIN_SHARD_FRAMES, warmup * 4)
+    count = max(1, min(workers * 4, total_frames // min_shard))
+    bounds = [round(i * total_frames / count) for i in range(count + 1)]
+    shards = [(bounds[i], bounds[i + 1]) for i in range(count)]
+    shards[-1] = (shards[-1][0], None)
+    return shards
+
+def _analyze_video_parallel(filepath, total_frames, workers, warmup, sampling, progress_callback=None):
+    """Extract pose data with one MediaPipe instance per worker process."""
+    shards = _plan_shards(total_frames, workers, warmup)
+    if len(shards) == 1:
+        return _extract_pose_range(filepath, progress_callback=progress_callback, **sampling)
+    
+    results = {}
+    frames_done = 0
+    context = multiprocessing.get_context('spawn')
+    executor = ProcessPoolExecutor(max_workers=min(workers, len(shards)), mp_context=context)
+    completed = False
+    try:
+        futures = {
+            executor.submit(_extract_pose_shard, (filepath, start, stop, warmup, sampling)): start
+            for start, stop in shards
+        }
+        for future in as_completed(futures):
+            start = futures[future]
+            shard_result = future.result()
+            results[start] = shard_result
+            frames_done += shard_result[2] - start
+            if progress_callback:
+                progress_callback(frames_done, max(total_frames, frames_done))
+        completed = True
+    finally:
+        # Don't wait for outstanding shards when cancelled or failed
+        executor.shutdown(wait=completed, cancel_futures=True)
+    
+    # Stitch shards back together in frame order
+    ordered = [results[start] for start in sorted(results)]
+    frame_indices = np.concatenate([shard[0] for shard in ordered])
+    landmarks = np.concatenate([shard[1] for shard in ordered])
+    frame_count = max(shard[2] for shard in ordered)
+    sampled = sum(shard[3] for shard in ordered)
+    return frame_indices, landmarks, frame_count, sampled
+
+def _sampling(source_fps, frame_stride=1, target_fps=None, adaptive_stride=False,
+              motion_threshold=ADAPTIVE_MOTION_THRESHOLD, max_side=DECODE_MAX_SIDE, pose_settings=None):
+    """PoseStream sampling arguments for the analyze_video options."""
+    stride = max(1, int(frame_stride or 1))
+    if target_fps and source_fps > 0:
+        stride = max(1, int(round(source_fps / target_fps)))
+    return {
+        'stride': stride,
+        'adaptive': bool(adaptive_stride),
+        'motion_threshold': motion_threshold,
+        'max_side': max_side,
+        'pose_settings': pose_settings
+    }
+
+def _sampling_summary(sampling, target_fps):
+    return {
+        'frame_stride': sampling['stride'],
+        'target_fps': target_fps,
+        'adaptive': sampling['adaptive'],
+        'max_side': sampling['max_side'],
+        'pose_settings': sampling['pose_settings']
+    }
+
+def analyze_video(filepath, progress_callback=None, workers=1, shard_warmup=SHARD_WARMUP_FRAMES,
+                  frame_stride=1, target_fps=None, adaptive_stride=False,
+                  motion_threshold=ADAPTIVE_MOTION_THRESHOLD, max_side=DECODE_MAX_SIDE,
+                  pose_settings=None, compact=False):
     """
     Analyze a video file and return pose data and analysis results.
     
     Args:
         filepath: Path to the video file
+        progress_callback: Optional callable invoked as
+            progress_callback(frames_processed, total_frames). It may raise
+            AnalysisCancelled to stop the analysis early.
+        workers: Number of processes to split the video across. With more
+            than one worker the video is divided into frame ranges, each
+            processed by its own Pose instance, and stitched back in order.
+        shard_warmup: Frames each shard runs through the detector before its
+            range starts, so tracking has context at shard boundaries
+        frame_stride: Run pose detection on every Nth frame only
+        target_fps: Sample at roughly this rate instead; overrides frame_stride
+        adaptive_stride: Use the stride as an upper bound and sample densely
+            only while landmarks move more than motion_threshold between samples
+        motion_threshold: Mean normalized landmark displacement between
+            samples that triggers denser sampling
+        max_side: Longest side, in pixels, frames are downscaled to before
+            pose detection. None processes frames at full resolution.
+        pose_settings: Dict of inference_config.PoseSettings fields; None
+            uses the 'upload' workload settings of this process
+        compact: Return landmarks as arrays ('frame_indices' and a float32
+            (N, 33, 4) 'landmarks' array) instead of the 'pose_data' dict
         
     Returns:
-        Dictionary containing pose data and analysis results
+        Dictionary containing pose data keyed by original frame index, the
+        total number of frames in the video and the sampling that was used
     """
     try:
-        # Initialize pose detector
-        mp_pose = mp.solutions.pose
-        pose = mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=1,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        total_frames, source_fps = _probe_video(filepath)
+        sampling = _sampling(source_fps, frame_stride, target_fps, adaptive_stride, motion_threshold,
+                             max_side, pose_settings)
         
-        # Open video file
-        cap = cv2.VideoCapture(filepath)
-        if not cap.isOpened():
-            raise ValueError("Could not open video file")
-            
-        pose_data = {}
-        frame_count = 0
+        if workers and workers > 1:
+            frame_indices, landmarks, frame_count, sampled = _analyze_video_parallel(
+                filepath, total_frames, workers, shard_warmup, sampling, progress_callback)
+        else:
+            frame_indices, landmarks, frame_count, sampled = _extract_pose_range(
+                filepath, progress_callback=progress_callback, **sampling)
         
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-                
-            # Convert BGR to RGB
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Process frame
-            results = pose.process(rgb_frame)
-            
-            if results.pose_landmarks:
-                # Convert landmarks to dictionary format
-                landmarks = []
-                for landmark in results.pose_landmarks.landmark:
-                    landmarks.append({
-                        'x': landmark.x,
-                        'y': landmark.y,
-                        'z': landmark.z,
-                        'visibility': landmark.visibility
-                    })
-                
-                pose_data[frame_count] = landmarks
-            
-            frame_count += 1
-            
-        # Clean up
-        cap.release()
-        pose.close()
+        if compact:
+            pose = {'frame_indices': frame_indices, 'landmarks': landmarks}
+        else:
+            pose = {'pose_data': arrays_to_pose_data(frame_indices, landmarks)}
         
         return {
-            'pose_data': pose_data,
+            **pose,
             'frame_count': frame_count,
+            'detected_frames': int(len(frame_indices)),
+            'fps': source_fps,
+            'sampled_frames': sampled,
+            'sampling': _sampling_summary(sampling, target_fps),
             'analysis_timestamp': datetime.now().isoformat()
         }
         
+    except AnalysisCancelled:
+        raise
     except Exception as e:
         logging.error(f"Error analyzing video: {str(e)}")
         return {
@@ -543,4 +737,68 @@ def analyze_video(filepath):
             'frame_count': 0,
             'analysis_timestamp': datetime.now().isoformat(),
             'error': str(e)
-        }
\ No newline at end of file
+        }
+
+def analyze_video_stream(filepath, landmarks_path, aggregates, progress_callback=None, workers=1,
+                         shard_warmup=SHARD_WARMUP_FRAMES, frame_stride=1, target_fps=None,
+                         adaptive_stride=False, motion_threshold=ADAPTIVE_MOTION_THRESHOLD,
+                         max_side=DECODE_MAX_SIDE, pose_settings=None):
+    """
+    Analyze a video as a stream: decode, detect, aggregate and store frame by frame.
+    
+    Each detected pose is appended to the landmark file and added to
+    `aggregates` as soon as it is produced, so memory use does not depend
+    on the clip length and `aggregates.snapshot()` gives the feedback so
+    far at any time, e.g. from progress_callback. With more than one worker
+    the shards are extracted in parallel as in analyze_video and
+    aggregated once they are stitched together.
+    
+    Args:
+        filepath: Path to the video file
+        landmarks_path: .npy file the landmarks are written to
+        aggregates: stream_analysis.ClipAggregates fed with every pose
+        progress_callback, workers, shard_warmup, frame_stride, target_fps,
+        adaptive_stride, motion_threshold, max_side, pose_settings: As for analyze_video
+        
+    Returns:
+        Dictionary with the frame counts, fps and sampling of analyze_video
+        and the final 'aggregates' snapshot
+    """
+    try:
+        total_frames, source_fps = _probe_video(filepath)
+        sampling = _sampling(source_fps, frame_stride, target_fps, adaptive_stride, motion_threshold,
+                             max_side, pose_settings)
+        
+        with LandmarkWriter(landmarks_path) as writer:
+            if workers and workers > 1:
+                frame_indices, landmarks, frame_count, sampled = _analyze_video_parallel(
+                    filepath, total_frames, workers, shard_warmup, sampling, progress_callback)
+                writer.extend(frame_indices, landmarks)
+                aggregates.update(frame_indices, landmarks)
+            else:
+                stream = PoseStream(filepath, progress_callback=progress_callback, **sampling)
+                for frame_idx, landmarks in stream:
+                    writer.append(frame_idx, landmarks)
+                    aggregates.add(frame_idx, landmarks)
+                frame_count, sampled = stream.frames_read, stream.sampled
+            detected = writer.count
+        
+        return {
+            'frame_count': frame_count,
+            'detected_frames': detected,
+            'fps': source_fps,
+            'sampled_frames': sampled,
+            'sampling': _sampling_summary(sampling, target_fps),
+            'aggregates': aggregates.snapshot(limit=None),
+            'analysis_timestamp': datetime.now().isoformat()
+        }
+        
+    except AnalysisCancelled:
+        raise
+    except Exception as e:
+        logging.error(f"Error analyzing video: {str(e)}")
+        return {
+            'frame_count': 0,
+            'analysis_timestamp': datetime.now().isoformat(),
+            'error': str(e)
+        }
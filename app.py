@@ -1,12 +1,13 @@
 import os
 import logging
 from datetime import datetime
-from flask import Flask, session, render_template
+from flask import Flask, session, render_template, request
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_login import LoginManager
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room
+from flask_login import current_user
 import json
 
 # Set up logging
@@ -47,6 +48,18 @@ def create_app():
     login_manager.init_app(app)
     socketio.init_app(app)
 
+    # Background video analysis queue
+    import jobs
+    jobs.init_app(app)
+
+    # Pose model settings per workload (POSE_SETTINGS)
+    import inference_config
+    inference_config.init_app(app)
+
+    # Readiness endpoint and optional model preloading (MODEL_WARMUP)
+    import warmup
+    warmup.init_app(app)
+
     # Configure Flask-Login
     login_manager.login_view = "login"
     login_manager.login_message_category = "info"
@@ -67,10 +80,18 @@ def create_app():
     from routes import register_routes
     register_routes(app)
 
+    # flask check-query-plans
+    import query_plans
+    query_plans.init_app(app)
+
     # Create database tables
     with app.app_context():
         db.create_all()
 
+        # Add columns introduced after the tables were first created
+        from migrations import upgrade_database
+        upgrade_database(db)
+
         # Initialize default sports if not exists
         sports = ["Basketball", "Tennis", "Football", "Badminton", "Running"]
         existing_sports = Sport.query.all()
@@ -96,46 +117,59 @@ def create_app():
     @socketio.on('connect')
     def handle_connect():
         logger.info('Client connected')
+        # Per-user room for background analysis notifications
+        if current_user.is_authenticated:
+            join_room(f'user_{current_user.id}')
         emit('connection_response', {'status': 'connected'})
 
     @socketio.on('disconnect')
     def handle_disconnect():
         logger.info('Client disconnected')
-
-    # Frame counter for skipping frames
-    frame_counter = 0
-    SKIP_FRAMES = 2  # Process every 3rd frame
+        import live_stream
+        live_stream.end_session(request.sid)
+
+    @socketio.on('live_frame')
+    def handle_live_frame(message):
+        """Analyze a binary JPEG/WebP frame and send landmarks + feedback back."""
+        if not current_user.is_authenticated:
+            emit('live_result', {'error': 'Login required'})
+            return
+        import live_stream
+        sid = request.sid
+        live_stream.handle_frame(sid, message, lambda result: socketio.emit('live_result', result, to=sid))
 
     @socketio.on('pose_data')
     def handle_pose_data(data):
-        global frame_counter
-        try:
-            # Skip frames to reduce processing load
-            frame_counter += 1
-            if frame_counter % (SKIP_FRAMES + 1) != 0:
-                return
+        landmarks = data.get('landmarks')
+        sport = data.get('sport')
+        analysis_type = data.get('analysis_type')
+        
+        if not landmarks or not sport or not analysis_type:
+            emit('error', {'message': 'Missing required data'})
+            return
 
-            landmarks = data.get('landmarks')
-            sport = data.get('sport')
-            analysis_type = data.get('analysis_type')
-            
-            if not landmarks or not sport or not analysis_type:
-                emit('error', {'message': 'Missing required data'})
-                return
-                
-            # Process the pose data
+        def analyze():
             from pose_estimation import analyze_pose
-            analysis_result = analyze_pose(landmarks, sport, analysis_type)
-            
-            # Emit the analysis result back to the client
-            emit('analysis_result', {
-                'result': analysis_result,
+            return {
+                'result': analyze_pose(landmarks, sport, analysis_type),
                 'timestamp': datetime.now().isoformat()
-            })
-            
-        except Exception as e:
-            logger.error(f'Error processing pose data: {str(e)}')
-            emit('error', {'message': f'Error processing pose data: {str(e)}'})
+            }
+
+        def deliver(future):
+            try:
+                response = future.result()
+            except Exception as e:
+                logger.error(f'Error processing pose data: {str(e)}')
+                socketio.emit('error', {'message': f'Error processing pose data: {str(e)}'}, to=sid)
+                return
+            # Superseded by a newer frame before it was analyzed
+            if not response.get('skipped'):
+                socketio.emit('analysis_result', response, to=sid)
+
+        # Only the newest pending frame per client is analyzed
+        import live_stream
+        sid = request.sid
+        live_stream.get_scheduler().submit((sid, 'pose_data'), analyze).add_done_callback(deliver)
 
     return app
 
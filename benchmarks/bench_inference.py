@@ -0,0 +1,175 @@
+"""
+Benchmark pose inference settings: latency against agreement with the heaviest model.
+
+Usage:
+    python benchmarks/bench_inference.py clips/*.mp4 --complexity 0 1 2 --segmentation
+
+Every clip is decoded once (up to --max-frames frames, downscaled like
+upload analysis) and then run through a fresh Pose instance in tracking
+mode for each setting. Confidence thresholds come from --workload (see
+inference_config). Per setting this reports:
+
+    first ms   first frame, including graph set-up and model loading
+    ms/frame   mean and p95 latency of the remaining frames
+    detected   share of frames with a pose
+    err        mean landmark distance to the reference setting, in torso
+               lengths, over frames where both found a pose
+    pck        share of landmarks within 0.1 torso lengths of the reference
+    jitter     mean frame-to-frame acceleration of the landmarks, in torso
+               lengths (lower is steadier)
+
+There is no ground truth: the reference is the heaviest complexity that
+could be loaded (or --reference), so err/pck measure how much accuracy a
+lighter model gives up relative to it. Use clips of real athletes, since
+synthetic frames contain no person. Lite and heavy models are downloaded
+by MediaPipe on first use; settings whose model cannot be loaded are
+reported as unavailable.
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from providers import cv2
+from providers import mediapipe as mp
+from analysis import DECODE_MAX_SIDE
+from pose_frame import landmarks_array
+from pose_metrics import LEFT_SHOULDER, RIGHT_SHOULDER
+import inference_config
+
+LEFT_HIP, RIGHT_HIP = 23, 24
+
+
+def read_clip(path, max_frames, max_side):
+    """Up to `max_frames` RGB frames of a video, downscaled to `max_side`."""
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < max_frames:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        height, width = frame.shape[:2]
+        if max_side and max(height, width) > max_side:
+            scale = max_side / max(height, width)
+            frame = cv2.resize(frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    cap.release()
+    return frames
+
+
+def run(frames, settings):
+    """Landmarks (NaN where no pose was found) and per-frame seconds for one setting."""
+    pose = mp.solutions.pose.Pose(static_image_mode=False, **settings._asdict())
+    landmarks = np.full((len(frames), 33, 4), np.nan, dtype=np.float32)
+    seconds = np.zeros(len(frames))
+    try:
+        for i, frame in enumerate(frames):
+            start = time.perf_counter()
+            results = pose.process(frame)
+            seconds[i] = time.perf_counter() - start
+            if results.pose_landmarks:
+                landmarks[i] = landmarks_array(results.pose_landmarks)
+    finally:
+        pose.close()
+    return landmarks, seconds
+
+
+def torso_length(landmarks):
+    shoulders = (landmarks[:, LEFT_SHOULDER, :2] + landmarks[:, RIGHT_SHOULDER, :2]) / 2
+    hips = (landmarks[:, LEFT_HIP, :2] + landmarks[:, RIGHT_HIP, :2]) / 2
+    return np.linalg.norm(shoulders - hips, axis=-1)
+
+
+def agreement(landmarks, reference):
+    """Mean error and PCK@0.1 in torso lengths over frames where both found a pose."""
+    both = ~np.isnan(landmarks[:, 0, 0]) & ~np.isnan(reference[:, 0, 0])
+    if not both.any():
+        return None, None
+    torso = torso_length(reference[both])[:, None]
+    distance = np.linalg.norm(landmarks[both, :, :2] - reference[both, :, :2], axis=-1) / torso
+    return float(distance.mean()), float((distance < 0.1).mean())
+
+
+def jitter(landmarks):
+    detected = landmarks[~np.isnan(landmarks[:, 0, 0])]
+    if len(detected) < 3:
+        return None
+    acceleration = np.linalg.norm(np.diff(detected[:, :, :2], n=2, axis=0), axis=-1)
+    return float((acceleration / torso_length(detected)[1:-1, None]).mean())
+
+
+def fmt(value, spec):
+    return '-' if value is None else format(value, spec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('clips', nargs='+', help='Sample video files')
+    parser.add_argument('--complexity', type=int, nargs='+', default=[0, 1, 2], choices=[0, 1, 2])
+    parser.add_argument('--segmentation', action='store_true', help='Also measure with segmentation enabled')
+    parser.add_argument('--workload', default='upload', choices=sorted(inference_config.DEFAULT_SETTINGS),
+                        help='Workload whose confidence thresholds are used')
+    parser.add_argument('--reference', type=int, choices=[0, 1, 2], help='Complexity to compare against')
+    parser.add_argument('--max-frames', type=int, default=120)
+    parser.add_argument('--max-side', type=int, default=DECODE_MAX_SIDE)
+    args = parser.parse_args()
+
+    base = inference_config.get_settings(args.workload)
+    variants = [base._replace(model_complexity=c, enable_segmentation=s)
+                for c in sorted(set(args.complexity))
+                for s in ([False, True] if args.segmentation else [base.enable_segmentation])]
+
+    # Per setting: lists of per-clip results
+    results = {settings: [] for settings in variants}
+    unavailable = set()
+    for path in args.clips:
+        frames = read_clip(path, args.max_frames, args.max_side)
+        if not frames:
+            print(f"{path}: no frames could be decoded, skipped")
+            continue
+        for settings in variants:
+            if settings in unavailable:
+                continue
+            try:
+                results[settings].append(run(frames, settings))
+            except Exception as e:
+                segmentation = 'on' if settings.enable_segmentation else 'off'
+                print(f"complexity {settings.model_complexity} (segmentation {segmentation}) unavailable: {str(e)}")
+                unavailable.add(settings)
+
+    available = [s for s in variants if s not in unavailable and results[s]]
+    if not available:
+        sys.exit("No setting could be run")
+    reference_complexity = args.reference
+    if reference_complexity is None:
+        reference_complexity = max(s.model_complexity for s in available)
+    reference = next((s for s in available if s.model_complexity == reference_complexity
+                      and not s.enable_segmentation), None)
+
+    print(f"\nworkload '{args.workload}' thresholds: detection {base.min_detection_confidence}, "
+          f"tracking {base.min_tracking_confidence}; reference complexity {reference_complexity}")
+    print(f"{'cx':>2} {'seg':>3} {'first ms':>9} {'ms/frame':>9} {'p95 ms':>7} {'fps':>6} "
+          f"{'detected':>8} {'err':>6} {'pck':>5} {'jitter':>7}")
+    for settings in available:
+        runs = results[settings]
+        first = np.mean([seconds[0] for _, seconds in runs])
+        steady = np.concatenate([seconds[1:] for _, seconds in runs]) if any(len(s) > 1 for _, s in runs) \
+            else np.array([first])
+        landmarks = np.concatenate([lm for lm, _ in runs])
+        detected = float((~np.isnan(landmarks[:, 0, 0])).mean())
+        err = pck = None
+        if reference is not None and settings != reference:
+            err, pck = agreement(landmarks, np.concatenate([lm for lm, _ in results[reference]]))
+        clip_jitter = [j for j in (jitter(lm) for lm, _ in runs) if j is not None]
+        print(f"{settings.model_complexity:>2} {'on' if settings.enable_segmentation else 'off':>3} "
+              f"{1000 * first:>9.0f} {1000 * steady.mean():>9.1f} {1000 * np.percentile(steady, 95):>7.1f} "
+              f"{1 / steady.mean():>6.1f} {detected:>8.0%} {fmt(err, '.3f'):>6} {fmt(pck, '.0%'):>5} "
+              f"{fmt(np.mean(clip_jitter) if clip_jitter else None, '.4f'):>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark the batched pose-metric engine against the per-frame loops it replaced.
+
+Usage:
+    python benchmarks/bench_pose_metrics.py --frames 1000 --repeat 5
+
+The legacy implementations below are the loops analysis.py used before
+pose_metrics existed. Both versions run on the same synthetic clip (the
+legacy code on the list-of-dicts pose_data, the new code on the
+(frames, 33, 4) array) and their outputs are compared before timing.
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from landmark_store import arrays_to_pose_data
+from pose_metrics import badminton_metrics, posture_alignment, hip_oscillation, knee_angles, asymmetry
+
+
+def synthetic_clip(frames, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(0.2, 0.8, size=(1, 33, 4)).astype(np.float32)
+    jitter = rng.normal(0, 0.03, size=(frames, 33, 4)).astype(np.float32)
+    landmarks = base + jitter
+    landmarks[:, :, 3] = rng.uniform(0.5, 1.0, size=(frames, 33))
+    return np.arange(frames, dtype=np.int32), landmarks
+
+
+def _angle(v1, v2):
+    cosine = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
+    return np.arccos(np.clip(cosine, -1.0, 1.0)) * 180 / np.pi
+
+
+def _xy(lm, i):
+    return np.array([lm[i]['x'], lm[i]['y']])
+
+
+def _xyz(lm, i):
+    return np.array([lm[i]['x'], lm[i]['y'], lm[i].get('z', 0)])
+
+
+def legacy_posture_score(pose_data):
+    score = 0
+    for landmarks in pose_data.values():
+        ls, rs, lh, rh = _xy(landmarks, 11), _xy(landmarks, 12), _xy(landmarks, 23), _xy(landmarks, 24)
+        shoulder = np.arctan2(rs[1] - ls[1], rs[0] - ls[0]) * 180 / np.pi
+        hip = np.arctan2(rh[1] - lh[1], rh[0] - lh[0]) * 180 / np.pi
+        if abs(shoulder - hip) < 10:
+            score += 1
+    return score
+
+
+def legacy_badminton(pose_data):
+    hits = []
+    for frame_idx, lm in pose_data.items():
+        wrist_r = _angle(_xy(lm, 16) - _xy(lm, 14), _xy(lm, 14) - _xy(lm, 12))
+        wrist_l = _angle(_xy(lm, 15) - _xy(lm, 13), _xy(lm, 13) - _xy(lm, 11))
+        knee_r = _angle(_xy(lm, 24) - _xy(lm, 26), _xy(lm, 28) - _xy(lm, 26))
+        knee_l = _angle(_xy(lm, 23) - _xy(lm, 25), _xy(lm, 27) - _xy(lm, 25))
+        shoulder = np.arctan2(lm[12]['y'] - lm[11]['y'], lm[12]['x'] - lm[11]['x']) * 180 / np.pi
+        hip = np.arctan2(lm[24]['y'] - lm[23]['y'], lm[24]['x'] - lm[23]['x']) * 180 / np.pi
+        hits.append((wrist_r > 100 or wrist_l > 100, knee_r < 130 or knee_l < 130, abs(shoulder - hip) > 45))
+    return np.array(hits)
+
+
+def legacy_oscillation(pose_data):
+    return np.std([(lm[23]['y'] + lm[24]['y']) / 2 for lm in pose_data.values()])
+
+
+def legacy_features(pose_data):
+    knees, shoulders = [], []
+    for lm in pose_data.values():
+        right = _angle(_xyz(lm, 24) - _xyz(lm, 26), _xyz(lm, 28) - _xyz(lm, 26))
+        left = _angle(_xyz(lm, 23) - _xyz(lm, 25), _xyz(lm, 27) - _xyz(lm, 25))
+        knees.append(abs(right - left))
+        shoulders.append(abs(lm[11]['y'] - lm[12]['y']))
+    return [np.std(knees) / 180.0, np.mean(shoulders)]
+
+
+def legacy_all(pose_data):
+    return (legacy_posture_score(pose_data), legacy_badminton(pose_data),
+            legacy_oscillation(pose_data), legacy_features(pose_data))
+
+
+def batched_all(landmarks):
+    m = badminton_metrics(landmarks)
+    hits = np.stack([
+        (m['wrist_angles']['right'] > 100) | (m['wrist_angles']['left'] > 100),
+        (m['knee_angles']['right'] < 130) | (m['knee_angles']['left'] < 130),
+        np.abs(m['shoulder_rotation'] - m['hip_rotation']) > 45
+    ], axis=1)
+    left, right = knee_angles(landmarks, dims=3)
+    features = [np.std(asymmetry(left, right)) / 180.0,
+                np.mean(asymmetry(landmarks[:, 11, 1], landmarks[:, 12, 1]))]
+    return (int(np.count_nonzero(posture_alignment(landmarks))), hits, hip_oscillation(landmarks), features)
+
+
+def best_of(fn, arg, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'frames':>8} {'legacy ms':>10} {'batched ms':>11} {'speedup':>8}")
+    for frames in args.frames:
+        frame_indices, landmarks = synthetic_clip(frames)
+        pose_data = arrays_to_pose_data(frame_indices, landmarks)
+
+        old, new = legacy_all(pose_data), batched_all(landmarks)
+        assert old[0] == new[0], 'posture score mismatch'
+        assert np.array_equal(old[1], new[1]), 'badminton rule hits mismatch'
+        assert np.isclose(old[2], new[2], atol=1e-6), 'oscillation mismatch'
+        assert np.allclose(old[3], new[3], atol=1e-5), 'feature mismatch'
+
+        legacy = best_of(legacy_all, pose_data, args.repeat)
+        batched = best_of(batched_all, landmarks, args.repeat)
+        print(f"{frames:>8} {legacy * 1000:>10.2f} {batched * 1000:>11.3f} {legacy / batched:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
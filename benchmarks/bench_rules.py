@@ -0,0 +1,90 @@
+"""
+Benchmark the sport rule engine per frame.
+
+Usage:
+    python benchmarks/bench_rules.py --frames 1 100 10000 --repeat 20
+
+For every sport in rules.SPORT_RULES this reports the one-off compile
+time and the evaluation cost per frame, both for a single live frame and
+for whole synthetic clips evaluated in one pass. The legacy live
+badminton checks (the if/elif chain routes.analyze_posture used to run
+per frame) are timed alongside for comparison.
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from rules import SPORT_RULES, RuleSet
+
+
+def synthetic_clip(frames, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(0.2, 0.8, size=(1, 33, 4)).astype(np.float32)
+    landmarks = base + rng.normal(0, 0.03, size=(frames, 33, 4)).astype(np.float32)
+    landmarks[:, :, 3] = rng.uniform(0.5, 1.0, size=(frames, 33))
+    return landmarks
+
+
+def legacy_badminton(landmarks):
+    feedback = []
+    hip_knee_diff = ((landmarks[23][1] - landmarks[25][1]) + (landmarks[24][1] - landmarks[26][1])) / 2
+    if abs(hip_knee_diff) < 0.1:
+        return [("You appear to be sitting.", "red")]
+    if abs(landmarks[11][1] - landmarks[12][1]) < 0.05:
+        feedback.append(("Good shoulder position for badminton stance.", "green"))
+    else:
+        feedback.append(("Keep shoulders level for better balance.", "yellow"))
+    distance = ((landmarks[13][0] - landmarks[15][0])**2 + (landmarks[13][1] - landmarks[15][1])**2)**0.5
+    if 0.1 < distance < 0.3:
+        feedback.append(("Good elbow position for power shots.", "green"))
+    else:
+        feedback.append(("Adjust elbow angle for better shot control.", "yellow"))
+    if ((landmarks[25][1] - landmarks[27][1]) + (landmarks[26][1] - landmarks[28][1])) / 2 > 0.15:
+        feedback.append(("Good knee bend for quick movement.", "green"))
+    else:
+        feedback.append(("Bend knees more for better court movement.", "yellow"))
+    return feedback
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, nargs='+', default=[1, 100, 10000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'sport':<10} {'rules':>5} {'compile':>10} " +
+          " ".join(f"{f'{n} fr (us/fr)':>16}" for n in args.frames))
+    for sport, sport_rules in SPORT_RULES.items():
+        start = time.perf_counter()
+        rule_set = RuleSet(sport_rules)
+        compile_ms = 1000 * (time.perf_counter() - start)
+
+        per_frame = []
+        for frames in args.frames:
+            landmarks = synthetic_clip(frames)
+            elapsed = best_of(lambda: rule_set.evaluate(landmarks).failed, args.repeat)
+            per_frame.append(1e6 * elapsed / frames)
+        print(f"{sport:<10} {len(sport_rules):>5} {compile_ms:>8.2f}ms " +
+              " ".join(f"{value:>16.2f}" for value in per_frame))
+
+    frame = synthetic_clip(1)[0].tolist()
+    elapsed = best_of(lambda: legacy_badminton(frame), args.repeat)
+    print(f"\nlegacy live badminton chain: {1e6 * elapsed:.2f} us/frame (4 checks, pure Python)")
+
+
+if __name__ == '__main__':
+    main()
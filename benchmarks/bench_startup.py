@@ -0,0 +1,73 @@
+"""
+Benchmark web worker startup.
+
+Usage:
+    python benchmarks/bench_startup.py --repeat 3
+
+Every run starts a fresh interpreter, the way a gunicorn worker starts,
+and measures the time to import the app and call create_app(), the time
+until the first request (GET /login) has been served and the resident
+memory afterwards. It also lists which heavy vision/ML modules were
+imported along the way. A login page should not need any of them.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ['cv2', 'mediapipe', 'sklearn', 'scipy', 'matplotlib', 'tensorflow']
+
+WORKER = f"""
+import os, sys, json, time, logging
+start = time.perf_counter()
+sys.path.insert(0, {ROOT!r})
+logging.disable(logging.CRITICAL)
+from app import create_app
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().get('/login')
+served = time.perf_counter()
+with open('/proc/self/status') as f:
+    rss_kb = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+print(json.dumps({{
+    'status': response.status_code,
+    'create_app': created - start,
+    'first_request': served - start,
+    'rss_mb': rss_kb / 1024,
+    'heavy': [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+
+def run_worker(database_url):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    output = subprocess.run([sys.executable, '-c', WORKER], env=env, cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        run_worker(database_url)  # creates the tables and warms the OS file cache
+        runs = [run_worker(database_url) for _ in range(args.repeat)]
+
+    print(f"{'run':>3} {'create_app':>11} {'first request':>14} {'RSS':>9}  heavy modules loaded")
+    for i, run in enumerate(runs, 1):
+        print(f"{i:>3} {run['create_app']:>10.2f}s {run['first_request']:>13.2f}s "
+              f"{run['rss_mb']:>7.0f}MB  {', '.join(run['heavy']) or '-'}")
+    best = min(runs, key=lambda run: run['first_request'])
+    print(f"\nbest: first request after {best['first_request']:.2f}s, {best['rss_mb']:.0f}MB RSS "
+          f"(GET /login -> {best['status']})")
+
+
+if __name__ == '__main__':
+    main()
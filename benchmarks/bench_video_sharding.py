@@ -0,0 +1,67 @@
+"""
+Benchmark serial vs. sharded pose extraction in analysis.analyze_video.
+
+Usage:
+    python benchmarks/bench_video_sharding.py path/to/clip.mp4 --workers 1 4 8
+
+Without a path a synthetic clip is generated, which exercises decoding and
+the detector but contains no person, so use a real training video to get
+representative numbers. Each run reports wall time, frames per second and
+speedup over the single-process run, and checks that the sharded result
+covers the same frames as the serial one.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from analysis import analyze_video
+
+
+def make_synthetic_clip(path, frames=600, size=(1280, 720), fps=30):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    for i in range(frames):
+        frame = np.full((size[1], size[0], 3), 40, np.uint8)
+        cv2.circle(frame, ((i * 7) % size[0], size[1] // 2), 40, (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('video', nargs='?', help='Video file to analyze')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count()])
+    args = parser.parse_args()
+
+    video = args.video
+    if video is None:
+        video = os.path.join(tempfile.mkdtemp(), 'synthetic.mp4')
+        make_synthetic_clip(video)
+
+    baseline = None
+    reference = None
+    print(f"{'workers':>8} {'seconds':>9} {'fps':>8} {'speedup':>8}  frames")
+    for workers in sorted(set(args.workers)):
+        start = time.perf_counter()
+        result = analyze_video(video, workers=workers)
+        elapsed = time.perf_counter() - start
+        if result.get('error'):
+            sys.exit(f"Analysis failed: {result['error']}")
+
+        baseline = baseline or elapsed
+        detected = sorted(result['pose_data'])
+        if reference is None:
+            reference = detected
+        match = 'ok' if detected == reference else f'MISMATCH ({len(detected)} vs {len(reference)} detections)'
+        print(f"{workers:>8} {elapsed:>9.2f} {result['frame_count'] / elapsed:>8.1f} "
+              f"{baseline / elapsed:>7.2f}x  {result['frame_count']} {match}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+"""
+Shared server-side camera stream.
+
+One capture thread reads the camera at its native rate into a small ring
+buffer, and one processing thread runs pose inference and JPEG encoding
+once on the newest captured frame. Each frame is encoded once per
+quality tier (see frame_encoder), and every /video_feed viewer of that
+tier receives the same bytes; a viewer that falls behind simply skips to the newest
+frame instead of building up a backlog. The camera is opened when the
+first consumer arrives and released once nobody has asked for frames for
+`idle_timeout` seconds.
+"""
+import time
+import logging
+import threading
+from collections import deque
+
+from providers import cv2
+
+from frame_encoder import EncodedFrame, DEFAULT_TIER
+
+logger = logging.getLogger(__name__)
+
+MAX_CAMERA_ATTEMPTS = 3
+
+
+class StreamFrame:
+    """A processed camera frame shared by all consumers."""
+    __slots__ = ('seq', 'timestamp', 'encoded', 'landmarks')
+
+    def __init__(self, seq, timestamp, encoded, landmarks):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.encoded = encoded
+        self.landmarks = landmarks
+
+
+class CameraStream:
+    def __init__(self, source=0, process=None, buffer_size=4, idle_timeout=10.0, tier=DEFAULT_TIER):
+        """
+        Args:
+            source: cv2.VideoCapture source (device index or video path)
+            process: Callable taking a BGR frame and returning
+                (annotated frame, landmarks); runs once per processed frame
+            buffer_size: Number of raw frames kept in the ring buffer
+            idle_timeout: Seconds without consumers before the camera is released
+            tier: Encoding tier prepared eagerly for every processed frame;
+                other tiers are encoded on first request
+        """
+        self.source = source
+        self.process = process
+        self.idle_timeout = idle_timeout
+        self.tier = tier
+        self._raw = deque(maxlen=buffer_size)  # (capture seq, frame)
+        self._raw_seq = 0
+        self._latest = None
+        self._cond = threading.Condition()
+        self._running = False
+        self._generation = 0
+        self._threads = []
+        self._subscribers = 0
+        self._last_demand = 0.0
+
+        # Metrics
+        self._captured = 0
+        self._processed = 0
+        self._delivered = 0
+        self._skipped = 0
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        """Open the camera and start the capture and processing threads.
+
+        Returns:
+            bool: Whether the camera is streaming
+        """
+        with self._cond:
+            self._last_demand = time.monotonic()
+            if self._running:
+                return True
+            capture = self._open()
+            if capture is None:
+                return False
+            self._running = True
+            self._generation += 1
+            self._threads = [
+                threading.Thread(target=self._capture_loop, args=(capture, self._generation),
+                                 name='camera-capture', daemon=True),
+                threading.Thread(target=self._process_loop, args=(self._generation,),
+                                 name='camera-process', daemon=True)
+            ]
+        for thread in self._threads:
+            thread.start()
+        return True
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=2)
+        self._threads = []
+
+    def _open(self):
+        for attempt in range(MAX_CAMERA_ATTEMPTS):
+            capture = cv2.VideoCapture(self.source)
+            if capture.isOpened():
+                logger.info("Camera opened")
+                return capture
+            capture.release()
+            logger.error(f"Failed to open camera (attempt {attempt + 1})")
+            time.sleep(0.5)
+        return None
+
+    def _active(self, generation):
+        return self._running and self._generation == generation
+
+    def _capture_loop(self, capture, generation):
+        failures = 0
+        try:
+            while self._active(generation):
+                if time.monotonic() - self._last_demand > self.idle_timeout and not self._subscribers:
+                    logger.info("No camera consumers, stopping capture")
+                    break
+                success, frame = capture.read()
+                if not success or frame is None:
+                    failures += 1
+                    if failures >= MAX_CAMERA_ATTEMPTS:
+                        logger.error("Camera stopped delivering frames")
+                        break
+                    capture.release()
+                    capture = self._open() or capture
+                    continue
+                failures = 0
+                with self._cond:
+                    self._raw_seq += 1
+                    self._captured += 1
+                    self._raw.append((self._raw_seq, frame))
+                    self._cond.notify_all()
+        finally:
+            capture.release()
+            logger.info("Camera released")
+            with self._cond:
+                if self._generation == generation:
+                    self._running = False
+                    self._raw.clear()
+                    self._latest = None
+                self._cond.notify_all()
+
+    def _process_loop(self, generation):
+        done = 0
+        while True:
+            with self._cond:
+                while self._active(generation) and (not self._raw or self._raw[-1][0] == done):
+                    self._cond.wait()
+                if not self._active(generation):
+                    return
+                # Only the newest frame is processed; older ones are skipped
+                done, frame = self._raw[-1]
+
+            annotated, landmarks = frame, None
+            if self.process is not None:
+                try:
+                    annotated, landmarks = self.process(frame.copy())
+                except Exception as e:
+                    logger.error(f"Error processing camera frame: {str(e)}")
+            encoded = EncodedFrame(annotated)
+            try:
+                encoded.jpeg(self.tier)
+            except ValueError as e:
+                logger.error(str(e))
+                continue
+
+            with self._cond:
+                if not self._active(generation):
+                    return
+                self._processed += 1
+                self._latest = StreamFrame(self._processed, time.time(), encoded, landmarks)
+                self._cond.notify_all()
+
+    def latest_frame(self, timeout=2.0):
+        """Return the newest raw BGR frame, starting the camera if needed."""
+        if not self.start():
+            return None
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._running and not self._raw:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return self._raw[-1][1] if self._raw else None
+
+    def frames(self, timeout=5.0):
+        """Yield processed frames to one consumer at its own pace.
+
+        Each iteration returns the newest processed frame; frames produced
+        while the consumer was busy are skipped.
+        """
+        if not self.start():
+            return
+        with self._cond:
+            self._subscribers += 1
+        try:
+            last_seq = 0
+            while True:
+                with self._cond:
+                    while self._running and (self._latest is None or self._latest.seq == last_seq):
+                        if not self._cond.wait(timeout):
+                            break
+                    item = self._latest
+                    if not self._running or item is None or item.seq == last_seq:
+                        return
+                    if last_seq:
+                        self._skipped += max(0, item.seq - last_seq - 1)
+                    self._delivered += 1
+                    self._last_demand = time.monotonic()
+                last_seq = item.seq
+                yield item
+        finally:
+            with self._cond:
+                self._subscribers -= 1
+                self._last_demand = time.monotonic()
+
+    def mjpeg(self, tier=None):
+        """multipart/x-mixed-replace body for an MJPEG <img> viewer."""
+        for item in self.frames():
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + item.encoded.jpeg(tier or self.tier) + b'\r\n')
+
+    def stats(self):
+        with self._cond:
+            return {
+                'running': self._running,
+                'subscribers': self._subscribers,
+                'captured': self._captured,
+                'processed': self._processed,
+                'delivered': self._delivered,
+                'skipped': self._skipped
+            }
@@ -0,0 +1,147 @@
+"""
+Encode-once frame cache.
+
+An EncodedFrame wraps one BGR frame and produces each requested encoding
+(JPEG or WebP at a given quality/size tier, optionally base64) at most
+once. Every consumer of the frame gets the very same bytes object, so
+serving a frame to many viewers costs one compression, not one per viewer.
+
+Encode and inference times are recorded in `timings`, so the CPU spent on
+compression can be compared with the CPU spent on pose detection.
+"""
+import time
+import base64
+import threading
+from collections import namedtuple
+
+from providers import cv2
+
+EncodeTier = namedtuple('EncodeTier', ['quality', 'max_side'])
+
+# Quality/size tiers; max_side None keeps the captured resolution
+TIERS = {
+    'high': EncodeTier(quality=85, max_side=None),
+    'medium': EncodeTier(quality=70, max_side=640),
+    'low': EncodeTier(quality=50, max_side=320),
+}
+DEFAULT_TIER = 'high'
+
+# Extension and cv2 quality flag name per output format
+_FORMATS = {
+    'jpeg': ('.jpg', 'IMWRITE_JPEG_QUALITY'),
+    'webp': ('.webp', 'IMWRITE_WEBP_QUALITY'),
+}
+
+
+class StageTimings:
+    """Thread-safe count/total/max of elapsed time per named stage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def record(self, stage, seconds):
+        with self._lock:
+            count, total, longest = self._stages.get(stage, (0, 0.0, 0.0))
+            self._stages[stage] = (count + 1, total + seconds, max(longest, seconds))
+
+    def time(self, stage):
+        """Context manager recording the duration of its block under `stage`."""
+        return _Timer(self, stage)
+
+    def stats(self):
+        with self._lock:
+            stages = dict(self._stages)
+        grand_total = sum(total for _, total, _ in stages.values()) or 1.0
+        return {
+            stage: {
+                'count': count,
+                'total_ms': round(1000 * total, 1),
+                'mean_ms': round(1000 * total / count, 2),
+                'max_ms': round(1000 * longest, 2),
+                'share': round(total / grand_total, 3)
+            }
+            for stage, (count, total, longest) in stages.items()
+        }
+
+
+class _Timer:
+    __slots__ = ('timings', 'stage', 'start')
+
+    def __init__(self, timings, stage):
+        self.timings = timings
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.record(self.stage, time.perf_counter() - self.start)
+
+
+# Process-wide timings for the live video paths ('inference', 'encode:<format>:<tier>')
+timings = StageTimings()
+
+
+def resize_to_tier(frame, max_side):
+    height, width = frame.shape[:2]
+    if not max_side or max(height, width) <= max_side:
+        return frame
+    scale = max_side / max(height, width)
+    return cv2.resize(frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+
+
+class EncodedFrame:
+    """A frame together with its lazily produced, cached encodings."""
+
+    def __init__(self, frame, tiers=TIERS):
+        """
+        Args:
+            frame: BGR image; must not be modified after wrapping
+            tiers: Mapping of tier name to EncodeTier
+        """
+        self.frame = frame
+        self.tiers = tiers
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def encode(self, tier=DEFAULT_TIER, fmt='jpeg'):
+        """Encoded image bytes for `tier` and `fmt` ('jpeg' or 'webp'), produced once."""
+        key = (fmt, tier)
+        data = self._cache.get(key)
+        if data is not None:
+            return data
+        with self._lock:
+            data = self._cache.get(key)
+            if data is None:
+                extension, quality_flag = _FORMATS[fmt]
+                settings = self.tiers[tier]
+                with timings.time(f'encode:{fmt}:{tier}'):
+                    ok, buffer = cv2.imencode(extension, resize_to_tier(self.frame, settings.max_side),
+                                              [getattr(cv2, quality_flag), settings.quality])
+                    if not ok:
+                        raise ValueError(f"Failed to encode frame as {fmt}")
+                    data = buffer.tobytes()
+                self._cache[key] = data
+            return data
+
+    def jpeg(self, tier=DEFAULT_TIER):
+        return self.encode(tier, 'jpeg')
+
+    def webp(self, tier=DEFAULT_TIER):
+        return self.encode(tier, 'webp')
+
+    def base64(self, tier=DEFAULT_TIER, fmt='jpeg'):
+        """Base64 text of the cached encoding, produced once."""
+        key = ('base64', fmt, tier)
+        text = self._cache.get(key)
+        if text is None:
+            data = self.encode(tier, fmt)
+            with self._lock:
+                text = self._cache.get(key)
+                if text is None:
+                    with timings.time(f'base64:{fmt}:{tier}'):
+                        text = base64.b64encode(data).decode('ascii')
+                    self._cache[key] = text
+        return text
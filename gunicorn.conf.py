@@ -0,0 +1,46 @@
+"""
+Gunicorn configuration.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is created in the master (preload_app) with MODEL_WARMUP on, so
+OpenCV, MediaPipe and the pose model files are loaded once and shared
+copy-on-write by the workers. Each worker then runs a dummy inference
+right after the fork, before it accepts connections, and GET /readyz
+reports 200 once it is warm (see warmup.py).
+
+Socket.IO clients must keep talking to the same worker, so run more than
+one worker only behind a load balancer with sticky sessions.
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+# Threaded workers: Socket.IO runs in threading mode
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+timeout = 120
+
+preload_app = True
+os.environ.setdefault('MODEL_WARMUP', '1')
+
+
+def when_ready(server):
+    # Objects created while loading the app are never freed; keeping them
+    # out of garbage collection stops the collector from touching (and so
+    # copying) their memory pages in every worker.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from models import db
+    from wsgi import app
+    import warmup
+
+    # Database connections opened in the master must not be shared
+    with app.app_context():
+        db.engine.dispose()
+    if app.config['MODEL_WARMUP']:
+        elapsed = warmup.warm_worker()
+        server.log.info(f"Worker {worker.pid} warmed up in {elapsed:.2f}s")
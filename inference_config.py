@@ -0,0 +1,109 @@
+"""
+Pose inference settings per workload.
+
+Each place that runs MediaPipe Pose has different needs. Live feedback
+has to keep up with the camera; offline upload analysis can trade time
+for accuracy. The settings are kept here per workload instead of being
+hard-coded where each Pose instance is created:
+
+    live    per-session pose pool for browser live frames (routes)
+    camera  server camera page and PoseAnalyzer (pose_estimation, pose_analysis)
+    upload  background analysis of uploaded videos (analysis, jobs)
+
+Override them with the POSE_SETTINGS app config or environment variable
+(JSON), e.g. {"live": {"model_complexity": 0}, "upload": {"model_complexity": 2}}.
+benchmarks/bench_inference.py measures latency and agreement of the
+options on sample clips.
+
+MediaPipe only ships the complexity 1 ("full") landmark model. The lite
+(0) and heavy (2) models are downloaded into the mediapipe package on
+first use. Where that fails (no network, read-only site-packages) the
+bundled model is used instead and an error is logged.
+"""
+import os
+import json
+import logging
+from collections import namedtuple
+
+from providers import mediapipe as mp
+
+logger = logging.getLogger(__name__)
+
+PoseSettings = namedtuple('PoseSettings', ['model_complexity', 'min_detection_confidence',
+                                           'min_tracking_confidence', 'enable_segmentation'])
+
+# Landmark model file per complexity, relative to the mediapipe package
+LANDMARK_MODELS = {
+    0: 'modules/pose_landmark/pose_landmark_lite.tflite',
+    1: 'modules/pose_landmark/pose_landmark_full.tflite',
+    2: 'modules/pose_landmark/pose_landmark_heavy.tflite',
+}
+BUNDLED_COMPLEXITY = 1
+
+DEFAULT_SETTINGS = {
+    'live': PoseSettings(model_complexity=1, min_detection_confidence=0.3,
+                         min_tracking_confidence=0.3, enable_segmentation=False),
+    'camera': PoseSettings(model_complexity=1, min_detection_confidence=0.5,
+                           min_tracking_confidence=0.5, enable_segmentation=False),
+    'upload': PoseSettings(model_complexity=1, min_detection_confidence=0.5,
+                           min_tracking_confidence=0.5, enable_segmentation=False),
+}
+
+_settings = dict(DEFAULT_SETTINGS)
+
+
+def validate(settings):
+    """Raise ValueError unless `settings` (a PoseSettings) can be passed to Pose."""
+    if settings.model_complexity not in LANDMARK_MODELS:
+        raise ValueError(f"model_complexity must be 0, 1 or 2, got {settings.model_complexity!r}")
+    for name in ('min_detection_confidence', 'min_tracking_confidence'):
+        value = getattr(settings, name)
+        if not 0.0 <= value <= 1.0:
+            raise ValueError(f"{name} must be between 0 and 1, got {value!r}")
+    return settings
+
+
+def configure(overrides):
+    """Update the settings of some workloads.
+
+    Args:
+        overrides: Dict mapping workload names to dicts of PoseSettings fields
+    """
+    for workload, values in (overrides or {}).items():
+        if workload not in _settings:
+            raise ValueError(f"Unknown inference workload '{workload}'")
+        _settings[workload] = validate(_settings[workload]._replace(**values))
+        logger.info(f"Pose settings for {workload}: {_settings[workload]}")
+
+
+def get_settings(workload):
+    """PoseSettings currently configured for `workload`."""
+    return _settings[workload]
+
+
+def create_pose(workload=None, settings=None, static_image_mode=False):
+    """Create a MediaPipe Pose for a workload (or explicit PoseSettings).
+
+    Falls back to the bundled model when the configured one cannot be
+    downloaded or loaded.
+    """
+    settings = settings or get_settings(workload)
+    try:
+        return mp.solutions.pose.Pose(static_image_mode=static_image_mode, **settings._asdict())
+    except Exception as e:
+        if settings.model_complexity == BUNDLED_COMPLEXITY:
+            raise
+        logger.error(f"Could not load pose model complexity {settings.model_complexity} "
+                     f"({str(e)}), using the bundled model")
+        return mp.solutions.pose.Pose(static_image_mode=static_image_mode,
+                                      **settings._replace(model_complexity=BUNDLED_COMPLEXITY)._asdict())
+
+
+def stats():
+    return {workload: settings._asdict() for workload, settings in _settings.items()}
+
+
+def init_app(app):
+    """Apply POSE_SETTINGS from the app config or the environment."""
+    app.config.setdefault('POSE_SETTINGS', json.loads(os.environ.get('POSE_SETTINGS') or '{}'))
+    configure(app.config['POSE_SETTINGS'])
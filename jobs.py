@@ -0,0 +1,559 @@
+"""
+Background job queue for video analysis.
+
+Jobs are persisted in a small SQLite database in the instance folder, so no
+external broker is needed. Every web process runs a dispatcher thread that
+claims pending jobs (respecting a global concurrency limit), runs them in a
+process pool and writes the results back to the VideoAnalysis row. Workers
+report progress, and the feedback aggregated so far, through the same
+SQLite file, which is also how cancellation requests reach them.
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+import multiprocessing
+from datetime import datetime
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# Job states
+PENDING = 'pending'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+ACTIVE_STATES = (PENDING, RUNNING)
+
+# A running job whose heartbeat is older than this is assumed to belong to a
+# dead web process and is put back on the queue.
+LEASE_SECONDS = 120
+
+# Minimum interval between progress writes from a worker
+PROGRESS_INTERVAL = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    analysis_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    filepath TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    frames_done INTEGER NOT NULL DEFAULT 0,
+    frames_total INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    partial TEXT,
+    error TEXT,
+    owner TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status, id);
+CREATE INDEX IF NOT EXISTS ix_jobs_analysis ON jobs (analysis_id);
+"""
+
+
+class JobQueue:
+    """SQLite-backed queue of video analysis jobs.
+
+    Connections are opened per call so an instance can be shared between
+    threads and recreated cheaply inside worker processes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+            # Queues created before partial results were reported
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+            if 'partial' not in columns:
+                conn.execute('ALTER TABLE jobs ADD COLUMN partial TEXT')
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def enqueue(self, analysis_id, user_id, filepath, options=None, max_attempts=3):
+        """Add a job for the given analysis and return its id."""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                'INSERT INTO jobs (analysis_id, user_id, filepath, options, max_attempts, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (analysis_id, user_id, filepath, json.dumps(options or {}), max_attempts, time.time())
+            )
+            return cursor.lastrowid
+
+    def requeue_lost(self):
+        """Requeue, or fail when out of attempts, jobs abandoned by a dead web process.
+
+        Returns:
+            List of (job row, new status) for every job that changed
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            stale = conn.execute(
+                'SELECT * FROM jobs WHERE status = ? AND heartbeat_at < ?',
+                (RUNNING, now - LEASE_SECONDS)
+            ).fetchall()
+            changed = []
+            for job in stale:
+                status = self._retry_or_fail(conn, job, 'Worker lost')
+                logger.warning(f"Job {job['id']} lost its worker, new status: {status}")
+                changed.append((job, status))
+            conn.execute('COMMIT')
+            return changed
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def claim(self, owner, limit):
+        """Atomically move the oldest pending job to running.
+
+        Call requeue_lost first so jobs of dead workers don't count
+        against `limit`.
+
+        Returns the claimed job row, or None if the queue is empty or
+        `limit` jobs are already running across all processes.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+
+            running = conn.execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (RUNNING,)).fetchone()[0]
+            if running >= limit:
+                conn.execute('COMMIT')
+                return None
+
+            job = conn.execute(
+                'SELECT * FROM jobs WHERE status = ? ORDER BY id LIMIT 1', (PENDING,)
+            ).fetchone()
+            if job is None:
+                conn.execute('COMMIT')
+                return None
+
+            conn.execute(
+                'UPDATE jobs SET status = ?, owner = ?, attempts = attempts + 1, '
+                'started_at = ?, heartbeat_at = ? WHERE id = ?',
+                (RUNNING, owner, now, now, job['id'])
+            )
+            conn.execute('COMMIT')
+            return self.get(job['id'])
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def _retry_or_fail(self, conn, job, error):
+        if job['attempts'] < job['max_attempts']:
+            conn.execute(
+                'UPDATE jobs SET status = ?, owner = NULL, error = ?, frames_done = 0, partial = NULL WHERE id = ?',
+                (PENDING, error, job['id'])
+            )
+            return PENDING
+        conn.execute(
+            'UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+            (FAILED, error, time.time(), job['id'])
+        )
+        return FAILED
+
+    def retry(self, job_id, error):
+        """Put a crashed job back on the queue, or fail it when out of attempts.
+
+        Returns the job's new status.
+        """
+        with closing(self._connect()) as conn:
+            job = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if job is None:
+                return None
+            if job['cancel_requested']:
+                self.finish(job_id, CANCELLED)
+                return CANCELLED
+            return self._retry_or_fail(conn, job, error)
+
+    def heartbeat(self, job_ids):
+        if not job_ids:
+            return
+        with closing(self._connect()) as conn:
+            conn.executemany(
+                'UPDATE jobs SET heartbeat_at = ? WHERE id = ?',
+                [(time.time(), job_id) for job_id in job_ids]
+            )
+
+    def update_progress(self, job_id, frames_done, frames_total, partial=None):
+        """Record worker progress and, optionally, the partial results so far.
+
+        Returns True if cancellation was requested.
+        """
+        with closing(self._connect()) as conn:
+            if partial is None:
+                conn.execute(
+                    'UPDATE jobs SET frames_done = ?, frames_total = ? WHERE id = ?',
+                    (frames_done, frames_total, job_id)
+                )
+            else:
+                conn.execute(
+                    'UPDATE jobs SET frames_done = ?, frames_total = ?, partial = ? WHERE id = ?',
+                    (frames_done, frames_total, json.dumps(partial), job_id)
+                )
+            row = conn.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            return bool(row and row['cancel_requested'])
+
+    def finish(self, job_id, status, error=None):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+                (status, error, time.time(), job_id)
+            )
+
+    def request_cancel(self, job_id):
+        """Cancel a job. Pending jobs stop immediately, running ones at their next progress report.
+
+        Returns the job's status after the request.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ?', (job_id,))
+            conn.execute(
+                'UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?',
+                (CANCELLED, time.time(), job_id, PENDING)
+            )
+            row = conn.execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            return row['status'] if row else None
+
+    def get(self, job_id):
+        with closing(self._connect()) as conn:
+            return conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+    def get_for_analysis(self, analysis_id):
+        """Return the most recent job for a VideoAnalysis row."""
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                'SELECT * FROM jobs WHERE analysis_id = ? ORDER BY id DESC LIMIT 1', (analysis_id,)
+            ).fetchone()
+
+
+def job_status(job):
+    """Serialize a job row for JSON responses and Socket.IO events."""
+    total = job['frames_total'] or 0
+    return {
+        'job_id': job['id'],
+        'analysis_id': job['analysis_id'],
+        'status': job['status'],
+        'frames_processed': job['frames_done'],
+        'total_frames': total,
+        'progress': round(100.0 * job['frames_done'] / total, 1) if total else 0.0,
+        'attempts': job['attempts'],
+        'partial': json.loads(job['partial']) if job['partial'] else None,
+        'error': job['error'] if job['status'] == FAILED else None
+    }
+
+
+def waiting_status(analysis_id, status, job=None):
+    """Status of an analysis without a job of its own.
+
+    For an upload waiting for an earlier analysis of the same clip, `job`
+    is that analysis' job; its progress is shown but not its partial
+    feedback, which belongs to the other upload.
+    """
+    if job is None:
+        return {'job_id': None, 'analysis_id': analysis_id, 'status': status, 'frames_processed': 0,
+                'total_frames': 0, 'progress': 0.0, 'attempts': 0, 'partial': None, 'error': None}
+    return dict(job_status(job), job_id=None, analysis_id=analysis_id, status=status, attempts=0,
+                partial=None, error=None)
+
+
+def _emit_status(user_id, status):
+    from app import socketio
+
+    try:
+        socketio.emit('analysis_status', status, to=f"user_{user_id}")
+    except Exception as e:
+        logger.debug(f"Could not emit analysis status: {str(e)}")
+
+
+def run_analysis_job(queue_path, job_id, filepath, options):
+    """Entry point executed inside a worker process."""
+    from analysis import analyze_video_stream, AnalysisCancelled
+    from landmark_store import landmarks_filename
+    from stream_analysis import ClipAggregates
+
+    options = dict(options)
+    aggregates = ClipAggregates(options.pop('sport', None))
+    analysis_key = options.pop('analysis_key', None)
+    queue = JobQueue(queue_path)
+    last_report = [0.0, -1]  # time, aggregated frames at the last report
+
+    def on_progress(frames_done, frames_total):
+        now = time.monotonic()
+        if now - last_report[0] < PROGRESS_INTERVAL and frames_done < frames_total:
+            return
+        last_report[0] = now
+        # Only send partial results when new poses were aggregated
+        partial = None
+        if aggregates.frames + aggregates.pending != last_report[1]:
+            partial = aggregates.snapshot()
+            last_report[1] = aggregates.frames
+        if queue.update_progress(job_id, frames_done, frames_total, partial):
+            raise AnalysisCancelled()
+
+    # Landmarks are streamed to a binary file next to the upload, so only a
+    # reference plus the summary goes into the database.
+    landmarks_path = landmarks_filename(filepath, tag=analysis_key[:16] if analysis_key else None)
+    result = analyze_video_stream(filepath, landmarks_path, aggregates, progress_callback=on_progress, **options)
+    if result.get('error'):
+        return result
+    result['landmarks_file'] = os.path.basename(landmarks_path)
+    return result
+
+
+class JobDispatcher:
+    """Claims jobs from the queue and runs them in a local process pool."""
+
+    def __init__(self, app, queue, max_workers=2, poll_interval=0.5):
+        self.app = app
+        self.queue = queue
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.owner = f"{os.uname().nodename}:{os.getpid()}"
+        self.executor = None
+        self.running = {}  # job_id -> (future, last reported frames_done)
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='analysis-dispatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def notify(self):
+        """Wake the dispatcher after a job has been enqueued."""
+        self._wakeup.set()
+
+    def _new_executor(self):
+        # Spawned workers do not inherit the web process' threads or MediaPipe state
+        return ProcessPoolExecutor(max_workers=self.max_workers,
+                                   mp_context=multiprocessing.get_context('spawn'))
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._collect_finished()
+                self._claim_new()
+                self.queue.heartbeat(list(self.running))
+                self._report_progress()
+            except Exception as e:
+                logger.error(f"Error in analysis dispatcher: {str(e)}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _claim_new(self):
+        # Keep the VideoAnalysis rows of jobs whose worker died in step,
+        # or their pages would show them running forever
+        for job, status in self.queue.requeue_lost():
+            self._set_analysis_status(job['analysis_id'], status)
+            self._emit(self.queue.get(job['id']))
+
+        while len(self.running) < self.max_workers:
+            job = self.queue.claim(self.owner, self.max_workers)
+            if job is None:
+                return
+            if self.executor is None:
+                self.executor = self._new_executor()
+            future = self.executor.submit(run_analysis_job, self.queue.path, job['id'],
+                                          job['filepath'], json.loads(job['options']))
+            self.running[job['id']] = (future, -1)
+            self._set_analysis_status(job['analysis_id'], RUNNING)
+            logger.info(f"Started analysis job {job['id']} (attempt {job['attempts']})")
+
+    def _collect_finished(self):
+        from analysis import AnalysisCancelled
+
+        pool_broken = False
+        for job_id, (future, _) in list(self.running.items()):
+            if not future.done():
+                continue
+            del self.running[job_id]
+            job = self.queue.get(job_id)
+            try:
+                result = future.result()
+            except AnalysisCancelled:
+                self.queue.finish(job_id, CANCELLED)
+                self._set_analysis_status(job['analysis_id'], CANCELLED)
+            except BrokenProcessPool:
+                pool_broken = True
+                status = self.queue.retry(job_id, 'Worker process crashed')
+                logger.warning(f"Analysis job {job_id} crashed, new status: {status}")
+                self._set_analysis_status(job['analysis_id'], status)
+            except Exception as e:
+                self.queue.finish(job_id, FAILED, str(e))
+                self._set_analysis_status(job['analysis_id'], FAILED)
+            else:
+                if result.get('error'):
+                    self.queue.finish(job_id, FAILED, result['error'])
+                    self._set_analysis_status(job['analysis_id'], FAILED)
+                else:
+                    self.queue.finish(job_id, COMPLETED)
+                    self._set_analysis_status(job['analysis_id'], COMPLETED, result)
+            self._emit(self.queue.get(job_id))
+
+        if pool_broken:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def _report_progress(self):
+        for job_id, (future, last_frames) in list(self.running.items()):
+            job = self.queue.get(job_id)
+            if job is None or job['frames_done'] == last_frames:
+                continue
+            self.running[job_id] = (future, job['frames_done'])
+            self._emit(job)
+
+    def _set_analysis_status(self, analysis_id, status, result=None):
+        from models import db, VideoAnalysis
+        from analysis import result_summary
+
+        with self.app.app_context():
+            analysis = db.session.get(VideoAnalysis, analysis_id)
+            if analysis is None:
+                return
+            analysis.status = status
+            if result is not None:
+                analysis.landmarks_file = result.get('landmarks_file')
+                analysis.result = json.dumps(result)
+                analysis.update_summary(**result_summary(result))
+                analysis.timestamp = datetime.utcnow()
+            db.session.commit()
+            release_waiting(self.app, analysis)
+
+    def _emit(self, job):
+        _emit_status(job['user_id'], job_status(job))
+
+
+_dispatcher = None
+_dispatcher_pid = None
+_dispatcher_lock = threading.Lock()
+
+
+def init_app(app):
+    """Configure the job queue and start a dispatcher lazily in each process."""
+    app.config.setdefault('ANALYSIS_QUEUE_PATH', os.path.join(app.instance_path, 'analysis_jobs.sqlite3'))
+    app.config.setdefault('ANALYSIS_WORKERS', 2)
+    app.config.setdefault('ANALYSIS_MAX_ATTEMPTS', 3)
+    # Posture statistics don't need every frame: sample ~10 fps, denser during fast movement
+    app.config.setdefault('ANALYSIS_OPTIONS', {'target_fps': 10, 'adaptive_stride': True})
+
+    app.extensions['analysis_queue'] = JobQueue(app.config['ANALYSIS_QUEUE_PATH'])
+
+    # Start the dispatcher on the first request rather than here, so that
+    # forking servers get one dispatcher per worker process.
+    @app.before_request
+    def ensure_dispatcher():
+        get_dispatcher(app)
+
+
+def get_queue(app):
+    return app.extensions['analysis_queue']
+
+
+def get_dispatcher(app):
+    global _dispatcher, _dispatcher_pid
+    with _dispatcher_lock:
+        if _dispatcher is None or _dispatcher_pid != os.getpid():
+            _dispatcher = JobDispatcher(app, get_queue(app), max_workers=app.config['ANALYSIS_WORKERS'])
+            _dispatcher_pid = os.getpid()
+            _dispatcher.start()
+        return _dispatcher
+
+
+def release_waiting(app, analysis):
+    """Settle the uploads of the same clip that waited for `analysis`.
+
+    A second upload of a clip that is still being analyzed gets no job of
+    its own (see routes.start_analysis). Once `analysis` completes, they
+    reuse its result; if it failed they fail too; if it was cancelled,
+    the oldest one is queued in its place and the others wait for that
+    one. Must be called in an app context after `analysis` was committed.
+    """
+    from models import db, VideoAnalysis
+    from analysis import result_summary
+    import video_store
+
+    if not analysis.analysis_key or analysis.status not in (COMPLETED, FAILED, CANCELLED):
+        return
+    queue = get_queue(app)
+    upload_folder = app.config['UPLOAD_FOLDER']
+    candidates = (VideoAnalysis.query
+                  .filter(VideoAnalysis.analysis_key == analysis.analysis_key,
+                          VideoAnalysis.status.in_(ACTIVE_STATES),
+                          VideoAnalysis.id != analysis.id)
+                  .order_by(VideoAnalysis.id))
+    settled = []
+    for waiting in candidates:
+        if queue.get_for_analysis(waiting.id) is not None:
+            continue
+        result = None
+        if analysis.status == COMPLETED:
+            result = video_store.cached_result(analysis.analysis_key, waiting.sport.name, upload_folder)
+        if result is not None:
+            waiting.status = COMPLETED
+            waiting.result = json.dumps(result)
+            waiting.landmarks_file = result.get('landmarks_file')
+            waiting.update_summary(**result_summary(result))
+            waiting.timestamp = datetime.utcnow()
+            settled.append(waiting)
+        elif analysis.status == FAILED:
+            waiting.status = FAILED
+            settled.append(waiting)
+        else:
+            # Cancelled, or its result can no longer be reused: analyze
+            # this upload instead, the rest keep waiting for it
+            enqueue_analysis(app, waiting, os.path.join(upload_folder, waiting.filename))
+            logger.info(f"Analysis {waiting.id} no longer waits for {analysis.id}, queued")
+            break
+    db.session.commit()
+    for waiting in settled:
+        logger.info(f"Analysis {waiting.id} settled as {waiting.status} by analysis {analysis.id}")
+        _emit_status(waiting.user_id, waiting_status(waiting.id, waiting.status))
+
+
+def analysis_options(app):
+    """analyze_video options for new jobs: ANALYSIS_OPTIONS and the upload pose settings."""
+    import inference_config
+    return dict(app.config['ANALYSIS_OPTIONS'],
+                pose_settings=inference_config.get_settings('upload')._asdict())
+
+
+def enqueue_analysis(app, analysis, filepath):
+    """Queue a pending VideoAnalysis row for background processing."""
+    job_id = get_queue(app).enqueue(
+        analysis.id, analysis.user_id, filepath,
+        options=dict(analysis_options(app), sport=analysis.sport.name, analysis_key=analysis.analysis_key),
+        max_attempts=app.config['ANALYSIS_MAX_ATTEMPTS']
+    )
+    get_dispatcher(app).notify()
+    return job_id
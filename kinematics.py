@@ -0,0 +1,205 @@
+"""
+Batched biomechanics for coaching feedback.
+
+Like pose_metrics, every function works on a landmark array of shape
+(frames, 33, 4). The same code handles one live frame, as a (1, 33, 4)
+array, and a whole clip. Joint angles are computed for all frames with a
+few NumPy operations. Angular velocity and acceleration are finite
+differences over the frame timestamps, so clips sampled with an irregular
+(adaptive) stride are differentiated correctly.
+
+Angles are in degrees, velocities in deg/s and accelerations in deg/s².
+Lengths are relative to body size (hip-to-ankle leg length), so they do
+not depend on how far the athlete is from the camera.
+"""
+import numpy as np
+
+from pose_metrics import (angle_between, joint_angle, hip_height,
+                          LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_ELBOW, RIGHT_ELBOW,
+                          LEFT_WRIST, RIGHT_WRIST, LEFT_HIP, RIGHT_HIP,
+                          LEFT_KNEE, RIGHT_KNEE, LEFT_ANKLE, RIGHT_ANKLE)
+
+# Joint angle name -> (a, b, c): the angle at b between segments b->a and b->c
+JOINT_ANGLES = {
+    'left_shoulder': (LEFT_HIP, LEFT_SHOULDER, LEFT_ELBOW),
+    'right_shoulder': (RIGHT_HIP, RIGHT_SHOULDER, RIGHT_ELBOW),
+    'left_elbow': (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST),
+    'right_elbow': (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST),
+    'left_hip': (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE),
+    'right_hip': (RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE),
+    'left_knee': (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE),
+    'right_knee': (RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE),
+}
+
+# Shoulder line tilt (degrees) still counted as level
+SHOULDER_LEVEL_TOLERANCE = 5.0
+
+# Frame rate assumed when a clip's fps is unknown
+DEFAULT_FPS = 30.0
+
+
+def _midpoint(landmarks, a, b):
+    return (landmarks[:, a, :2] + landmarks[:, b, :2]) / 2
+
+
+def joint_angles(landmarks, dims=2):
+    """All JOINT_ANGLES for every frame, as a dict of (frames,) arrays."""
+    return {name: joint_angle(landmarks, a, b, c, dims) for name, (a, b, c) in JOINT_ANGLES.items()}
+
+
+def line_tilt(landmarks, a, b):
+    """Angle in degrees (0-90) between the line a-b and horizontal, ignoring direction."""
+    delta = np.abs(landmarks[:, b, :2] - landmarks[:, a, :2])
+    return np.degrees(np.arctan2(delta[:, 1], delta[:, 0]))
+
+
+def shoulder_tilt(landmarks):
+    return line_tilt(landmarks, LEFT_SHOULDER, RIGHT_SHOULDER)
+
+
+def shoulder_alignment(landmarks, tolerance=SHOULDER_LEVEL_TOLERANCE):
+    """Per-frame flag: shoulder line within `tolerance` degrees of level."""
+    return shoulder_tilt(landmarks) <= tolerance
+
+
+def spine_angle(landmarks):
+    """Trunk lean: angle between mid-hip->mid-shoulder and vertical (0 is upright)."""
+    trunk = _midpoint(landmarks, LEFT_SHOULDER, RIGHT_SHOULDER) - _midpoint(landmarks, LEFT_HIP, RIGHT_HIP)
+    # Image y grows downwards, so "up" is -y
+    return angle_between(trunk, np.array([0.0, -1.0]))
+
+
+def leg_length(landmarks):
+    """Mean hip-to-ankle length of both legs, per frame (body scale reference)."""
+    left = np.linalg.norm(landmarks[:, LEFT_HIP, :2] - landmarks[:, LEFT_ANKLE, :2], axis=-1)
+    right = np.linalg.norm(landmarks[:, RIGHT_HIP, :2] - landmarks[:, RIGHT_ANKLE, :2], axis=-1)
+    return (left + right) / 2
+
+
+def stride_length(landmarks):
+    """Horizontal ankle separation relative to leg length, per frame."""
+    separation = np.abs(landmarks[:, LEFT_ANKLE, 0] - landmarks[:, RIGHT_ANKLE, 0])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return separation / leg_length(landmarks)
+
+
+def arm_swing(landmarks):
+    """Angle between the left and right upper arms, per frame."""
+    left = landmarks[:, LEFT_ELBOW, :2] - landmarks[:, LEFT_SHOULDER, :2]
+    right = landmarks[:, RIGHT_ELBOW, :2] - landmarks[:, RIGHT_SHOULDER, :2]
+    return angle_between(left, right)
+
+
+def frame_times(frame_indices, fps=None):
+    """Timestamps in seconds of the given video frame indices."""
+    return np.asarray(frame_indices, dtype=np.float64) / (fps or DEFAULT_FPS)
+
+
+def time_derivative(values, times):
+    """Finite-difference derivative of (frames, ...) values over `times`.
+
+    Uses central differences inside the series and one-sided ones at its
+    ends; times need not be evenly spaced. Series shorter than two samples
+    have zero derivative.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 2:
+        return np.zeros_like(values)
+    return np.gradient(values, np.asarray(times, dtype=np.float64), axis=0)
+
+
+def compute(landmarks, frame_indices=None, fps=None, derivatives=True):
+    """Per-frame kinematics of a landmark array.
+
+    Args:
+        landmarks: (frames, 33, 4) landmark array
+        frame_indices: Video frame index of each row; consecutive when None
+        fps: Frame rate used to convert frame indices to seconds
+        derivatives: Also compute angular velocity and acceleration
+
+    Returns:
+        Dictionary with 'angles' (joint angle name -> (frames,) array),
+        'spine_angle', 'shoulder_tilt', 'shoulder_aligned', 'stride_length',
+        'arm_swing', and, with derivatives, 'angular_velocity' and
+        'angular_acceleration' keyed like 'angles'
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    angles = joint_angles(landmarks)
+    result = {
+        'angles': angles,
+        'spine_angle': spine_angle(landmarks),
+        'shoulder_tilt': shoulder_tilt(landmarks),
+        'shoulder_aligned': shoulder_alignment(landmarks),
+        'stride_length': stride_length(landmarks),
+        'arm_swing': arm_swing(landmarks),
+    }
+    if derivatives:
+        if frame_indices is None:
+            frame_indices = np.arange(len(landmarks))
+        times = frame_times(frame_indices, fps)
+        # Derive all angles in one call: stack to (frames, joints)
+        names = list(angles)
+        stacked = np.stack([angles[name] for name in names], axis=1) if names else np.empty((len(landmarks), 0))
+        velocity = time_derivative(stacked, times)
+        acceleration = time_derivative(velocity, times)
+        result['angular_velocity'] = {name: velocity[:, i] for i, name in enumerate(names)}
+        result['angular_acceleration'] = {name: acceleration[:, i] for i, name in enumerate(names)}
+    return result
+
+
+def frame_metrics(pose, decimals=1):
+    """Kinematics of a single live frame (a PoseFrame) as plain floats."""
+    metrics = compute(pose.batch, derivatives=False)
+    values = {f'{name}_angle': series[0] for name, series in metrics['angles'].items()}
+    values.update({key: metrics[key][0] for key in ('spine_angle', 'shoulder_tilt', 'stride_length', 'arm_swing')})
+    result = {key: (None if np.isnan(value) else round(float(value), decimals)) for key, value in values.items()}
+    result['shoulder_aligned'] = bool(metrics['shoulder_aligned'][0])
+    return result
+
+
+def _stats(values, decimals):
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return None
+    return {
+        'mean': round(float(values.mean()), decimals),
+        'min': round(float(values.min()), decimals),
+        'max': round(float(values.max()), decimals),
+        'std': round(float(values.std()), decimals)
+    }
+
+
+def summarize(landmarks, frame_indices=None, fps=None, decimals=2):
+    """Whole-clip kinematics: statistics of every per-frame metric.
+
+    Returns:
+        Dictionary with 'frames', 'angles' (name -> mean/min/max/std),
+        'peak_angular_velocity' and 'peak_angular_acceleration' (name ->
+        largest absolute value), stats for 'spine_angle', 'shoulder_tilt',
+        'stride_length' and 'arm_swing', 'shoulder_aligned_ratio' and
+        'hip_bounce' (std of hip height, relative to leg length)
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    if len(landmarks) == 0:
+        return {'frames': 0}
+    metrics = compute(landmarks, frame_indices, fps)
+
+    def peak(series):
+        series = np.abs(series[np.isfinite(series)])
+        return round(float(series.max()), decimals) if len(series) else None
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bounce = np.nanstd(hip_height(landmarks)) / np.nanmean(leg_length(landmarks))
+    return {
+        'frames': int(len(landmarks)),
+        'angles': {name: _stats(values, decimals) for name, values in metrics['angles'].items()},
+        'peak_angular_velocity': {name: peak(v) for name, v in metrics['angular_velocity'].items()},
+        'peak_angular_acceleration': {name: peak(v) for name, v in metrics['angular_acceleration'].items()},
+        'spine_angle': _stats(metrics['spine_angle'], decimals),
+        'shoulder_tilt': _stats(metrics['shoulder_tilt'], decimals),
+        'stride_length': _stats(metrics['stride_length'], decimals),
+        'arm_swing': _stats(metrics['arm_swing'], decimals),
+        'shoulder_aligned_ratio': round(float(np.mean(metrics['shoulder_aligned'])), decimals),
+        'hip_bounce': round(float(bounce), decimals + 2) if np.isfinite(bounce) else None
+    }
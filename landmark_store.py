@@ -0,0 +1,192 @@
+"""
+Compact binary storage for per-frame pose landmarks.
+
+A video's landmarks are stored as a single NumPy structured array with one
+record per detected frame: the original frame index and a float32
+(33, 4) block of x, y, z, visibility. Saved as an uncompressed .npy file it
+can be memory-mapped, so loading is zero-parse and only the pages that are
+actually touched are read from disk. At 532 bytes per frame it is roughly
+8x smaller than the equivalent JSON.
+"""
+import os
+import uuid
+import numpy as np
+
+NUM_LANDMARKS = 33
+FIELDS = ('x', 'y', 'z', 'visibility')
+
+RECORD_DTYPE = np.dtype([
+    ('frame', np.int32),
+    ('landmarks', np.float32, (NUM_LANDMARKS, len(FIELDS)))
+])
+
+SUFFIX = '.pose.npy'
+COMPRESSED_SUFFIX = '.pose.npz'
+
+
+def landmarks_filename(video_filename, compressed=False, tag=None):
+    """Name of the landmark file stored next to an uploaded video.
+
+    `tag` tells apart landmark files of the same video analyzed with
+    different settings.
+    """
+    base = os.path.splitext(video_filename)[0]
+    if tag:
+        base = f'{base}.{tag}'
+    return base + (COMPRESSED_SUFFIX if compressed else SUFFIX)
+
+
+def _temp_path(path):
+    """Hidden scratch file next to `path`, renamed over it once complete."""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f'.{name}.{uuid.uuid4().hex}.tmp')
+
+
+def empty_landmarks():
+    return np.zeros(0, dtype=np.int32), np.zeros((0, NUM_LANDMARKS, len(FIELDS)), dtype=np.float32)
+
+
+def pose_data_to_arrays(pose_data):
+    """Convert a {frame index: [landmark dicts]} mapping to (frame indices, landmarks)."""
+    frames = sorted(pose_data, key=int)
+    if not frames:
+        return empty_landmarks()
+    frame_indices = np.array([int(f) for f in frames], dtype=np.int32)
+    landmarks = np.array(
+        [[[lm[field] for field in FIELDS] for lm in pose_data[f][:NUM_LANDMARKS]] for f in frames],
+        dtype=np.float32
+    )
+    return frame_indices, landmarks
+
+
+def arrays_to_pose_data(frame_indices, landmarks):
+    """Convert (frame indices, landmarks) back to the legacy list-of-dicts mapping."""
+    return {
+        int(frame): [dict(zip(FIELDS, point)) for point in frame_landmarks.tolist()]
+        for frame, frame_landmarks in zip(frame_indices, landmarks)
+    }
+
+
+def save_landmarks(path, frame_indices, landmarks):
+    """Write landmarks to `path`.
+
+    Files ending in .npz are compressed (smaller, but cannot be memory-mapped);
+    anything else is written as a memory-mappable .npy file. The file is
+    written under a temporary name and renamed into place, so `path`
+    never holds a partly written file.
+    """
+    records = np.empty(len(frame_indices), dtype=RECORD_DTYPE)
+    records['frame'] = frame_indices
+    records['landmarks'] = landmarks
+    temp_path = _temp_path(path)
+    try:
+        with open(temp_path, 'wb') as f:
+            if path.endswith('.npz'):
+                np.savez_compressed(f, records=records)
+            else:
+                np.save(f, records)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return path
+
+
+def load_landmarks(path):
+    """Load (frame indices, landmarks) from a file written by save_landmarks.
+
+    .npy files are memory-mapped read-only; the returned arrays are views
+    into the mapping, so nothing is parsed or copied up front.
+    """
+    if path.endswith('.npz'):
+        with np.load(path) as data:
+            records = data['records']
+    else:
+        records = np.load(path, mmap_mode='r')
+    return records['frame'], records['landmarks']
+
+
+class LandmarkWriter:
+    """Write landmarks to a memory-mappable .npy file one frame at a time.
+
+    Records are appended as they are produced, so a whole video's landmarks
+    never have to be held in memory. The .npy header is written with a
+    placeholder size and rewritten with the final record count on close.
+    The file has the same layout as save_landmarks output and is read back
+    with load_landmarks.
+
+    Records go to a temporary file next to `path`, which close() renames
+    into place. abort() (or leaving the `with` block with an exception)
+    deletes it instead, so `path` only ever holds a complete file, and
+    concurrent writers of the same path never write into each other's
+    file.
+    """
+
+    HEADER_SIZE = 256
+
+    def __init__(self, path):
+        if path.endswith('.npz'):
+            raise ValueError("LandmarkWriter only writes uncompressed .npy files")
+        self.path = path
+        self.count = 0
+        self._record = np.zeros(1, dtype=RECORD_DTYPE)
+        self._temp_path = _temp_path(path)
+        self._file = open(self._temp_path, 'wb')
+        self._file.write(self._header(0))
+
+    def _header(self, count):
+        header = repr({
+            'descr': np.lib.format.dtype_to_descr(RECORD_DTYPE),
+            'fortran_order': False,
+            'shape': (count,)
+        })
+        prefix = np.lib.format.magic(1, 0)
+        # Pad with spaces so the data starts at a fixed, aligned offset
+        length = self.HEADER_SIZE - len(prefix) - 2
+        header = header.ljust(length - 1) + '\n'
+        if len(header) != length:
+            raise ValueError("Landmark file header does not fit")
+        return prefix + length.to_bytes(2, 'little') + header.encode('latin1')
+
+    def append(self, frame_index, landmarks):
+        """Append one frame's (33, 4) landmarks."""
+        self._record['frame'] = frame_index
+        self._record['landmarks'] = landmarks
+        self._file.write(self._record.tobytes())
+        self.count += 1
+
+    def extend(self, frame_indices, landmarks):
+        """Append a batch of frames."""
+        records = np.empty(len(frame_indices), dtype=RECORD_DTYPE)
+        records['frame'] = frame_indices
+        records['landmarks'] = landmarks
+        self._file.write(records.tobytes())
+        self.count += len(records)
+
+    def close(self):
+        """Write the final header and move the file to its path."""
+        if self._file.closed:
+            return
+        try:
+            self._file.seek(0)
+            self._file.write(self._header(self.count))
+            self._file.close()
+            os.replace(self._temp_path, self.path)
+        except Exception:
+            self.abort()
+            raise
+
+    def abort(self):
+        """Discard the frames written so far."""
+        self._file.close()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
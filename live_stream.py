@@ -0,0 +1,254 @@
+"""
+Binary Socket.IO channel for live pose analysis.
+
+The browser sends each captured frame as raw JPEG or WebP bytes in a
+Socket.IO binary attachment instead of a base64 data URI in a form POST,
+which saves the 33% base64 overhead and the per-frame HTTP request. The
+bytes are wrapped with np.frombuffer (no copy) and handed straight to
+cv2.imdecode.
+
+Frames are scheduled latest-frame-wins: each client has at most one frame
+being analyzed and one pending. A newer frame replaces the pending one
+(which is answered as skipped and counted as dropped) instead of queueing
+behind it, so feedback never lags behind the athlete when inference is
+slower than the capture rate. Pending frames run as soon as a worker is
+free; there are as many workers as live Pose instances. Every result
+carries a capture-interval hint matching the rate the server can actually
+sustain for that client, so the browser stops sending frames that would
+only be dropped.
+"""
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from providers import cv2
+
+logger = logging.getLogger(__name__)
+
+# Largest frame accepted over the socket (bytes)
+MAX_FRAME_BYTES = 2 * 1024 * 1024
+
+# Bounds for the capture interval suggested to clients (ms)
+MIN_CAPTURE_INTERVAL_MS = 33
+MAX_CAPTURE_INTERVAL_MS = 1000
+
+# Smoothing factor for the per-client service time average
+SERVICE_TIME_ALPHA = 0.2
+
+
+class FrameDecodeError(ValueError):
+    """Raised when a received frame is not a decodable image."""
+
+
+def decode_frame(data, flags=None):
+    """Decode JPEG/WebP bytes into a BGR frame without copying the input buffer.
+
+    Args:
+        data: bytes, bytearray or memoryview holding the encoded image
+        flags: cv2.imread flags, e.g. cv2.IMREAD_REDUCED_COLOR_2 to decode
+            a JPEG directly at half resolution (default cv2.IMREAD_COLOR)
+
+    Returns:
+        numpy.ndarray: BGR image
+    """
+    if not data:
+        raise FrameDecodeError('Empty frame')
+    if len(data) > MAX_FRAME_BYTES:
+        raise FrameDecodeError(f'Frame too large ({len(data)} bytes)')
+    if flags is None:
+        flags = cv2.IMREAD_COLOR
+    frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+    if frame is None:
+        raise FrameDecodeError('Frame is not a JPEG or WebP image')
+    return frame
+
+
+class _ClientState:
+    __slots__ = ('running', 'pending', 'dropped', 'processed', 'service_ms')
+
+    def __init__(self):
+        self.running = False
+        self.pending = None  # (fn, future) of the newest frame waiting to run
+        self.dropped = 0
+        self.processed = 0
+        self.service_ms = None
+
+
+class LatestFrameScheduler:
+    """Per-client latest-frame-wins scheduling of live analysis work.
+
+    `submit` returns a Future resolving to the result dict of the frame's
+    work function, extended with 'dropped', 'processing_ms' and
+    'capture_interval_ms'. A frame superseded while pending resolves to
+    {'skipped': True, ...} without running.
+    """
+
+    def __init__(self, workers, min_interval_ms=MIN_CAPTURE_INTERVAL_MS,
+                 max_interval_ms=MAX_CAPTURE_INTERVAL_MS):
+        self.workers = workers
+        self.min_interval_ms = min_interval_ms
+        self.max_interval_ms = max_interval_ms
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._executor = None
+        self._dropped_total = 0
+        self._processed_total = 0
+
+    def submit(self, client_id, fn):
+        """Schedule `fn()` for `client_id`, superseding its pending frame if any."""
+        future = Future()
+        stale = None
+        with self._lock:
+            state = self._clients.setdefault(client_id, _ClientState())
+            run_now = not state.running
+            if run_now:
+                state.running = True
+            else:
+                if state.pending is not None:
+                    stale = state.pending[1]
+                    state.dropped += 1
+                    self._dropped_total += 1
+                    skipped = dict(self._info(state), skipped=True)
+                state.pending = (fn, future)
+        if stale is not None:
+            stale.set_result(skipped)
+        if run_now:
+            self._dispatch(client_id, fn, future)
+        return future
+
+    def _dispatch(self, client_id, fn, future):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix='live-analysis')
+        self._executor.submit(self._run, client_id, fn, future, time.perf_counter())
+
+    def _run(self, client_id, fn, future, dispatched):
+        started = time.perf_counter()
+        try:
+            result, error = fn(), None
+        except Exception as e:
+            result, error = None, e
+        finished = time.perf_counter()
+
+        with self._lock:
+            state = self._clients.get(client_id)
+            following = None
+            if state is not None:
+                # Service time includes waiting for a worker, so the hint
+                # also backs off when other clients keep the workers busy
+                service_ms = 1000 * (finished - dispatched)
+                if state.service_ms is None:
+                    state.service_ms = service_ms
+                else:
+                    state.service_ms += SERVICE_TIME_ALPHA * (service_ms - state.service_ms)
+                state.processed += 1
+                self._processed_total += 1
+                following, state.pending = state.pending, None
+                state.running = following is not None
+                info = self._info(state)
+            else:
+                info = {}
+
+        if error is not None:
+            future.set_exception(error)
+        else:
+            result.update(info, processing_ms=round(1000 * (finished - started), 1))
+            future.set_result(result)
+
+        if following is not None:
+            self._dispatch(client_id, *following)
+
+    def _info(self, state):
+        interval = self.min_interval_ms if state.service_ms is None else state.service_ms
+        return {
+            'dropped': state.dropped,
+            'capture_interval_ms': int(min(self.max_interval_ms, max(self.min_interval_ms, interval)))
+        }
+
+    def forget(self, client_id):
+        """Drop a client's state; a frame still pending is answered as skipped."""
+        with self._lock:
+            state = self._clients.pop(client_id, None)
+        if state is not None and state.pending is not None:
+            state.pending[1].set_result({'skipped': True, 'dropped': state.dropped})
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'clients': len(self._clients),
+                'busy_clients': sum(1 for s in self._clients.values() if s.running),
+                'processed': self._processed_total,
+                'dropped': self._dropped_total
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """The process-wide scheduler, with one worker per live Pose instance."""
+    global _scheduler
+    if _scheduler is None:
+        from routes import pose_pool
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = LatestFrameScheduler(workers=pose_pool.size)
+    return _scheduler
+
+
+def analyze_encoded_frame(data, sport, session_id):
+    """Decode and analyze one encoded frame; errors are reported in the result."""
+    from routes import analyze_live_frame
+    from pose_pool import PoolTimeout
+
+    try:
+        return analyze_live_frame(decode_frame(data), sport or 'general', session_id)
+    except FrameDecodeError as e:
+        return {'error': str(e)}
+    except PoolTimeout:
+        return {'error': 'Server busy, please retry'}
+    except Exception as e:
+        logger.error(f"Error analyzing live frame: {str(e)}")
+        return {'error': 'Failed to analyze frame'}
+
+
+def handle_frame(client_id, message, deliver):
+    """Schedule one binary frame message from a live client.
+
+    Decoding happens on the worker, so frames that are superseded before
+    they run are never decoded.
+
+    Args:
+        client_id: Socket.IO session id of the sender
+        message: dict with 'frame' (encoded image bytes), optional 'sport'
+            and optional client 'seq' number echoed back in the result
+        deliver: Called with the 'live_result' payload once the frame has
+            been analyzed or skipped
+    """
+    if not isinstance(message, dict):
+        deliver({'error': 'Invalid frame message'})
+        return
+    seq = message.get('seq')
+    future = get_scheduler().submit(
+        client_id, lambda: analyze_encoded_frame(message.get('frame'), message.get('sport'), client_id)
+    )
+    future.add_done_callback(lambda f: deliver(dict(f.result(), seq=seq)))
+
+
+def end_session(client_id):
+    """Free per-client state when a live client disconnects."""
+    from routes import pose_pool
+    import live_tracking
+
+    if _scheduler is not None:
+        _scheduler.forget(client_id)
+        _scheduler.forget((client_id, 'pose_data'))
+    pose_pool.release_session(client_id)
+    live_tracking.sessions.release(client_id)
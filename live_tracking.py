@@ -0,0 +1,174 @@
+"""
+Per-session temporal state for live pose tracking.
+
+Each live session keeps the thumbnail of the last frame that went through
+MediaPipe together with the landmarks it produced. A new frame whose
+thumbnail barely differs from that one (an athlete holding a stance) reuses
+the previous landmarks and feedback without running inference at all.
+Frames that are inferred have their landmarks smoothed with a One-Euro
+filter, which removes jitter when the athlete is still but follows fast
+movement with little lag.
+"""
+import time
+import threading
+
+import numpy as np
+
+from providers import cv2
+from roi_tracker import RoiTracker
+
+# Mean absolute thumbnail difference (0-1) below which inference is skipped
+MOTION_THRESHOLD = 0.012
+# Run inference at least every N frames even without motion
+MAX_SKIPPED_FRAMES = 10
+THUMBNAIL_SIZE = (64, 48)
+
+# One-Euro filter parameters for normalized landmark coordinates
+FILTER_MIN_CUTOFF = 1.5
+FILTER_BETA = 10.0
+FILTER_D_CUTOFF = 1.0
+# Gaps longer than this (seconds) restart the filter
+FILTER_RESET_GAP = 1.0
+
+
+def _smoothing_factor(dt, cutoff):
+    tau = 1.0 / (2 * np.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    """One-Euro low-pass filter applied element-wise to an array signal.
+
+    The cutoff frequency rises with the signal's speed, so slow drift is
+    smoothed heavily while quick movements pass through with little lag.
+    """
+
+    def __init__(self, min_cutoff=FILTER_MIN_CUTOFF, beta=FILTER_BETA, d_cutoff=FILTER_D_CUTOFF):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self._value = None
+        self._derivative = None
+        self._timestamp = None
+
+    def __call__(self, value, timestamp):
+        value = np.asarray(value, dtype=np.float64)
+        if self._value is None or self._value.shape != value.shape:
+            self._value = value
+            self._derivative = np.zeros_like(value)
+            self._timestamp = timestamp
+            return value
+
+        dt = timestamp - self._timestamp
+        if dt <= 0:
+            return self._value
+        if dt > FILTER_RESET_GAP:
+            self.reset()
+            return self(value, timestamp)
+
+        a_d = _smoothing_factor(dt, self.d_cutoff)
+        derivative = (value - self._value) / dt
+        self._derivative = a_d * derivative + (1 - a_d) * self._derivative
+
+        cutoff = self.min_cutoff + self.beta * np.abs(self._derivative)
+        a = _smoothing_factor(dt, cutoff)
+        self._value = a * value + (1 - a) * self._value
+        self._timestamp = timestamp
+        return self._value
+
+
+def frame_thumbnail(frame):
+    """Small grayscale copy of a BGR frame used for cheap motion checks."""
+    small = cv2.resize(frame, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+
+class LiveSession:
+    """Tracking state of one live client."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.filter = OneEuroFilter()
+        self.roi = RoiTracker()
+        self.thumbnail = None  # thumbnail of the last inferred frame
+        self.landmarks = None  # filtered (33, 4) landmarks of the last inferred frame
+        self.reused = False  # whether the last frame reused the previous result
+        self.skipped_in_row = 0
+        self.feedback = None  # (sport, (feedback, metrics)) computed for self.landmarks
+        self.last_used = time.monotonic()
+        self.inferred = 0
+        self.skipped = 0
+
+    def should_skip(self, thumbnail, threshold=MOTION_THRESHOLD):
+        """Whether `thumbnail` is close enough to the last inferred frame to reuse its result."""
+        if self.landmarks is None or self.thumbnail is None or self.skipped_in_row >= MAX_SKIPPED_FRAMES:
+            return False
+        if thumbnail.shape != self.thumbnail.shape:
+            return False
+        return cv2.absdiff(thumbnail, self.thumbnail).mean() / 255.0 < threshold
+
+    def mark_skipped(self):
+        self.reused = True
+        self.skipped_in_row += 1
+        self.skipped += 1
+
+    def update(self, thumbnail, landmarks, timestamp=None):
+        """Record an inferred frame; returns the smoothed landmarks (or None)."""
+        self.reused = False
+        self.skipped_in_row = 0
+        self.inferred += 1
+        self.thumbnail = thumbnail
+        self.feedback = None
+        if landmarks is None:
+            self.landmarks = None
+            self.filter.reset()
+            return None
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        smoothed = landmarks.copy()
+        smoothed[:, :3] = self.filter(landmarks[:, :3], time.monotonic() if timestamp is None else timestamp)
+        self.landmarks = smoothed
+        return smoothed
+
+
+class LiveSessions:
+    """Registry of LiveSession objects with idle eviction."""
+
+    def __init__(self, idle_timeout=60.0):
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, s in self._sessions.items() if now - s.last_used > self.idle_timeout]:
+                del self._sessions[key]
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = LiveSession()
+            session.last_used = now
+            return session
+
+    def release(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+        inferred = sum(s.inferred for s in sessions)
+        skipped = sum(s.skipped for s in sessions)
+        return {
+            'sessions': len(sessions),
+            'inferred': inferred,
+            'skipped': skipped,
+            'skip_ratio': round(skipped / (inferred + skipped), 3) if inferred + skipped else 0.0,
+            'roi_crop_frames': sum(s.roi.crop_frames for s in sessions),
+            'roi_fallbacks': sum(s.roi.fallbacks for s in sessions)
+        }
+
+
+sessions = LiveSessions()
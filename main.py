@@ -5,8 +5,14 @@ import logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# The app is only created when run as a script: analysis job and shard
+# processes are spawned, which re-imports this module as __mp_main__.
+# Gunicorn loads it from wsgi.py.
 if __name__ == "__main__":
     app = create_app()
+    if app.config["MODEL_WARMUP"]:
+        import warmup
+        warmup.warm_worker(background=True)
     logger.info("Starting Flask application with Socket.IO...")
     logger.info("Access the application at: http://localhost:8080 or http://127.0.0.1:8080")
     socketio.run(app, host="0.0.0.0", port=8080, debug=True, allow_unsafe_werkzeug=True)
@@ -0,0 +1,51 @@
+import logging
+
+from sqlalchemy import inspect, text
+
+logger = logging.getLogger(__name__)
+
+# Columns added to existing tables after their first release.
+# db.create_all() only creates missing tables, so databases created by an
+# older version of the app need these applied explicitly.
+# Each entry is (table name, column name, column DDL).
+ADDED_COLUMNS = [
+    ('video_analysis', 'status', "VARCHAR(20) DEFAULT 'completed'"),
+    ('video_analysis', 'landmarks_file', 'VARCHAR(255)'),
+    ('video_analysis', 'report', 'TEXT'),
+    ('video_analysis', 'report_version', 'VARCHAR(32)'),
+    ('video_analysis', 'report_history_key', 'VARCHAR(128)'),
+    ('video_analysis', 'content_hash', 'VARCHAR(64)'),
+    ('video_analysis', 'analysis_key', 'VARCHAR(64)'),
+    ('video_analysis', 'summary', 'TEXT'),
+]
+
+
+def upgrade_database(db):
+    """Bring an existing database schema up to date with the models.
+
+    Safe to run on every startup: only missing columns and indexes are added.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with db.engine.begin() as connection:
+        for table, column, ddl in ADDED_COLUMNS:
+            if table not in existing_tables:
+                continue
+            columns = {c['name'] for c in inspector.get_columns(table)}
+            if column in columns:
+                continue
+            connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+            logger.info(f"Added column {table}.{column}")
+
+        # Indexes declared on the models (index=True or __table_args__) that
+        # tables created by an older version lack
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            indexes = {i['name'] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in indexes:
+                    continue
+                index.create(connection)
+                logger.info(f"Created index {index.name} on {table.name}")
@@ -1,3 +1,4 @@
+import json
 from datetime import datetime
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -15,7 +16,8 @@ class User(UserMixin, db.Model):
     # Relationships
     profile = db.relationship('UserProfile', backref='user', uselist=False)
     training_logs = db.relationship('TrainingLog', backref='user')
-    video_analyses = db.relationship('VideoAnalysis', backref='user')
+    # A query, so list views can filter and pick columns instead of loading every analysis
+    video_analyses = db.relationship('VideoAnalysis', backref='user', lazy='dynamic')
     progress_entries = db.relationship('Progress', backref='user')
     
     def set_password(self, password):
@@ -59,15 +61,42 @@ class TrainingLog(db.Model):
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Dashboard and injury risk: a user's most recent logs
+        db.Index('ix_training_log_user_date', 'user_id', 'date'),
+    )
+
 class VideoAnalysis(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     sport_id = db.Column(db.Integer, db.ForeignKey('sport.id'), nullable=False)
     filename = db.Column(db.String(255), nullable=False)
-    result = db.Column(db.Text)  # JSON string of analysis results
+    # result and report can be large; they are only loaded when accessed
+    result = db.deferred(db.Column(db.Text))  # JSON string of analysis results
+    status = db.Column(db.String(20), default='completed')  # pending, running, completed, failed, cancelled
+    landmarks_file = db.Column(db.String(255))  # per-frame landmarks saved next to the upload (see landmark_store)
+    report = db.deferred(db.Column(db.Text))  # JSON feedback and injury risk shown on the analysis page
+    report_version = db.Column(db.String(32))  # analysis.ANALYZER_VERSION that produced the report
+    report_history_key = db.Column(db.String(128))  # training history fingerprint the report was based on
+    content_hash = db.Column(db.String(64), index=True)  # SHA-256 of the uploaded video (see video_store)
+    analysis_key = db.Column(db.String(64), index=True)  # content hash + analyzer version + sampling options
+    summary = db.Column(db.Text)  # small JSON for list views: duration, frame counts, risk level
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Dashboard: a user's most recent analyses
+        db.Index('ix_video_analysis_user_timestamp', 'user_id', 'timestamp'),
+    )
+
+    @property
+    def summary_data(self):
+        return json.loads(self.summary) if self.summary else {}
+
+    def update_summary(self, **fields):
+        """Merge fields into the summary shown in list views."""
+        self.summary = json.dumps(dict(self.summary_data, **fields))
+
 class Progress(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -78,3 +107,10 @@ class Progress(db.Model):
     date = db.Column(db.DateTime, nullable=False)
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Progress page: all of a user's entries, newest first
+        db.Index('ix_progress_user_date', 'user_id', 'date'),
+        # Progress chart: one metric of one sport, oldest first
+        db.Index('ix_progress_user_sport_metric_date', 'user_id', 'sport_id', 'metric_name', 'date'),
+    )
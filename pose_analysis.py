@@ -1,14 +1,18 @@
-import cv2
-import mediapipe as mp
 import numpy as np
-import base64
 from typing import Tuple, Optional
 
+from providers import cv2
+from providers import mediapipe as mp
+import inference_config
+from frame_encoder import EncodedFrame, DEFAULT_TIER, timings
+from pose_frame import PoseFrame, PoseLandmark
+
 class PoseAnalyzer:
     def __init__(self):
         self.camera = None
         self.pose = None
         self.is_analyzing = False
+        self.last_frame = None
         
     def init_camera(self) -> bool:
         """Initialize the camera with optimal settings."""
@@ -30,11 +34,7 @@ class PoseAnalyzer:
             
     def init_pose_detector(self):
         """Initialize MediaPipe Pose detector."""
-        self.pose = mp.solutions.pose.Pose(
-            model_complexity=1,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        self.pose = inference_config.create_pose('camera')
         
     def process_frame(self, frame: np.ndarray) -> Tuple[np.ndarray, dict]:
         """Process a single frame for pose detection and analysis."""
@@ -45,7 +45,8 @@ class PoseAnalyzer:
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         
         # Process the frame
-        results = self.pose.process(rgb_frame)
+        with timings.time('inference'):
+            results = self.pose.process(rgb_frame)
         
         # Initialize feedback dictionary
         feedback = {
@@ -56,22 +57,14 @@ class PoseAnalyzer:
         
         # Draw pose landmarks if detected
         if results.pose_landmarks:
-            # Convert landmarks to list of coordinates
-            landmarks = []
-            for landmark in results.pose_landmarks.landmark:
-                landmarks.append({
-                    'x': landmark.x,
-                    'y': landmark.y,
-                    'z': landmark.z,
-                    'visibility': landmark.visibility
-                })
-            feedback['landmarks'] = landmarks
+            pose = PoseFrame.from_mediapipe(results.pose_landmarks)
+            feedback['landmarks'] = pose
             
             # Draw skeleton
             self._draw_skeleton(frame, results.pose_landmarks)
             
             # Analyze posture
-            self._analyze_posture(frame, results.pose_landmarks, feedback)
+            self._analyze_posture(frame, pose, feedback)
             
         return frame, feedback
         
@@ -87,13 +80,13 @@ class PoseAnalyzer:
             landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style()
         )
         
-    def _analyze_posture(self, frame: np.ndarray, landmarks, feedback: dict):
+    def _analyze_posture(self, frame: np.ndarray, pose: PoseFrame, feedback: dict):
         """Analyze posture and provide feedback."""
         # Get key points
-        left_shoulder = landmarks.landmark[mp.solutions.pose.PoseLandmark.LEFT_SHOULDER]
-        right_shoulder = landmarks.landmark[mp.solutions.pose.PoseLandmark.RIGHT_SHOULDER]
-        left_hip = landmarks.landmark[mp.solutions.pose.PoseLandmark.LEFT_HIP]
-        right_hip = landmarks.landmark[mp.solutions.pose.PoseLandmark.RIGHT_HIP]
+        left_shoulder = pose[PoseLandmark.LEFT_SHOULDER]
+        right_shoulder = pose[PoseLandmark.RIGHT_SHOULDER]
+        left_hip = pose[PoseLandmark.LEFT_HIP]
+        right_hip = pose[PoseLandmark.RIGHT_HIP]
         
         # Calculate shoulder and hip angles
         shoulder_angle = self._calculate_angle(left_shoulder, right_shoulder)
@@ -113,8 +106,8 @@ class PoseAnalyzer:
         angle = np.arctan2(point2.y - point1.y, point2.x - point1.x) * 180 / np.pi
         return abs(angle)
         
-    def get_frame(self) -> Optional[Tuple[bool, bytes]]:
-        """Get a frame from the camera and convert it to base64."""
+    def get_frame(self, tier: str = DEFAULT_TIER) -> Optional[Tuple[bool, str]]:
+        """Get a frame from the camera as base64 JPEG at the given quality tier."""
         if not self.camera or not self.camera.isOpened():
             return None
             
@@ -126,11 +119,9 @@ class PoseAnalyzer:
         if self.is_analyzing:
             frame, _ = self.process_frame(frame)
             
-        # Convert frame to base64
-        _, buffer = cv2.imencode('.jpg', frame)
-        frame_base64 = base64.b64encode(buffer).decode('utf-8')
-        
-        return ret, frame_base64
+        # Encode once; the frame is also kept for other consumers
+        self.last_frame = EncodedFrame(frame)
+        return ret, self.last_frame.base64(tier)
         
     def start_analysis(self):
         """Start the pose analysis."""
@@ -0,0 +1,176 @@
+"""
+Compact landmark type shared by the live and video pipelines.
+
+A PoseFrame holds one detected pose as a float32 array of shape (33, 4)
+(x, y, z, visibility per MediaPipe landmark). It is built once from the
+MediaPipe output, and analyzers read it through the array or through
+named accessors such as `pose[PoseLandmark.LEFT_HIP].y`. No dict or
+object is allocated per landmark. `pose.batch` is the (1, 33, 4) view
+expected by pose_metrics, so a live frame goes through the same
+vectorized code as a whole video.
+
+For the wire, `to_json` gives nested [x, y, z, v] lists, `to_dicts` gives
+the {x, y, z, visibility} objects the browser draws from, and
+`to_bytes`/`from_bytes` use the raw 528-byte float32 buffer.
+"""
+from enum import IntEnum
+
+import numpy as np
+
+from landmark_store import NUM_LANDMARKS, FIELDS
+
+
+class PoseLandmark(IntEnum):
+    """MediaPipe pose landmark indices."""
+    NOSE = 0
+    LEFT_EYE_INNER = 1
+    LEFT_EYE = 2
+    LEFT_EYE_OUTER = 3
+    RIGHT_EYE_INNER = 4
+    RIGHT_EYE = 5
+    RIGHT_EYE_OUTER = 6
+    LEFT_EAR = 7
+    RIGHT_EAR = 8
+    MOUTH_LEFT = 9
+    MOUTH_RIGHT = 10
+    LEFT_SHOULDER = 11
+    RIGHT_SHOULDER = 12
+    LEFT_ELBOW = 13
+    RIGHT_ELBOW = 14
+    LEFT_WRIST = 15
+    RIGHT_WRIST = 16
+    LEFT_PINKY = 17
+    RIGHT_PINKY = 18
+    LEFT_INDEX = 19
+    RIGHT_INDEX = 20
+    LEFT_THUMB = 21
+    RIGHT_THUMB = 22
+    LEFT_HIP = 23
+    RIGHT_HIP = 24
+    LEFT_KNEE = 25
+    RIGHT_KNEE = 26
+    LEFT_ANKLE = 27
+    RIGHT_ANKLE = 28
+    LEFT_HEEL = 29
+    RIGHT_HEEL = 30
+    LEFT_FOOT_INDEX = 31
+    RIGHT_FOOT_INDEX = 32
+
+
+def landmarks_array(pose_landmarks):
+    """Convert MediaPipe landmarks (a NormalizedLandmarkList or its
+    .landmark sequence) to a (33, 4) float32 array."""
+    points = getattr(pose_landmarks, 'landmark', pose_landmarks)
+    return np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in points], dtype=np.float32)
+
+
+class Landmark:
+    """Read-only view of one landmark row of a PoseFrame."""
+    __slots__ = ('_row',)
+
+    def __init__(self, row):
+        self._row = row
+
+    x = property(lambda self: float(self._row[0]))
+    y = property(lambda self: float(self._row[1]))
+    z = property(lambda self: float(self._row[2]))
+    visibility = property(lambda self: float(self._row[3]))
+
+    def __getitem__(self, key):
+        # Positional ([0] is x) and legacy dict-style (['x']) access
+        if isinstance(key, str):
+            return float(self._row[FIELDS.index(key)])
+        return float(self._row[key])
+
+    def __repr__(self):
+        return f"Landmark(x={self.x:.4f}, y={self.y:.4f}, z={self.z:.4f}, visibility={self.visibility:.3f})"
+
+
+class PoseFrame:
+    __slots__ = ('data', 'frame_index')
+
+    def __init__(self, data, frame_index=None):
+        """
+        Args:
+            data: (33, 4) array-like of x, y, z, visibility
+            frame_index: Index of the source video frame, if any
+        """
+        data = np.asarray(data, dtype=np.float32)
+        if data.shape != (NUM_LANDMARKS, len(FIELDS)):
+            raise ValueError(f"Expected landmarks of shape (33, 4), got {data.shape}")
+        self.data = data
+        self.frame_index = frame_index
+
+    @classmethod
+    def from_mediapipe(cls, pose_landmarks, frame_index=None):
+        """Build from MediaPipe results.pose_landmarks (None gives None)."""
+        if pose_landmarks is None:
+            return None
+        return cls(landmarks_array(pose_landmarks), frame_index)
+
+    @classmethod
+    def coerce(cls, landmarks):
+        """Build from any landmark representation used in the app.
+
+        Accepts a PoseFrame, a (33, 4) array, MediaPipe landmarks, or a
+        list of [x, y, z, v] rows or {x, y, z, visibility} dicts (e.g. from
+        the browser). Returns None for empty input.
+        """
+        if landmarks is None or isinstance(landmarks, PoseFrame):
+            return landmarks
+        if isinstance(landmarks, np.ndarray):
+            return cls(landmarks)
+        if hasattr(landmarks, 'landmark'):
+            return cls.from_mediapipe(landmarks)
+        landmarks = list(landmarks)
+        if not landmarks:
+            return None
+        first = landmarks[0]
+        if isinstance(first, dict):
+            rows = [[lm.get(field, 0.0) for field in FIELDS] for lm in landmarks[:NUM_LANDMARKS]]
+        elif hasattr(first, 'x'):
+            return cls(landmarks_array(landmarks[:NUM_LANDMARKS]))
+        else:
+            rows = landmarks[:NUM_LANDMARKS]
+        return cls(rows)
+
+    @classmethod
+    def from_bytes(cls, data, frame_index=None):
+        """Inverse of to_bytes; the array is a view on `data`."""
+        return cls(np.frombuffer(data, dtype=np.float32).reshape(NUM_LANDMARKS, len(FIELDS)), frame_index)
+
+    def __getitem__(self, index):
+        return Landmark(self.data[index])
+
+    def __len__(self):
+        return NUM_LANDMARKS
+
+    def __iter__(self):
+        return (Landmark(row) for row in self.data)
+
+    @property
+    def xy(self):
+        return self.data[:, :2]
+
+    @property
+    def visibility(self):
+        return self.data[:, 3]
+
+    @property
+    def batch(self):
+        """(1, 33, 4) view for the batched pose_metrics functions."""
+        return self.data[np.newaxis]
+
+    def to_json(self, decimals=4):
+        """Nested [x, y, z, visibility] lists, rounded for compact JSON."""
+        return np.round(self.data.astype(np.float64), decimals).tolist()
+
+    def to_dicts(self, decimals=4):
+        """{x, y, z, visibility} objects as used by the browser skeleton drawing."""
+        return [dict(zip(FIELDS, row)) for row in self.to_json(decimals)]
+
+    def to_bytes(self):
+        return self.data.tobytes()
+
+    def __repr__(self):
+        return f"PoseFrame(frame_index={self.frame_index})"
@@ -0,0 +1,116 @@
+"""
+Batched pose metrics.
+
+Every function takes a landmark array of shape (frames, 33, 4) holding
+x, y, z, visibility per MediaPipe landmark and computes its metric for all
+frames at once, so whole-clip statistics cost a handful of NumPy
+operations instead of a Python loop with small per-frame arrays.
+A single live frame is simply an array of shape (1, 33, 4).
+"""
+import numpy as np
+
+from landmark_store import pose_data_to_arrays, empty_landmarks, NUM_LANDMARKS
+
+# MediaPipe pose landmark indices used by the metrics
+NOSE = 0
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_ELBOW, RIGHT_ELBOW = 13, 14
+LEFT_WRIST, RIGHT_WRIST = 15, 16
+LEFT_HIP, RIGHT_HIP = 23, 24
+LEFT_KNEE, RIGHT_KNEE = 25, 26
+LEFT_ANKLE, RIGHT_ANKLE = 27, 28
+
+
+def as_landmark_array(pose_data):
+    """Return (frame indices, (N, 33, 4) float array) for any stored pose format.
+
+    Accepts an analysis result holding either compact arrays
+    ('frame_indices' and 'landmarks') or the legacy 'pose_data' mapping of
+    frame index to landmark dicts; frames with fewer than 33 landmarks are
+    dropped.
+    """
+    if not pose_data:
+        return empty_landmarks()
+    if 'landmarks' in pose_data:
+        return np.asarray(pose_data['frame_indices']), np.asarray(pose_data['landmarks'])
+    frames = {k: v for k, v in (pose_data.get('pose_data') or {}).items() if len(v) >= NUM_LANDMARKS}
+    return pose_data_to_arrays(frames)
+
+
+def angle_between(u, v):
+    """Angle in degrees between vectors u and v along the last axis."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cosine = np.einsum('...i,...i->...', u, v) / (np.linalg.norm(u, axis=-1) * np.linalg.norm(v, axis=-1))
+    return np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+
+
+def joint_angle(landmarks, a, b, c, dims=2):
+    """Angle at joint b formed by segments b->a and b->c, for every frame."""
+    points = landmarks[:, :, :dims]
+    return angle_between(points[:, a] - points[:, b], points[:, c] - points[:, b])
+
+
+def segment_flexion(landmarks, a, b, c, dims=2):
+    """Angle between consecutive segments a->b and b->c (0 when they are in line)."""
+    points = landmarks[:, :, :dims]
+    return angle_between(points[:, a] - points[:, b], points[:, b] - points[:, c])
+
+
+def segment_tilt(landmarks, a, b):
+    """Angle in degrees of the line from landmark a to b relative to horizontal."""
+    delta = landmarks[:, b, :2] - landmarks[:, a, :2]
+    return np.degrees(np.arctan2(delta[:, 1], delta[:, 0]))
+
+
+def vertical_offset(landmarks, a, b):
+    """y of landmark a minus y of landmark b (positive when a is lower in the image)."""
+    return landmarks[:, a, 1] - landmarks[:, b, 1]
+
+
+def distance(landmarks, a, b, dims=2):
+    """Distance between landmarks a and b, per frame."""
+    return np.linalg.norm(landmarks[:, a, :dims] - landmarks[:, b, :dims], axis=-1)
+
+
+def hip_height(landmarks):
+    """Mean vertical position of both hips, per frame."""
+    return (landmarks[:, LEFT_HIP, 1] + landmarks[:, RIGHT_HIP, 1]) / 2
+
+
+def hip_oscillation(landmarks):
+    """Standard deviation of hip height across frames (vertical bounce)."""
+    if len(landmarks) == 0:
+        return 0.0
+    return float(np.std(hip_height(landmarks)))
+
+
+def asymmetry(left, right):
+    """Absolute left/right difference of a per-frame metric."""
+    return np.abs(np.asarray(right) - np.asarray(left))
+
+
+def knee_angles(landmarks, dims=2):
+    """Knee angles (left, right) in degrees, per frame."""
+    return (joint_angle(landmarks, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE, dims),
+            joint_angle(landmarks, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE, dims))
+
+
+def badminton_metrics(landmarks):
+    """Wrist, knee and shoulder/hip rotation metrics used by the badminton analysis."""
+    left_knee, right_knee = knee_angles(landmarks)
+    return {
+        'wrist_angles': {
+            'right': segment_flexion(landmarks, RIGHT_WRIST, RIGHT_ELBOW, RIGHT_SHOULDER),
+            'left': segment_flexion(landmarks, LEFT_WRIST, LEFT_ELBOW, LEFT_SHOULDER)
+        },
+        'knee_angles': {'right': right_knee, 'left': left_knee},
+        'shoulder_rotation': segment_tilt(landmarks, LEFT_SHOULDER, RIGHT_SHOULDER),
+        'hip_rotation': segment_tilt(landmarks, LEFT_HIP, RIGHT_HIP)
+    }
+
+
+def posture_alignment(landmarks, tolerance=10):
+    """Per-frame flag: shoulder and hip lines within `tolerance` degrees of parallel."""
+    tilt_diff = np.abs(segment_tilt(landmarks, LEFT_SHOULDER, RIGHT_SHOULDER) -
+                       segment_tilt(landmarks, LEFT_HIP, RIGHT_HIP))
+    return tilt_diff < tolerance
@@ -0,0 +1,189 @@
+"""
+Pool of MediaPipe Pose instances for live analysis.
+
+A Pose instance in tracking mode carries state from one frame to the next
+and is not safe to share between threads, so concurrent live sessions
+need separate instances. The pool hands out instances with session
+affinity: a session keeps getting the same instance, and with it its
+temporal tracking, for as long as it stays active. Instances are created
+on demand up to the pool size; when all are bound, the least recently used
+idle one is reassigned. An instance handed to a different session than the
+one it last tracked is reset first, so the new session never starts from
+another athlete's pose. Bindings unused for longer than `idle_timeout` are
+dropped and their instances closed to free memory.
+"""
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no Pose instance became available in time."""
+
+
+class _Slot:
+    __slots__ = ('pose', 'session_id', 'tracked_session', 'in_use', 'last_used')
+
+    def __init__(self):
+        self.pose = None
+        self.session_id = None
+        # Session whose frames the pose's tracking state comes from
+        self.tracked_session = None
+        self.in_use = False
+        self.last_used = 0.0
+
+
+class PosePool:
+    def __init__(self, factory, size=None, idle_timeout=60.0, checkout_timeout=5.0):
+        """
+        Args:
+            factory: Callable returning a new Pose instance
+            size: Maximum number of instances (defaults to the CPU count)
+            idle_timeout: Seconds after which an unused session binding is evicted
+            checkout_timeout: Default seconds to wait for an instance
+        """
+        self.factory = factory
+        self.size = size or os.cpu_count() or 1
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self._slots = [_Slot() for _ in range(self.size)]
+        self._sessions = {}  # session_id -> _Slot
+        self._cond = threading.Condition()
+
+        # Metrics
+        self._checkouts = 0
+        self._timeouts = 0
+        self._reassignments = 0
+        self._resets = 0
+        self._evictions = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._recent_waits = deque(maxlen=1000)
+
+    @contextmanager
+    def checkout(self, session_id, timeout=None):
+        """Borrow the Pose instance bound to `session_id` for the duration of the block."""
+        slot = self._acquire(session_id, self.checkout_timeout if timeout is None else timeout)
+        try:
+            if slot.pose is None:
+                slot.pose = self.factory()
+            elif slot.tracked_session != session_id:
+                # The slot is checked out, so this runs outside the lock
+                slot.pose.reset()
+                with self._cond:
+                    self._resets += 1
+            slot.tracked_session = session_id
+            yield slot.pose
+        finally:
+            self._release(slot)
+
+    def _acquire(self, session_id, timeout):
+        start = time.monotonic()
+        deadline = start + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._evict_idle(now)
+                slot = self._find_slot(session_id)
+                if slot is not None:
+                    slot.in_use = True
+                    self._record_wait(now - start)
+                    return slot
+                if now >= deadline:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"No pose detector available after {timeout:.1f}s")
+                self._cond.wait(deadline - now)
+
+    def _find_slot(self, session_id):
+        slot = self._sessions.get(session_id)
+        if slot is not None:
+            # Keep affinity even if the session's own previous frame is still running
+            return None if slot.in_use else slot
+
+        free = [s for s in self._slots if not s.in_use]
+        if not free:
+            return None
+        # Prefer an unbound instance that already exists, then an unbound empty slot,
+        # then take over the least recently used session's instance
+        unbound = [s for s in free if s.session_id is None]
+        if unbound:
+            slot = max(unbound, key=lambda s: s.pose is not None)
+        else:
+            slot = min(free, key=lambda s: s.last_used)
+            del self._sessions[slot.session_id]
+            self._reassignments += 1
+        slot.session_id = session_id
+        self._sessions[session_id] = slot
+        return slot
+
+    def _release(self, slot):
+        with self._cond:
+            slot.in_use = False
+            slot.last_used = time.monotonic()
+            self._cond.notify_all()
+
+    def _evict_idle(self, now):
+        for slot in self._slots:
+            if slot.in_use or slot.session_id is None or now - slot.last_used < self.idle_timeout:
+                continue
+            del self._sessions[slot.session_id]
+            slot.session_id = None
+            self._evictions += 1
+            if slot.pose is not None:
+                try:
+                    slot.pose.close()
+                except Exception as e:
+                    logger.error(f"Error closing pose detector: {str(e)}")
+                slot.pose = None
+
+    def _record_wait(self, wait):
+        self._checkouts += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+        self._recent_waits.append(wait)
+
+    def release_session(self, session_id):
+        """Drop a session's binding, e.g. when its client disconnects."""
+        with self._cond:
+            slot = self._sessions.pop(session_id, None)
+            if slot is not None:
+                slot.session_id = None
+                self._cond.notify_all()
+
+    def stats(self):
+        """Pool utilisation and checkout wait-time metrics."""
+        with self._cond:
+            self._evict_idle(time.monotonic())
+            waits = sorted(self._recent_waits)
+            p95 = waits[int(0.95 * (len(waits) - 1))] if waits else 0.0
+            return {
+                'size': self.size,
+                'instances': sum(1 for s in self._slots if s.pose is not None),
+                'in_use': sum(1 for s in self._slots if s.in_use),
+                'sessions': len(self._sessions),
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'reassignments': self._reassignments,
+                'resets': self._resets,
+                'evictions': self._evictions,
+                'wait_ms': {
+                    'mean': 1000 * self._total_wait / self._checkouts if self._checkouts else 0.0,
+                    'p95': 1000 * p95,
+                    'max': 1000 * self._max_wait
+                }
+            }
+
+    def close(self):
+        with self._cond:
+            for slot in self._slots:
+                if slot.pose is not None and not slot.in_use:
+                    slot.pose.close()
+                    slot.pose = None
+            self._sessions.clear()
+            for slot in self._slots:
+                slot.session_id = None
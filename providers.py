@@ -0,0 +1,83 @@
+"""
+Lazily imported vision/ML dependencies.
+
+OpenCV and MediaPipe take most of a worker's start-up time and memory,
+yet most requests (login, dashboard, training log) never touch them.
+Modules import them from here instead of directly:
+
+    from providers import cv2
+    from providers import mediapipe as mp
+
+The names are placeholders that import the real module on first
+attribute access (e.g. cv2.imdecode), so merely importing routes or
+analysis stays cheap. preload() imports everything up front, for
+servers that prefer to pay the cost before forking workers.
+"""
+import time
+import logging
+import importlib
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class LazyModule:
+    """Placeholder for a module that is imported on first attribute access."""
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+        self.__dict__['_lock'] = threading.Lock()
+        self.__dict__['import_seconds'] = None
+
+    def load(self):
+        """Import the module now (if not already) and return it."""
+        module = self._module
+        if module is None:
+            with self._lock:
+                module = self._module
+                if module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    self.__dict__['import_seconds'] = time.perf_counter() - start
+                    self.__dict__['_module'] = module
+                    logger.info(f"Imported {self._name} in {self.import_seconds:.2f}s")
+        return module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        value = getattr(self.load(), attr)
+        # Cache on the instance so later lookups skip __getattr__
+        self.__dict__[attr] = value
+        return value
+
+    def __setattr__(self, attr, value):
+        setattr(self.load(), attr, value)
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+cv2 = LazyModule('cv2')
+mediapipe = LazyModule('mediapipe')
+
+PROVIDERS = {'cv2': cv2, 'mediapipe': mediapipe}
+
+
+def preload(names=None):
+    """Import the given providers (default: all) and return their import times."""
+    timings = {}
+    for name in names or PROVIDERS:
+        PROVIDERS[name].load()
+        timings[name] = PROVIDERS[name].import_seconds
+    return timings
+
+
+def stats():
+    """Which providers are loaded and how long their import took."""
+    return {name: {'loaded': module.loaded, 'import_seconds': module.import_seconds}
+            for name, module in PROVIDERS.items()}
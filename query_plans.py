@@ -0,0 +1,151 @@
+"""
+Query plan checks for the per-user history queries.
+
+The pages every user loads repeatedly filter their own rows by user_id
+(plus sport and metric) and order them by date. On a table of all users'
+rows, these queries must be answered by searching an index on their
+filter columns: a full scan of the table (or of an index) or a sort of
+the user's rows would grow with the size of the table.
+
+    flask --app main check-query-plans
+
+runs EXPLAIN QUERY PLAN (SQLite) or EXPLAIN (PostgreSQL, with sequential
+scans disabled so the check works on small tables) for each query in
+HOT_QUERIES against the configured database. It prints the plans and
+exits with status 1 if any query does not search an index of its table,
+scans a table or index, or sorts rows without an index. Keep HOT_QUERIES
+in step with the queries in routes and analysis.
+"""
+import re
+import sys
+import json
+
+import click
+from sqlalchemy import text
+from sqlalchemy.orm import load_only, joinedload
+
+from models import db, TrainingLog, VideoAnalysis, Progress, UserProfile
+
+# Placeholder values; plans do not depend on them
+USER_ID = 1
+SPORT_ID = 1
+METRIC_NAME = 'speed'
+
+# Query name -> (table whose index must be searched, query builder)
+HOT_QUERIES = {
+    'dashboard: recent analyses': ('video_analysis', lambda: VideoAnalysis.query.filter_by(user_id=USER_ID)
+        .options(load_only(VideoAnalysis.id, VideoAnalysis.status, VideoAnalysis.summary, VideoAnalysis.timestamp),
+                 joinedload(VideoAnalysis.sport))
+        .order_by(VideoAnalysis.timestamp.desc()).limit(5)),
+    'dashboard: recent training logs': ('training_log', lambda: TrainingLog.query.filter_by(user_id=USER_ID)
+        .options(joinedload(TrainingLog.sport)).order_by(TrainingLog.date.desc()).limit(5)),
+    'progress: entries': ('progress', lambda: Progress.query.filter_by(user_id=USER_ID)
+        .order_by(Progress.date.desc())),
+    'progress_chart: metric series': ('progress', lambda: Progress.query.filter_by(
+        user_id=USER_ID, sport_id=SPORT_ID, metric_name=METRIC_NAME).order_by(Progress.date.asc())),
+    'predict_injury_risk: last logs': ('training_log', lambda: TrainingLog.query.filter_by(user_id=USER_ID)
+        .order_by(TrainingLog.date.desc()).limit(10)),
+    'predict_injury_risk: profile': ('user_profile', lambda: UserProfile.query.filter_by(user_id=USER_ID)),
+    'training_history_key: log summary': ('training_log', lambda: db.session.query(
+        db.func.count(TrainingLog.id), db.func.max(TrainingLog.id), db.func.max(TrainingLog.created_at)
+    ).filter(TrainingLog.user_id == USER_ID)),
+    'cached_result: analysis by key': ('video_analysis', lambda: VideoAnalysis.query
+        .filter_by(analysis_key='0' * 64, status='completed')
+        .filter(VideoAnalysis.result.isnot(None)).order_by(VideoAnalysis.id.desc()).limit(1)),
+    'active_analysis: in-flight analysis by key': ('video_analysis', lambda: VideoAnalysis.query
+        .filter(VideoAnalysis.analysis_key == '0' * 64, VideoAnalysis.status.in_(('pending', 'running')))
+        .order_by(VideoAnalysis.id).limit(1)),
+}
+
+
+def _sql(query):
+    return str(query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+
+
+def _sqlite_plan(connection, sql, table):
+    """Plan lines and problems from EXPLAIN QUERY PLAN."""
+    lines = [row[-1] for row in connection.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+    problems = []
+    for line in lines:
+        # "SCAN t" reads the whole table and "SCAN t USING [COVERING] INDEX i"
+        # the whole index; only "SEARCH" looks up a key prefix
+        if line.startswith('SCAN '):
+            problems.append(f'full scan: {line}')
+        if 'USE TEMP B-TREE' in line:
+            problems.append(f'sort without index: {line}')
+    search = re.compile(rf'SEARCH {table} USING (COVERING )?INDEX ')
+    if not any(search.match(line) for line in lines):
+        problems.append(f'no index search on {table}')
+    return lines, problems
+
+
+def _postgres_plan(connection, sql, table):
+    """Plan lines and problems from EXPLAIN (FORMAT JSON)."""
+    connection.execute(text('SET LOCAL enable_seqscan = off'))
+    plan = connection.execute(text(f'EXPLAIN (FORMAT JSON) {sql}')).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    lines, problems = [], []
+    searched = set()
+
+    def walk(node, depth):
+        line = f"{'  ' * depth}{node['Node Type']}"
+        if 'Relation Name' in node:
+            line += f" on {node['Relation Name']}"
+        if 'Index Name' in node:
+            line += f" using {node['Index Name']}"
+        lines.append(line)
+        if node['Node Type'] == 'Seq Scan':
+            problems.append(f'table scan: {line.strip()}')
+        if node['Node Type'] in ('Sort', 'Incremental Sort'):
+            problems.append(f'sort without index: {line.strip()}')
+        # With sequential scans disabled, a full index scan shows up as an
+        # index scan without an index condition
+        if node['Node Type'] in ('Index Scan', 'Index Only Scan') and 'Index Cond' in node:
+            searched.add(node['Relation Name'])
+        if node['Node Type'] == 'Bitmap Heap Scan' and any(
+                'Index Cond' in child for child in node.get('Plans', [])):
+            searched.add(node['Relation Name'])
+        for child in node.get('Plans', []):
+            walk(child, depth + 1)
+
+    walk(plan[0]['Plan'], 0)
+    if table not in searched:
+        problems.append(f'no index search on {table}')
+    return lines, problems
+
+
+def check_query_plans():
+    """Explain every hot query.
+
+    Returns:
+        List of (name, plan lines, problems) tuples; a query is fine when
+        its problems list is empty
+    """
+    explain = {'sqlite': _sqlite_plan, 'postgresql': _postgres_plan}.get(db.engine.dialect.name)
+    if explain is None:
+        raise RuntimeError(f"Query plan checks are not implemented for {db.engine.dialect.name}")
+    results = []
+    for name, (table, build) in HOT_QUERIES.items():
+        with db.engine.connect() as connection:
+            with connection.begin():
+                lines, problems = explain(connection, _sql(build()), table)
+        results.append((name, lines, problems))
+    return results
+
+
+def init_app(app):
+    @app.cli.command('check-query-plans')
+    def check_query_plans_command():
+        """Fail if a per-user history query is not served by an index."""
+        results = check_query_plans()
+        for name, lines, problems in results:
+            click.echo(f"{'FAIL' if problems else 'ok':>4}  {name}")
+            for line in lines:
+                click.echo(f"        {line}")
+            for problem in problems:
+                click.echo(f"        -> {problem}")
+        failed = sum(1 for _, _, problems in results if problems)
+        click.echo(f"\n{len(results) - failed} of {len(results)} queries search an index")
+        if failed:
+            sys.exit(1)
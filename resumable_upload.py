@@ -0,0 +1,222 @@
+"""
+Resumable chunked video uploads (the core of the tus protocol).
+
+1. POST /uploads with the total length, file name and sport creates an
+   upload and returns its id.
+2. PATCH /uploads/<id> appends the request body at the offset given in
+   the Upload-Offset header. An optional "Upload-Checksum: sha256 <base64>"
+   header is verified before the chunk is accepted.
+3. HEAD /uploads/<id> returns the current offset, so an interrupted
+   upload continues where it stopped instead of starting over.
+4. POST /uploads/<id>/finalize checks the size (and the whole-file SHA-256
+   if one was declared), moves the file to content-addressed storage (see
+   video_store) and starts the analysis.
+
+Chunks are copied from the request stream to the partial file in small
+pieces, so neither a chunk nor the file is ever held in memory, and a
+worker is only busy for the duration of one chunk. Upload state lives
+next to the partial file on disk, so any worker process can serve any
+request of an upload.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import fcntl
+import base64
+import hashlib
+import logging
+
+from video_store import CHUNK_SIZE, file_extension, store_file
+
+logger = logging.getLogger(__name__)
+
+# Directory inside the upload folder holding uploads in progress
+PARTIAL_DIR = '.partial'
+
+# Largest video accepted through a resumable upload
+MAX_UPLOAD_SIZE = 2 * 1024 * 1024 * 1024
+
+# Unfinished uploads older than this (seconds) are removed
+UPLOAD_EXPIRY = 24 * 3600
+
+ALLOWED_EXTENSIONS = {'.mp4', '.mov', '.avi', '.webm'}
+
+_UPLOAD_ID = re.compile(r'[0-9a-f]{32}')
+
+
+class UploadError(Exception):
+    """A resumable upload request that cannot be served, with its HTTP status."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_checksum(header):
+    """Digest bytes from an "sha256 <base64>" Upload-Checksum header (None if absent)."""
+    if not header:
+        return None
+    algorithm, _, value = header.strip().partition(' ')
+    if algorithm.lower() != 'sha256':
+        raise UploadError(f"Unsupported checksum algorithm '{algorithm}'")
+    try:
+        return base64.b64decode(value.strip(), validate=True)
+    except ValueError:
+        raise UploadError("Malformed Upload-Checksum header")
+
+
+class ResumableUploads:
+    """Uploads in progress, stored as <id>.part and <id>.json files."""
+
+    def __init__(self, upload_folder, max_size=MAX_UPLOAD_SIZE, expiry=UPLOAD_EXPIRY):
+        self.upload_folder = upload_folder
+        self.directory = os.path.join(upload_folder, PARTIAL_DIR)
+        self.max_size = max_size
+        self.expiry = expiry
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _paths(self, upload_id):
+        if not _UPLOAD_ID.fullmatch(upload_id or ''):
+            raise UploadError("Upload not found", 404)
+        base = os.path.join(self.directory, upload_id)
+        return base + '.part', base + '.json'
+
+    def create(self, user_id, length, filename, metadata=None, checksum=None):
+        """Start an upload of `length` bytes.
+
+        Args:
+            user_id: Owner; other users cannot see or modify the upload
+            length: Total size of the file in bytes
+            filename: Client file name, used for its extension only
+            metadata: JSON-serializable data returned by get() (e.g. the sport)
+            checksum: Optional hex SHA-256 of the whole file, checked on finalize
+
+        Returns:
+            The upload's state dict, including its 'id' and current 'offset'
+        """
+        self._expire()
+        try:
+            length = int(length)
+        except (TypeError, ValueError):
+            raise UploadError("Upload length is required")
+        if length <= 0:
+            raise UploadError("Upload length must be positive")
+        if length > self.max_size:
+            raise UploadError(f"Uploads are limited to {self.max_size // (1024 * 1024)} MB", 413)
+        ext = file_extension(filename)
+        if ext not in ALLOWED_EXTENSIONS:
+            raise UploadError("Videos only!")
+        if checksum is not None and not re.fullmatch(r'[0-9a-fA-F]{64}', checksum):
+            raise UploadError("checksum must be a hex SHA-256 digest")
+
+        info = {
+            'id': uuid.uuid4().hex,
+            'user_id': user_id,
+            'length': length,
+            'ext': ext,
+            'metadata': metadata or {},
+            'checksum': checksum.lower() if checksum else None,
+            'created_at': time.time()
+        }
+        part_path, info_path = self._paths(info['id'])
+        open(part_path, 'wb').close()
+        with open(info_path, 'w') as f:
+            json.dump(info, f)
+        return dict(info, offset=0)
+
+    def get(self, upload_id, user_id):
+        """State of an upload owned by `user_id`, with its current 'offset'."""
+        part_path, info_path = self._paths(upload_id)
+        try:
+            with open(info_path) as f:
+                info = json.load(f)
+            offset = os.path.getsize(part_path)
+        except (OSError, ValueError):
+            raise UploadError("Upload not found", 404)
+        if info['user_id'] != user_id:
+            raise UploadError("Upload not found", 404)
+        return dict(info, offset=offset)
+
+    def append(self, upload_id, user_id, offset, stream, checksum=None):
+        """Write a chunk read from `stream` at `offset`.
+
+        The offset must equal the bytes received so far. When `checksum`
+        (raw SHA-256 digest of the chunk) is given and does not match, the
+        chunk is discarded. Returns the new offset.
+        """
+        info = self.get(upload_id, user_id)
+        try:
+            offset = int(offset)
+        except (TypeError, ValueError):
+            raise UploadError("Upload-Offset header is required")
+        part_path, _ = self._paths(upload_id)
+
+        with open(part_path, 'r+b') as f:
+            # One writer per upload, also across worker processes
+            fcntl.flock(f, fcntl.LOCK_EX)
+            size = f.seek(0, os.SEEK_END)
+            if offset != size:
+                raise UploadError(f"Upload is at offset {size}", 409)
+
+            hasher = hashlib.sha256()
+            remaining = info['length'] - size
+            try:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if len(chunk) > remaining:
+                        raise UploadError("Chunk exceeds the declared upload length", 413)
+                    f.write(chunk)
+                    hasher.update(chunk)
+                    remaining -= len(chunk)
+                if checksum is not None and hasher.digest() != checksum:
+                    raise UploadError("Checksum mismatch", 460)
+            except UploadError:
+                f.truncate(size)
+                raise
+            return f.tell()
+
+    def finalize(self, upload_id, user_id):
+        """Verify a complete upload and move it to content-addressed storage.
+
+        Returns:
+            Tuple of (content hash, stored file name, upload state)
+        """
+        info = self.get(upload_id, user_id)
+        if info['offset'] != info['length']:
+            raise UploadError(f"Upload incomplete: {info['offset']} of {info['length']} bytes", 409)
+        part_path, info_path = self._paths(upload_id)
+
+        hasher = hashlib.sha256()
+        with open(part_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                hasher.update(chunk)
+        content_hash = hasher.hexdigest()
+        if info['checksum'] and info['checksum'] != content_hash:
+            self.delete(upload_id, user_id)
+            raise UploadError("Checksum mismatch", 460)
+
+        filename = store_file(part_path, content_hash, self.upload_folder, info['ext'])
+        os.remove(info_path)
+        return content_hash, filename, info
+
+    def delete(self, upload_id, user_id):
+        """Abandon an upload and remove its data."""
+        self.get(upload_id, user_id)
+        for path in self._paths(upload_id):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _expire(self):
+        cutoff = time.time() - self.expiry
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    logger.info(f"Removed expired upload file {name}")
+            except OSError:
+                pass
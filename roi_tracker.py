@@ -0,0 +1,154 @@
+"""
+Region-of-interest cropping for live pose detection.
+
+After a confident detection, the next frames are cropped to the athlete's
+bounding box plus a margin before they are handed to MediaPipe. On wide
+court shots where the athlete covers a small part of the frame this
+means less colour conversion and a larger, easier to detect person in
+the model input. Landmarks are mapped back to full-frame normalized
+coordinates, so callers never see the crop. When the crop yields no
+detection, or a low-confidence one, the same frame is re-run on the full
+image and tracking starts over.
+
+The crop is kept fixed while the athlete stays well inside it. This
+avoids moving the image under MediaPipe's own frame-to-frame tracking on
+every frame.
+"""
+import numpy as np
+
+from providers import cv2
+from pose_frame import landmarks_array
+
+# Landmarks whose visibility decides whether a crop detection is trusted
+# (shoulders and hips)
+CONFIDENCE_LANDMARKS = [11, 12, 23, 24]
+
+
+class RoiTracker:
+    def __init__(self, margin=0.25, min_size=0.2, min_visibility=0.5, max_area=0.8,
+                 visible_threshold=0.5):
+        """
+        Args:
+            margin: Padding around the pose bounding box, as a fraction of
+                its larger side
+            min_size: Smallest crop side, as a fraction of the frame side
+            min_visibility: Mean visibility of shoulders/hips below which a
+                crop detection falls back to the full frame
+            max_area: Crops covering more than this fraction of the frame
+                are not worth it; the full frame is used instead
+            visible_threshold: Landmark visibility needed to count toward
+                the bounding box
+        """
+        self.margin = margin
+        self.min_size = min_size
+        self.min_visibility = min_visibility
+        self.max_area = max_area
+        self.visible_threshold = visible_threshold
+        self.region = None  # (x0, y0, x1, y1) in pixels, or None for full frame
+        self.crop_frames = 0
+        self.full_frames = 0
+        self.fallbacks = 0
+
+    def reset(self):
+        self.region = None
+
+    def confident(self, landmarks):
+        """Whether an (33, 4) landmark array is a trustworthy detection."""
+        return landmarks is not None and float(np.mean(landmarks[CONFIDENCE_LANDMARKS, 3])) >= self.min_visibility
+
+    def _target_region(self, landmarks, width, height):
+        visible = landmarks[landmarks[:, 3] >= self.visible_threshold]
+        if len(visible) < 4:
+            return None
+        x_min, y_min = visible[:, 0].min() * width, visible[:, 1].min() * height
+        x_max, y_max = visible[:, 0].max() * width, visible[:, 1].max() * height
+
+        pad = self.margin * max(x_max - x_min, y_max - y_min)
+        cx, cy = (x_min + x_max) / 2, (y_min + y_max) / 2
+        half_w = max((x_max - x_min) / 2 + pad, self.min_size * width / 2)
+        half_h = max((y_max - y_min) / 2 + pad, self.min_size * height / 2)
+
+        x0, x1 = int(max(0, cx - half_w)), int(min(width, cx + half_w))
+        y0, y1 = int(max(0, cy - half_h)), int(min(height, cy + half_h))
+        if (x1 - x0) * (y1 - y0) > self.max_area * width * height:
+            return None
+        return x0, y0, x1, y1
+
+    def _still_fits(self, landmarks, width, height):
+        """Whether the visible landmarks stay inside the inner part of the current region."""
+        x0, y0, x1, y1 = self.region
+        inset_x, inset_y = 0.05 * (x1 - x0), 0.05 * (y1 - y0)
+        visible = landmarks[landmarks[:, 3] >= self.visible_threshold]
+        if len(visible) == 0:
+            return False
+        xs, ys = visible[:, 0] * width, visible[:, 1] * height
+        return (xs.min() >= x0 + inset_x and xs.max() <= x1 - inset_x and
+                ys.min() >= y0 + inset_y and ys.max() <= y1 - inset_y)
+
+    def update(self, landmarks, frame_shape):
+        """Choose the crop for the next frame from full-frame normalized landmarks."""
+        if not self.confident(landmarks):
+            self.region = None
+            return
+        height, width = frame_shape[:2]
+        if self.region is not None and self._still_fits(landmarks, width, height):
+            return
+        self.region = self._target_region(landmarks, width, height)
+
+    def _run(self, pose, frame, region):
+        if region is None:
+            image = frame
+        else:
+            x0, y0, x1, y1 = region
+            image = frame[y0:y1, x0:x1]
+        results = pose.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        if not results.pose_landmarks:
+            return results, None
+        if region is not None:
+            self._remap(results, region, frame.shape)
+        return results, landmarks_array(results.pose_landmarks)
+
+    @staticmethod
+    def _remap(results, region, frame_shape):
+        """Convert crop-normalized results to full-frame normalized, in place."""
+        x0, y0, x1, y1 = region
+        height, width = frame_shape[:2]
+        scale_x, scale_y = (x1 - x0) / width, (y1 - y0) / height
+        offset_x, offset_y = x0 / width, y0 / height
+        for lm in results.pose_landmarks.landmark:
+            lm.x = lm.x * scale_x + offset_x
+            lm.y = lm.y * scale_y + offset_y
+            # z shares the scale of x
+            lm.z = lm.z * scale_x
+
+        mask = getattr(results, 'segmentation_mask', None)
+        if mask is not None:
+            full = np.zeros((height, width), dtype=mask.dtype)
+            full[y0:y1, x0:x1] = mask
+            results.segmentation_mask = full
+
+    def process(self, pose, frame):
+        """Run `pose` on the tracked region of a BGR frame.
+
+        Returns:
+            (results, landmarks): the MediaPipe results with landmarks in
+            full-frame normalized coordinates, and the same landmarks as an
+            (33, 4) array (None when no pose was found)
+        """
+        region = self.region
+        results, landmarks = self._run(pose, frame, region)
+        if region is not None:
+            if self.confident(landmarks):
+                self.crop_frames += 1
+            else:
+                # Lost the athlete or detection got unreliable: look at the whole frame
+                self.fallbacks += 1
+                results, landmarks = self._run(pose, frame, None)
+                self.full_frames += 1
+        else:
+            self.full_frames += 1
+        self.update(landmarks, frame.shape)
+        return results, landmarks
+
+    def stats(self):
+        return {'crop_frames': self.crop_frames, 'full_frames': self.full_frames, 'fallbacks': self.fallbacks}
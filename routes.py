@@ -1,37 +1,45 @@
 import os
 import json
 import logging
-import threading
-import time
 import base64
 import numpy as np
 from datetime import datetime
 from flask import render_template, redirect, url_for, flash, request, jsonify, session, Response, Blueprint, current_app
 from flask_login import login_user, logout_user, current_user, login_required
-from werkzeug.utils import secure_filename
-from werkzeug.exceptions import RequestEntityTooLarge
-from werkzeug.security import generate_password_hash, check_password_hash
-import cv2
-import mediapipe as mp
-from multiprocessing import Pool
-import hashlib
+from sqlalchemy.orm import load_only, joinedload
+import atexit
+import uuid
 
+import providers
+import inference_config
+from providers import cv2
 from models import db, User, UserProfile, TrainingLog, VideoAnalysis, Sport, Progress
 from forms import LoginForm, RegisterForm, ProfileForm, TrainingLogForm, VideoUploadForm, ProgressForm
-from pose_estimation import process_live_video, init_pose_detector, cleanup, analyze_pose
-from analysis import analyze_movement, predict_injury_risk, analyze_video
-
-# Initialize MediaPipe Pose
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(
-    static_image_mode=False,
-    model_complexity=1,
-    min_detection_confidence=0.3,
-    min_tracking_confidence=0.3
-)
-
-# Initialize process pool
-pool = Pool(processes=1)
+from pose_estimation import init_pose_detector
+from analysis import build_report, result_summary, training_history_key, ANALYZER_VERSION
+from jobs import (enqueue_analysis, analysis_options, get_queue, job_status, waiting_status, release_waiting,
+                  ACTIVE_STATES)
+from landmark_store import load_landmarks
+from pose_pool import PosePool, PoolTimeout
+import live_stream
+from camera_stream import CameraStream
+from frame_encoder import TIERS, timings as encode_timings
+import live_tracking
+from live_tracking import frame_thumbnail
+from pose_frame import PoseFrame
+import rules
+import kinematics
+import video_store
+from resumable_upload import ResumableUploads, UploadError, parse_checksum
+
+# Pool of MediaPipe Pose instances for live analysis, one per concurrent
+# session up to the number of cores. Each live session keeps its own
+# instance so tracking state is never shared between users. Instances
+# (and MediaPipe itself) are only loaded once a live session starts.
+def create_live_pose():
+    return inference_config.create_pose('live')
+
+pose_pool = PosePool(create_live_pose)
 
 # Set up logging
 logging.basicConfig(
@@ -40,284 +48,79 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Global camera variables
-camera = None
-camera_lock = threading.Lock()
-camera_failed_attempts = 0
-MAX_CAMERA_ATTEMPTS = 3
-
-def init_camera():
-    """Initialize the camera with proper locking."""
-    global camera, camera_failed_attempts
-    
-    with camera_lock:
-        try:
-            # Release existing camera if it exists
-            if camera is not None:
-                camera.release()
-                
-            # Reset camera on too many failed attempts
-            if camera_failed_attempts >= MAX_CAMERA_ATTEMPTS:
-                logger.warning("Too many failed camera attempts, waiting before retry")
-                time.sleep(2)  # Add a delay before trying again
-                camera_failed_attempts = 0
-                
-            # Create new camera object
-            camera = cv2.VideoCapture(0)
-            
-            # Test camera by reading a frame
-            if not camera.isOpened():
-                logger.error("Failed to open camera")
-                camera_failed_attempts += 1
-                return False
-                
-            success, test_frame = camera.read()
-            if not success or test_frame is None:
-                logger.error("Failed initial camera frame read")
-                camera_failed_attempts += 1
-                return False
-                
-            # Camera is working
-            camera_failed_attempts = 0
-            logger.info("Camera initialized successfully")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error initializing camera: {str(e)}")
-            camera_failed_attempts += 1
-            return False
-
-def release_camera():
-    """Safely release the camera."""
-    global camera
-    
-    with camera_lock:
-        try:
-            if camera is not None:
-                camera.release()
-                camera = None
-                logger.info("Camera released")
-        except Exception as e:
-            logger.error(f"Error releasing camera: {str(e)}")
+routes = Blueprint('routes', __name__)
 
-def get_frame():
-    """Get the current frame from the camera with proper error handling."""
-    global camera
-    
-    with camera_lock:
-        try:
-            if camera is None or not camera.isOpened():
-                logger.warning("Camera not initialized, attempting to initialize")
-                if not init_camera():
-                    return None
-            
-            success, frame = camera.read()
-            if not success or frame is None:
-                logger.warning("Failed to read frame, attempting to reinitialize camera")
-                if not init_camera():
-                    return None
-                    
-                # Try one more time after reinitialization
-                success, frame = camera.read()
-                if not success or frame is None:
-                    logger.error("Failed to read frame after reinitialization")
-                    return None
-            
-            return frame
-            
-        except Exception as e:
-            logger.error(f"Error in get_frame: {str(e)}")
-            return None
+def process_live_video(frame, session_id='default'):
+    """Process a single video frame for pose detection.
 
-routes = Blueprint('routes', __name__)
+    A frame that barely differs from the session's last inferred frame
+    reuses that frame's landmarks without running MediaPipe. Otherwise
+    detection runs on the region around the athlete's previous position
+    (see roi_tracker) and the landmarks are smoothed with the session's
+    One-Euro filter.
 
-def process_live_video(frame):
-    """Process a single video frame for pose detection."""
+    Returns:
+        PoseFrame, or None when no pose was detected
+    """
+    tracking = live_tracking.sessions.get(session_id)
     try:
-        # Convert the BGR image to RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # Process the frame with MediaPipe
-        results = pose.process(rgb_frame)
-        
-        # If no pose detection results, return None
-        if not results.pose_landmarks:
-            return None
-        
-        # Extract landmarks
-        landmarks = []
-        for landmark in results.pose_landmarks.landmark:
-            # Store normalized coordinates
-            landmarks.append([landmark.x, landmark.y, landmark.z, landmark.visibility])
-        
-        # Log movement to help with debugging
-        if hasattr(process_live_video, "prev_landmarks") and process_live_video.prev_landmarks is not None:
-            # Calculate movement from previous frame
-            movement = 0
-            for i in range(min(len(landmarks), len(process_live_video.prev_landmarks))):
-                movement += sum((landmarks[i][j] - process_live_video.prev_landmarks[i][j])**2 for j in range(2))
-            
-            logger.debug(f"Movement detected: {movement:.6f}")
+        with tracking.lock:
+            thumbnail = frame_thumbnail(frame)
+            if tracking.should_skip(thumbnail):
+                tracking.mark_skipped()
+                return PoseFrame(tracking.landmarks)
             
-            # If very little movement, consider using previous feedback
-            if movement < 0.0001:  # Very small movement threshold
-                logger.debug("Minimal movement detected")
+            # Process the region around the athlete with the session's MediaPipe instance
+            with pose_pool.checkout(session_id) as pose, encode_timings.time('inference'):
+                _, landmarks = tracking.roi.process(pose, frame)
             
-        # Store current landmarks for next comparison
-        process_live_video.prev_landmarks = landmarks
-        
-        return landmarks
+            smoothed = tracking.update(thumbnail, landmarks)
+            return None if smoothed is None else PoseFrame(smoothed)
         
+    except PoolTimeout:
+        raise
     except Exception as e:
         logger.error(f"Error in process_live_video: {str(e)}")
         return None
 
-def analyze_posture(landmarks, sport='general'):
-    """Analyze posture based on sport-specific criteria using pose landmarks."""
-    feedback = []
+def analyze_live_frame(frame, sport='general', session_id='default'):
+    """Detect the pose in a live frame and build the feedback sent to the browser.
+
+    Returns a dict with 'landmarks', 'feedback' and 'metrics' (joint angles
+    from kinematics.frame_metrics), or with 'error' when no pose was found.
+    Raises PoolTimeout when no pose detector is available.
+    """
+    tracking = live_tracking.sessions.get(session_id)
+    pose = process_live_video(frame, session_id=session_id)
+    if pose is None:
+        return {'error': 'No pose detected'}
     
-    if sport == 'badminton':
-        # Check if person is standing or sitting by looking at hip/knee relationship
-        left_hip = landmarks[23]  # Left hip landmark
-        left_knee = landmarks[25]  # Left knee landmark
-        right_hip = landmarks[24]  # Right hip landmark
-        right_knee = landmarks[26]  # Right knee landmark
-        
-        # Calculate vertical difference between hips and knees
-        hip_knee_diff = ((left_hip[1] - left_knee[1]) + (right_hip[1] - right_knee[1])) / 2
-        
-        # Sitting detection - if knees are roughly at same height as hips
-        if abs(hip_knee_diff) < 0.1:  # Small vertical difference means sitting
-            feedback.append(("You appear to be sitting. Stand up for proper badminton stance.", "red"))
-            return feedback  # Return early with sitting feedback
-        
-        # Check shoulder position for badminton
-        left_shoulder = landmarks[11]
-        right_shoulder = landmarks[12]
-        
-        # Check for shoulder alignment/rotation appropriate for badminton
-        shoulder_alignment = abs(left_shoulder[1] - right_shoulder[1])
-        if shoulder_alignment < 0.05:  # Shoulders are level - good for badminton ready position
-            feedback.append(("Good shoulder position for badminton stance.", "green"))
-        else:
-            feedback.append(("Keep shoulders level for better balance.", "yellow"))
-        
-        # Check elbow position for power shots
-        left_elbow = landmarks[13]
-        right_elbow = landmarks[14]
-        left_wrist = landmarks[15]
-        right_wrist = landmarks[16]
-        
-        # Check if arms are in a proper position for badminton
-        elbow_wrist_distance = ((left_elbow[0] - left_wrist[0])**2 + (left_elbow[1] - left_wrist[1])**2)**0.5
-        if 0.1 < elbow_wrist_distance < 0.3:  # Example range for proper elbow flexion
-            feedback.append(("Good elbow position for power shots.", "green"))
-        else:
-            feedback.append(("Adjust elbow angle for better shot control.", "yellow"))
-            
-        # Check knee bend - important for badminton ready stance
-        left_ankle = landmarks[27]
-        right_ankle = landmarks[28]
-        knee_ankle_diff = ((left_knee[1] - left_ankle[1]) + (right_knee[1] - right_ankle[1])) / 2
-        
-        if knee_ankle_diff > 0.15:  # Knees are bent appropriately
-            feedback.append(("Good knee bend for quick movement.", "green"))
-        else:
-            feedback.append(("Bend knees more for better court movement.", "yellow"))
-    
-    # Add more sports conditions here...
-    elif sport == 'tennis':
-        # Tennis-specific posture analysis
-        pass
+    # Normalized 0-1 coordinates in the format the browser draws from
+    formatted_landmarks = pose.to_dicts()
     
-    # Return at least one feedback item if none were generated
-    if not feedback:
-        feedback.append(("Stand in proper position for posture analysis.", "yellow"))
+    # Unchanged landmarks give unchanged feedback
+    if tracking.reused and tracking.feedback is not None and tracking.feedback[0] == sport:
+        feedback, metrics = tracking.feedback[1]
+        return {'feedback': feedback, 'metrics': metrics, 'landmarks': formatted_landmarks, 'reused': True}
     
-    return feedback
-
-def calculate_shoulder_angle(landmarks):
-    """Calculate the angle between shoulders and hips."""
-    # Implementation details...
-    return 90  # Placeholder
-
-def calculate_elbow_angle(landmarks):
-    """Calculate the angle at the elbow."""
-    # Implementation details...
-    return 120  # Placeholder
-
-def calculate_knee_angle(landmarks):
-    """Calculate the angle at the knee."""
-    # Implementation details...
-    return 150  # Placeholder
-
-def calculate_hip_angle(landmarks):
-    """Calculate the angle at the hip."""
-    # Implementation details...
-    return 170  # Placeholder
-
-def calculate_stride_length(landmarks):
-    """Calculate the stride length."""
-    # Implementation details...
-    return 0.8  # Placeholder
-
-def calculate_arm_swing(landmarks):
-    """Calculate the arm swing angle."""
-    # Implementation details...
-    return 60  # Placeholder
-
-def calculate_spine_angle(landmarks):
-    """Calculate the spine angle."""
-    # Implementation details...
-    return 175  # Placeholder
-
-def check_shoulder_alignment(landmarks):
-    """Check if shoulders are level."""
-    # Implementation details...
-    return True  # Placeholder
-
-def generate_frames():
-    """Generate video frames with pose analysis."""
-    camera = cv2.VideoCapture(0)
-    if not camera.isOpened():
-        logger.error("Failed to open camera")
-        return
+    formatted_feedback = rules.frame_feedback(sport, pose)
+    metrics = kinematics.frame_metrics(pose)
+    tracking.feedback = (sport, (formatted_feedback, metrics))
     
-    try:
-        while True:
-            success, frame = camera.read()
-            if not success:
-                logger.error("Failed to read frame from camera")
-                break
-            
-            try:
-                # Process the frame
-                landmarks = process_live_video(frame)
-                
-                # Draw landmarks on the frame
-                if landmarks:
-                    # Convert landmarks to MediaPipe format for drawing
-                    pose_landmarks = mp.solutions.pose.PoseLandmark
-                    for landmark in landmarks:
-                        x = int(landmark['x'] * frame.shape[1])
-                        y = int(landmark['y'] * frame.shape[0])
-                        cv2.circle(frame, (x, y), 5, (0, 255, 0), -1)
-                
-                # Encode the frame
-                ret, buffer = cv2.imencode('.jpg', frame)
-                if not ret:
-                    logger.error("Failed to encode frame")
-                    continue
-                frame = buffer.tobytes()
-                
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-            except Exception as e:
-                logger.error(f"Error processing frame: {str(e)}")
-                continue
-    finally:
-        camera.release()
-        logger.info("Camera released")
+    return {'feedback': formatted_feedback, 'metrics': metrics, 'landmarks': formatted_landmarks}
+
+def annotate_camera_frame(frame):
+    """Detect the pose in a server camera frame and draw its landmarks."""
+    pose = process_live_video(frame, session_id='camera')
+    if pose is not None:
+        height, width = frame.shape[:2]
+        for x, y in pose.xy:
+            cv2.circle(frame, (int(x * width), int(y * height)), 5, (0, 255, 0), -1)
+    return frame, pose
+
+# Server camera shared by every /video_feed viewer and /analyze_posture
+camera_stream = CameraStream(source=0, process=annotate_camera_frame)
+atexit.register(camera_stream.stop)
 
 def register_routes(app):
     # Home page
@@ -379,11 +182,16 @@ def register_routes(app):
     @login_required
     def dashboard():
         # Get user's recent analyses and training logs
-        recent_analyses = VideoAnalysis.query.filter_by(user_id=current_user.id)\
+        # Only the columns the cards show; never the result or report
+        recent_analyses = current_user.video_analyses\
+            .options(load_only(VideoAnalysis.id, VideoAnalysis.status, VideoAnalysis.summary,
+                               VideoAnalysis.timestamp),
+                     joinedload(VideoAnalysis.sport))\
             .order_by(VideoAnalysis.timestamp.desc())\
             .limit(5).all()
         
         recent_logs = TrainingLog.query.filter_by(user_id=current_user.id)\
+            .options(joinedload(TrainingLog.sport))\
             .order_by(TrainingLog.date.desc())\
             .limit(5).all()
         
@@ -400,8 +208,8 @@ def register_routes(app):
             ])
         
         return render_template('dashboard.html',
-                             recent_analyses=recent_analyses,
-                             recent_logs=recent_logs,
+                             analyses=recent_analyses,
+                             logs=recent_logs,
                              profile_complete=profile_complete)
 
     # Profile route
@@ -480,6 +288,65 @@ def register_routes(app):
         
         return render_template('training_log.html', form=form)
 
+    def start_analysis(content_hash, filename, sport_id):
+        """Create the VideoAnalysis for a stored upload and queue it.
+
+        A completed analysis of the same clip with the same settings is
+        reused instead of queueing the video again. If that analysis is
+        still pending or running (e.g. a retried upload), the new one
+        waits for it instead; see jobs.release_waiting.
+
+        Returns:
+            Tuple of (VideoAnalysis, whether a cached result was reused)
+        """
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        key = video_store.analysis_key(content_hash, analysis_options(current_app), ANALYZER_VERSION)
+        sport = db.session.get(Sport, sport_id)
+        
+        # Record a pending analysis; the video is processed in the background
+        analysis = VideoAnalysis(
+            user_id=current_user.id,
+            sport_id=sport_id,
+            filename=filename,
+            content_hash=content_hash,
+            analysis_key=key,
+            status='pending',
+            timestamp=datetime.utcnow()
+        )
+        
+        # The same clip analyzed with the same settings: reuse the result
+        cached = video_store.cached_result(key, sport.name if sport else None, upload_folder)
+        if cached is not None:
+            analysis.status = 'completed'
+            analysis.result = json.dumps(cached)
+            analysis.landmarks_file = cached.get('landmarks_file')
+            analysis.update_summary(**result_summary(cached))
+        
+        db.session.add(analysis)
+        db.session.commit()
+        
+        if cached is None:
+            # Checked after the commit, so an analysis that finishes in the
+            # meantime either sees this row waiting or is seen as finished
+            leader = video_store.active_analysis(key, exclude_id=analysis.id)
+            if leader is None:
+                enqueue_analysis(current_app, analysis, os.path.join(upload_folder, filename))
+            else:
+                current_app.logger.info(f"Analysis {analysis.id} waits for analysis {leader.id} of the same clip")
+        return analysis, cached is not None
+
+    def analysis_job_status(analysis):
+        """Status of an analysis' job, or of the analysis it waits for."""
+        queue = get_queue(current_app)
+        job = queue.get_for_analysis(analysis.id)
+        if job is not None:
+            return job_status(job)
+        leader = None
+        if analysis.status in ACTIVE_STATES and analysis.analysis_key:
+            leader = video_store.active_analysis(analysis.analysis_key, exclude_id=analysis.id)
+        leader_job = queue.get_for_analysis(leader.id) if leader else None
+        return waiting_status(analysis.id, analysis.status or 'completed', leader_job)
+
     # Video upload route
     @app.route('/upload', methods=['GET', 'POST'])
     @login_required
@@ -490,28 +357,14 @@ def register_routes(app):
         
         if form.validate_on_submit():
             try:
-                # Save the uploaded file
-                video_file = form.video.data
-                filename = secure_filename(video_file.filename)
-                filepath = os.path.join(current_app.static_folder, 'uploads', filename)
-                video_file.save(filepath)
-                
-                # Analyze the video
-                analysis_results = analyze_video(filepath)
-                
-                # Create new analysis record
-                analysis = VideoAnalysis(
-                    user_id=current_user.id,
-                    sport_id=form.sport.data,
-                    filename=filename,
-                    result=json.dumps(analysis_results),
-                    timestamp=datetime.utcnow()
-                )
+                # Stream the upload to content-addressed storage
+                content_hash, filename, _ = video_store.save_upload(form.video.data, current_app.config['UPLOAD_FOLDER'])
+                analysis, cached = start_analysis(content_hash, filename, form.sport.data)
                 
-                db.session.add(analysis)
-                db.session.commit()
-                
-                flash('Video uploaded and analyzed successfully!', 'success')
+                if cached:
+                    flash('This video was analyzed before, showing the saved results.', 'success')
+                else:
+                    flash('Video uploaded! Analysis is running in the background.', 'success')
                 return redirect(url_for('analysis', analysis_id=analysis.id))
                 
             except Exception as e:
@@ -522,6 +375,71 @@ def register_routes(app):
         
         return render_template('upload.html', form=form)
 
+    # Resumable chunked uploads for large videos (see resumable_upload)
+    def resumable_uploads():
+        return ResumableUploads(current_app.config['UPLOAD_FOLDER'])
+
+    def upload_response(info, status=200):
+        response = jsonify({'upload_id': info['id'], 'offset': info['offset'], 'length': info['length'],
+                            'location': url_for('resumable_upload', upload_id=info['id'])})
+        response.status_code = status
+        response.headers['Upload-Offset'] = str(info['offset'])
+        response.headers['Upload-Length'] = str(info['length'])
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    @app.route('/uploads', methods=['POST'])
+    @login_required
+    def create_upload():
+        data = request.get_json(silent=True) or {}
+        sport_id = data.get('sport_id')
+        if not isinstance(sport_id, int) or db.session.get(Sport, sport_id) is None:
+            return jsonify({'error': 'Unknown sport'}), 400
+        try:
+            info = resumable_uploads().create(current_user.id, data.get('length'), data.get('filename'),
+                                              metadata={'sport_id': sport_id}, checksum=data.get('checksum'))
+        except UploadError as e:
+            return jsonify({'error': str(e)}), e.status
+        response = upload_response(info, 201)
+        response.headers['Location'] = url_for('resumable_upload', upload_id=info['id'])
+        return response
+
+    @app.route('/uploads/<upload_id>', methods=['HEAD', 'GET', 'PATCH', 'DELETE'])
+    @login_required
+    def resumable_upload(upload_id):
+        uploads = resumable_uploads()
+        try:
+            if request.method == 'PATCH':
+                # The body is read straight from the request stream, never buffered whole
+                checksum = parse_checksum(request.headers.get('Upload-Checksum'))
+                uploads.append(upload_id, current_user.id, request.headers.get('Upload-Offset'),
+                               request.stream, checksum)
+            elif request.method == 'DELETE':
+                uploads.delete(upload_id, current_user.id)
+                return '', 204
+            return upload_response(uploads.get(upload_id, current_user.id))
+        except UploadError as e:
+            return jsonify({'error': str(e)}), e.status
+
+    @app.route('/uploads/<upload_id>/finalize', methods=['POST'])
+    @login_required
+    def finalize_upload(upload_id):
+        try:
+            content_hash, filename, info = resumable_uploads().finalize(upload_id, current_user.id)
+        except UploadError as e:
+            return jsonify({'error': str(e)}), e.status
+        try:
+            analysis, cached = start_analysis(content_hash, filename, info['metadata']['sport_id'])
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error starting analysis: {str(e)}")
+            return jsonify({'error': 'Error processing video'}), 500
+        return jsonify({
+            'analysis_id': analysis.id,
+            'cached': cached,
+            'url': url_for('analysis', analysis_id=analysis.id)
+        }), 201
+
     # Analysis route
     @app.route('/analysis/<int:analysis_id>')
     @login_required
@@ -536,46 +454,48 @@ def register_routes(app):
             video_path = os.path.join('uploads', analysis.filename)
             video_url = url_for('static', filename=video_path)
             
-            # Parse the analysis data
-            analysis_data = json.loads(analysis.result)
-            
-            # Get sport name
-            sport = Sport.query.get(analysis.sport_id)
-            
-            # Analyze movement and get feedback
-            feedback_text, recommendations = analyze_movement(analysis_data, sport.name)
-            
-            # Predict injury risk
-            injury_risk = predict_injury_risk(analysis_data, current_user.id, sport.name)
-            
-            # Define injury risk recommendations
-            INJURY_RECOMMENDATIONS = {
-                'Low': 'Your form looks good! Keep up the good work and maintain proper technique.',
-                'Medium': 'Some areas need attention. Focus on improving your form to reduce injury risk.',
-                'High': 'Significant risk detected. Please consult with a coach or trainer to improve your technique.'
-            }
-            
-            # Structure the data for the template
-            result = {
-                'feedback': [
-                    {
-                        'status': 'good',
-                        'message': feedback_text
-                    }
-                ],
-                'injury_risk': {
-                    'risk_level': injury_risk.lower(),
-                    'risk_percentage': 15 if injury_risk == 'Low' else 50 if injury_risk == 'Medium' else 85,
-                    'message': INJURY_RECOMMENDATIONS.get(injury_risk, 'No specific recommendations available.'),
-                    'recommendations': recommendations.split('\n') if recommendations else []
-                }
-            }
+            # Show progress while the background job has not finished
+            if analysis.status and analysis.status != 'completed':
+                return render_template('analysis.html',
+                                     analysis=analysis,
+                                     video_url=video_url,
+                                     job=analysis_job_status(analysis))
+            
+            # Serve the stored report unless the analyzer or the user's
+            # training history changed since it was generated
+            history_key = training_history_key(current_user.id)
+            if (analysis.report and analysis.report_version == ANALYZER_VERSION
+                    and analysis.report_history_key == history_key):
+                report = json.loads(analysis.report)
+            else:
+                # Parse the analysis data
+                analysis_data = json.loads(analysis.result)
+                if analysis.landmarks_file:
+                    # Landmarks live in a memory-mapped binary file next to the upload
+                    frame_indices, landmarks = load_landmarks(
+                        os.path.join(current_app.config['UPLOAD_FOLDER'], analysis.landmarks_file))
+                    analysis_data['frame_indices'] = frame_indices
+                    analysis_data['landmarks'] = landmarks
+                
+                report = build_report(analysis_data, current_user.id, analysis.sport.name)
+                
+                analysis.report = json.dumps(report)
+                analysis.report_version = ANALYZER_VERSION
+                analysis.report_history_key = history_key
+                # Rows analyzed before summaries existed get one here
+                analysis.update_summary(**result_summary(analysis_data))
+                db.session.commit()
             
-            # Update the analysis result with the structured data
-            analysis.result = json.dumps(result)
+            # The risk level depends on the training history, so it is
+            # only known once a report has been built
+            risk_level = report['injury_risk']['risk_level']
+            if analysis.summary_data.get('risk_level') != risk_level:
+                analysis.update_summary(risk_level=risk_level)
+                db.session.commit()
             
             return render_template('analysis.html', 
                                  analysis=analysis,
+                                 report=report,
                                  video_url=video_url)
                              
         except Exception as e:
@@ -583,6 +503,43 @@ def register_routes(app):
             flash('Error displaying analysis. Please try again.', 'error')
             return redirect(url_for('index'))
 
+    # Background analysis status route
+    @app.route('/analysis/<int:analysis_id>/status')
+    @login_required
+    def analysis_status(analysis_id):
+        analysis = VideoAnalysis.query.get_or_404(analysis_id)
+        if analysis.user_id != current_user.id:
+            return jsonify({'error': 'Forbidden'}), 403
+        
+        return jsonify(analysis_job_status(analysis))
+
+    # Cancel a queued or running analysis
+    @app.route('/analysis/<int:analysis_id>/cancel', methods=['POST'])
+    @login_required
+    def cancel_analysis(analysis_id):
+        analysis = VideoAnalysis.query.get_or_404(analysis_id)
+        if analysis.user_id != current_user.id:
+            return jsonify({'error': 'Forbidden'}), 403
+        
+        queue = get_queue(current_app)
+        job = queue.get_for_analysis(analysis.id)
+        if job is None:
+            # Waiting for another analysis of the same clip
+            if analysis.status not in ACTIVE_STATES:
+                return jsonify({'error': 'Analysis is not running'}), 409
+            analysis.status = 'cancelled'
+            db.session.commit()
+            return jsonify(waiting_status(analysis.id, analysis.status))
+        if job['status'] not in ACTIVE_STATES:
+            return jsonify({'error': 'Analysis is not running'}), 409
+        
+        status = queue.request_cancel(job['id'])
+        if status == 'cancelled':
+            analysis.status = 'cancelled'
+            db.session.commit()
+            release_waiting(current_app, analysis)
+        return jsonify(job_status(queue.get(job['id'])))
+
     # Progress route
     @app.route('/progress', methods=['GET', 'POST'])
     @login_required
@@ -642,7 +599,8 @@ def register_routes(app):
     @login_required
     def video_feed():
         """Stream video feed with pose analysis."""
-        return Response(generate_frames(),
+        tier = request.args.get('quality')
+        return Response(camera_stream.mjpeg(tier if tier in TIERS else None),
                        mimetype='multipart/x-mixed-replace; boundary=frame')
 
     # Live analysis route
@@ -660,38 +618,10 @@ def register_routes(app):
         # Initialize pose detector and camera
         if not init_pose_detector():
             flash('Failed to initialize pose detector', 'error')
-        if not init_camera():
+        if not camera_stream.start():
             flash('Failed to initialize camera', 'error')
         return render_template('video_analysis.html')
 
-    # Add frame caching
-    def get_frame_hash(frame):
-        return hashlib.md5(frame.tobytes()).hexdigest()
-
-    # Process frame in separate process
-    def process_frame(frame):
-        try:
-            # Convert to RGB
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Process with MediaPipe
-            results = pose.process(frame_rgb)
-            
-            if results.pose_landmarks:
-                landmarks = []
-                for landmark in results.pose_landmarks.landmark:
-                    landmarks.append({
-                        'x': landmark.x,
-                        'y': landmark.y,
-                        'z': landmark.z,
-                        'visibility': landmark.visibility
-                    })
-                return landmarks
-            return None
-        except Exception as e:
-            print(f"Error processing frame: {str(e)}")
-            return None
-
     # Update the analyze_posture_route
     @app.route('/analyze_posture', methods=['POST'])
     @login_required
@@ -722,51 +652,44 @@ def register_routes(app):
                     return jsonify({'error': 'Failed to process image data', 'timestamp': timestamp})
             else:
                 # Use backend camera
-                frame = get_frame()
+                frame = camera_stream.latest_frame()
                 if frame is None:
                     return jsonify({'error': 'Failed to capture frame', 'timestamp': timestamp})
             
-            # Process the frame and get landmarks
-            landmarks = process_live_video(frame)
-            
-            if landmarks is None or len(landmarks) == 0:
-                return jsonify({'error': 'No pose detected', 'timestamp': timestamp})
-            
-            # Convert landmarks to a format suitable for drawing
-            formatted_landmarks = []
-            for i, landmark in enumerate(landmarks):
-                formatted_landmarks.append({
-                    'x': float(landmark[0]),  # Normalize to 0-1 range
-                    'y': float(landmark[1]),
-                    'z': float(landmark[2]),
-                    'visibility': float(landmark[3]),
-                    'index': i  # Add index for connection mapping
-                })
+            # Each browser session gets its own pose tracker
+            live_session_id = session.setdefault('live_session_id', uuid.uuid4().hex)
             
-            # Analyze posture with the landmarks
-            feedback = analyze_posture(landmarks, sport)
-            
-            # Format feedback
-            formatted_feedback = []
-            for message, status in feedback:
-                status_map = {"green": "good", "yellow": "warning", "red": "error"}
-                formatted_status = status_map.get(status.lower(), "info")
-                formatted_feedback.append({
-                    "status": formatted_status,
-                    "message": message
-                })
+            # Latest frame wins: a request superseded by a newer one from the
+            # same session while waiting is answered as skipped
+            future = live_stream.get_scheduler().submit(
+                live_session_id, lambda: analyze_live_frame(frame, sport, live_session_id)
+            )
+            try:
+                result = dict(future.result())
+            except PoolTimeout:
+                return jsonify({'error': 'Server busy, please retry', 'timestamp': timestamp}), 503
             
             # Add timestamp to response to prevent caching
-            return jsonify({
-                'feedback': formatted_feedback,
-                'landmarks': formatted_landmarks,
-                'timestamp': timestamp
-            })
+            result['timestamp'] = timestamp
+            return jsonify(result)
             
         except Exception as e:
             logger.error(f"Error in analyze_posture_route: {str(e)}")
             return jsonify({'error': str(e), 'timestamp': timestamp})
 
+    # Live pose detector pool metrics
+    @app.route('/live/pool_stats')
+    @login_required
+    def pose_pool_stats():
+        stats = pose_pool.stats()
+        stats['scheduler'] = live_stream.get_scheduler().stats()
+        stats['camera'] = camera_stream.stats()
+        stats['timings'] = encode_timings.stats()
+        stats['tracking'] = live_tracking.sessions.stats()
+        stats['providers'] = providers.stats()
+        stats['inference'] = inference_config.stats()
+        return jsonify(stats)
+
     # Error handlers
     @app.errorhandler(404)
     def page_not_found(e):
@@ -776,10 +699,3 @@ def register_routes(app):
     def internal_server_error(e):
         return render_template('500.html'), 500
 
-    @app.teardown_appcontext
-    def shutdown_camera(exception=None):
-        """Release camera resources when app shuts down."""
-        release_camera()
-
-# Initialize the property
-process_live_video.prev_landmarks = None
@@ -0,0 +1,271 @@
+"""
+Declarative sport rule engine for posture feedback.
+
+Each sport's checks are plain data in SPORT_RULES: the metric they look at,
+the accepted range, and the message and severity for each outcome. A rule
+list is compiled once into a RuleSet. The RuleSet computes every metric the
+rules need (each only once), then checks all rules for all frames with a
+few array comparisons. The same compiled rules therefore serve a single
+live frame, an array of shape (1, 33, 4), and a whole video of shape
+(N, 33, 4).
+
+Rule fields:
+    id        unique name of the check
+    metric    key into METRICS (a function of a (N, 33, 4) landmark array)
+    min, max  accepted range (either may be omitted)
+    good      message when the value is in range (optional; live feedback only)
+    low       message when the value is below min
+    high      message when the value is above max
+    severity  'warning' (default) or 'error' for out-of-range values
+    gate      when true and the check fails, later rules of the sport are
+              skipped for that frame (e.g. no stance advice while sitting)
+
+Adding a sport only means adding an entry to SPORT_RULES.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from pose_metrics import (joint_angle, segment_flexion, segment_tilt, vertical_offset, distance,
+                          knee_angles, NOSE, LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_ELBOW, RIGHT_ELBOW,
+                          LEFT_WRIST, RIGHT_WRIST, LEFT_HIP, RIGHT_HIP, LEFT_KNEE, RIGHT_KNEE,
+                          LEFT_ANKLE, RIGHT_ANKLE)
+
+
+def _min_knee_angle(landmarks):
+    left, right = knee_angles(landmarks)
+    return np.fmin(left, right)
+
+
+def _max_wrist_flexion(landmarks):
+    return np.fmax(segment_flexion(landmarks, RIGHT_WRIST, RIGHT_ELBOW, RIGHT_SHOULDER),
+                   segment_flexion(landmarks, LEFT_WRIST, LEFT_ELBOW, LEFT_SHOULDER))
+
+
+def _shoulder_hip_rotation(landmarks):
+    return np.abs(segment_tilt(landmarks, LEFT_SHOULDER, RIGHT_SHOULDER) -
+                  segment_tilt(landmarks, LEFT_HIP, RIGHT_HIP))
+
+
+def _hip_knee_drop(landmarks):
+    # Near zero when the knees are level with the hips (sitting)
+    return np.abs((vertical_offset(landmarks, LEFT_HIP, LEFT_KNEE) +
+                   vertical_offset(landmarks, RIGHT_HIP, RIGHT_KNEE)) / 2)
+
+
+def _knee_drive(landmarks):
+    # Height of the higher knee relative to the hips (0 = level with the hips)
+    hips = (landmarks[:, LEFT_HIP, 1] + landmarks[:, RIGHT_HIP, 1]) / 2
+    return hips - np.fmin(landmarks[:, LEFT_KNEE, 1], landmarks[:, RIGHT_KNEE, 1])
+
+
+def _stance_width_ratio(landmarks):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (np.abs(landmarks[:, LEFT_ANKLE, 0] - landmarks[:, RIGHT_ANKLE, 0]) /
+                np.abs(landmarks[:, LEFT_SHOULDER, 0] - landmarks[:, RIGHT_SHOULDER, 0]))
+
+
+def _left_elbow_drop(landmarks):
+    # Elbow below the shoulder in torso lengths (shoulder to hip midpoints),
+    # so the value does not depend on how large the athlete is in the frame
+    shoulders = (landmarks[:, LEFT_SHOULDER, :2] + landmarks[:, RIGHT_SHOULDER, :2]) / 2
+    hips = (landmarks[:, LEFT_HIP, :2] + landmarks[:, RIGHT_HIP, :2]) / 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return vertical_offset(landmarks, LEFT_ELBOW, LEFT_SHOULDER) / np.linalg.norm(shoulders - hips, axis=-1)
+
+
+def _head_offset(landmarks):
+    shoulder_mid = (landmarks[:, LEFT_SHOULDER, 0] + landmarks[:, RIGHT_SHOULDER, 0]) / 2
+    return np.abs(landmarks[:, NOSE, 0] - shoulder_mid)
+
+
+# Per-frame metrics available to rules; each maps (N, 33, 4) -> (N,)
+METRICS = {
+    'shoulder_level': lambda lm: np.abs(vertical_offset(lm, LEFT_SHOULDER, RIGHT_SHOULDER)),
+    'hip_level': lambda lm: np.abs(vertical_offset(lm, LEFT_HIP, RIGHT_HIP)),
+    'hip_knee_drop': _hip_knee_drop,
+    'min_knee_angle': _min_knee_angle,
+    'max_wrist_flexion': _max_wrist_flexion,
+    'shoulder_hip_rotation': _shoulder_hip_rotation,
+    'left_elbow_wrist_distance': lambda lm: distance(lm, LEFT_ELBOW, LEFT_WRIST),
+    'left_elbow_drop': _left_elbow_drop,
+    'right_elbow_angle': lambda lm: joint_angle(lm, RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST),
+    'knee_drive': _knee_drive,
+    'stance_width_ratio': _stance_width_ratio,
+    'head_offset': _head_offset,
+}
+
+SHOULDER_ALIGNMENT = {
+    'id': 'shoulder_alignment', 'metric': 'shoulder_level', 'max': 0.1,
+    'good': 'Good shoulder alignment', 'high': 'Keep your shoulders level'
+}
+
+SPORT_RULES = {
+    'general': [SHOULDER_ALIGNMENT],
+    'badminton': [
+        {'id': 'sitting', 'metric': 'hip_knee_drop', 'min': 0.1, 'gate': True, 'severity': 'error',
+         'low': 'You appear to be sitting. Stand up for proper badminton stance.'},
+        {'id': 'shoulders_level', 'metric': 'shoulder_level', 'max': 0.05,
+         'good': 'Good shoulder position for badminton stance.',
+         'high': 'Keep shoulders level for better balance.'},
+        {'id': 'elbow_position', 'metric': 'left_elbow_wrist_distance', 'min': 0.1, 'max': 0.3,
+         'good': 'Good elbow position for power shots.',
+         'low': 'Adjust elbow angle for better shot control.',
+         'high': 'Adjust elbow angle for better shot control.'},
+        # The upper arm is about 0.65 torso lengths long, so 0.55 is only
+        # exceeded with the arm hanging within ~30 degrees of vertical; a
+        # ready stance with the elbow out in front stays well below it
+        {'id': 'racket_arm', 'metric': 'left_elbow_drop', 'max': 0.55,
+         'high': 'Keep your racket arm up'},
+        {'id': 'knee_bend', 'metric': 'min_knee_angle', 'min': 130, 'max': 160,
+         'good': 'Good knee bend for quick movement.',
+         'low': 'Deep knee bend observed. Maintain moderate knee flexion for quick movements.',
+         'high': 'Bend knees more for better court movement.'},
+        {'id': 'wrist_flexion', 'metric': 'max_wrist_flexion', 'max': 100,
+         'high': 'Excessive wrist flexion detected. Keep wrist firm during shots to prevent injury.'},
+        {'id': 'upper_body_rotation', 'metric': 'shoulder_hip_rotation', 'max': 45,
+         'high': 'Excessive upper body rotation. Coordinate shoulder and hip rotation for better shot control.'},
+    ],
+    'tennis': [
+        SHOULDER_ALIGNMENT,
+        {'id': 'stance_width', 'metric': 'stance_width_ratio', 'min': 1.0,
+         'good': 'Good, stable base for your strokes.',
+         'low': 'Widen your stance to at least shoulder width.'},
+        {'id': 'ready_knees', 'metric': 'min_knee_angle', 'min': 110, 'max': 165,
+         'good': 'Good athletic knee bend in the ready position.',
+         'low': 'Very deep knee bend. Stay low but keep your legs ready to push off.',
+         'high': 'Bend your knees to stay low and ready to move.'},
+        {'id': 'unit_turn', 'metric': 'shoulder_hip_rotation', 'max': 60,
+         'high': 'Shoulders are rotating far past the hips. Turn hips and shoulders together.'},
+        {'id': 'hitting_arm', 'metric': 'right_elbow_angle', 'min': 90,
+         'low': 'Hitting arm is cramped. Give the elbow more room away from the body.'},
+        {'id': 'head_steady', 'metric': 'head_offset', 'max': 0.1,
+         'high': 'Keep your head steady and centered over your shoulders.'},
+    ],
+    'running': [
+        SHOULDER_ALIGNMENT,
+        {'id': 'knee_drive', 'metric': 'knee_drive', 'min': -0.12,
+         'low': 'Lift your knees higher'},
+    ],
+    'football': [
+        SHOULDER_ALIGNMENT,
+        {'id': 'hips_level', 'metric': 'hip_level', 'max': 0.1,
+         'high': 'Keep your hips level'},
+    ],
+}
+
+
+class RuleEvaluation:
+    """Outcome of a RuleSet over N frames."""
+
+    def __init__(self, rule_set, values, below, above, active):
+        self.rule_set = rule_set
+        self.values = values  # (N, R) metric value per rule
+        self.below = below    # (N, R) value below the rule's min
+        self.above = above    # (N, R) value above the rule's max
+        self.active = active  # (N, R) rule not skipped by a failed gate
+
+    @property
+    def failed(self):
+        return (self.below | self.above) & self.active
+
+    def frame_feedback(self, index=0):
+        """Feedback items ({'status', 'message'}) for one frame, in rule order."""
+        feedback = []
+        for r, rule in enumerate(self.rule_set.rules):
+            if not self.active[index, r]:
+                continue
+            if self.below[index, r]:
+                feedback.append({'status': rule['severity'], 'message': rule['low']})
+            elif self.above[index, r]:
+                feedback.append({'status': rule['severity'], 'message': rule['high']})
+            elif rule.get('good'):
+                feedback.append({'status': 'good', 'message': rule['good']})
+        return feedback
+
+    def clip_summary(self, frame_indices=None):
+        """Failed checks over all frames, most frequent first.
+
+        Returns:
+            list of dicts with rule id, status, message, number and share of
+            failing frames and the first failing frame index
+        """
+        frames = len(self.values)
+        if frame_indices is None:
+            frame_indices = np.arange(frames)
+        summary = []
+        for r, rule in enumerate(self.rule_set.rules):
+            for mask, message in ((self.below[:, r] & self.active[:, r], rule.get('low')),
+                                  (self.above[:, r] & self.active[:, r], rule.get('high'))):
+                count = int(np.count_nonzero(mask))
+                if not count or not message:
+                    continue
+                summary.append({
+                    'rule': rule['id'],
+                    'status': rule['severity'],
+                    'message': message,
+                    'frames': count,
+                    'ratio': count / frames,
+                    'first_frame': int(frame_indices[np.argmax(mask)])
+                })
+        summary.sort(key=lambda item: -item['frames'])
+        return summary
+
+
+class RuleSet:
+    """A sport's rules compiled into arrays for vectorized evaluation."""
+
+    def __init__(self, rules):
+        self.rules = [dict(rule, severity=rule.get('severity', 'warning')) for rule in rules]
+        for rule in self.rules:
+            if rule['metric'] not in METRICS:
+                raise ValueError(f"Unknown metric '{rule['metric']}' in rule '{rule['id']}'")
+
+        # Each metric is computed once even if several rules use it
+        self.metrics = list(dict.fromkeys(rule['metric'] for rule in self.rules))
+        self.metric_index = np.array([self.metrics.index(rule['metric']) for rule in self.rules], dtype=np.intp)
+        self.lower = np.array([rule.get('min', -np.inf) for rule in self.rules], dtype=np.float64)
+        self.upper = np.array([rule.get('max', np.inf) for rule in self.rules], dtype=np.float64)
+        self.gates = np.array([bool(rule.get('gate')) for rule in self.rules])
+
+    def evaluate(self, landmarks):
+        """Evaluate all rules on a (N, 33, 4) landmark array in one pass."""
+        landmarks = np.asarray(landmarks)
+        if landmarks.ndim == 2:
+            landmarks = landmarks[np.newaxis]
+        frames = len(landmarks)
+        if frames == 0 or not self.rules:
+            empty = np.zeros((frames, len(self.rules)), dtype=bool)
+            return RuleEvaluation(self, np.zeros(empty.shape), empty, empty, empty)
+
+        metric_values = np.column_stack([METRICS[name](landmarks) for name in self.metrics])
+        values = metric_values[:, self.metric_index]
+        # NaN (e.g. an undefined angle) compares False and so never fails a rule
+        below = values < self.lower
+        above = values > self.upper
+
+        # A failed gate deactivates every rule after it for that frame
+        gate_failed = (below | above) & self.gates
+        blocked = np.logical_or.accumulate(gate_failed, axis=1)
+        active = np.ones_like(blocked)
+        active[:, 1:] = ~blocked[:, :-1]
+        return RuleEvaluation(self, values, below, above, active)
+
+
+def sport_key(sport):
+    """Normalize a sport name ('Badminton', 'badminton ') to its SPORT_RULES key."""
+    key = (sport or '').strip().lower()
+    return key if key in SPORT_RULES else 'general'
+
+
+@lru_cache(maxsize=None)
+def get_rule_set(sport):
+    """Compiled rules for a sport (compiled once per process)."""
+    return RuleSet(SPORT_RULES[sport_key(sport)])
+
+
+def frame_feedback(sport, pose):
+    """Live feedback for one PoseFrame (or (33, 4) array)."""
+    data = getattr(pose, 'data', pose)
+    feedback = get_rule_set(sport_key(sport)).evaluate(data).frame_feedback(0)
+    return feedback or [{'status': 'warning', 'message': 'Stand in proper position for posture analysis.'}]
@@ -6,8 +6,93 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Set up playback controls
     setupPlaybackControls();
+    
+    // Track background analysis progress
+    setupAnalysisProgress();
 });
 
+// Poll the background analysis job until it finishes
+function setupAnalysisProgress() {
+    const container = document.getElementById('analysisProgress');
+    if (!container) return;
+    
+    const statusUrl = container.dataset.statusUrl;
+    const cancelUrl = container.dataset.cancelUrl;
+    const progressBar = document.getElementById('analysisProgressBar');
+    const progressText = document.getElementById('analysisProgressText');
+    const cancelButton = document.getElementById('cancelAnalysis');
+    let pollTimer = null;
+    
+    function renderPartial(partial) {
+        const container = document.getElementById('analysisPartial');
+        if (!container || !partial || !partial.frames) return;
+        container.style.display = '';
+        
+        const score = document.getElementById('analysisPartialScore');
+        if (score && partial.posture_score !== null) {
+            score.textContent = `Posture alignment ${partial.posture_score}% over ${partial.frames} frames`;
+        }
+        
+        const list = document.getElementById('analysisPartialIssues');
+        if (!list) return;
+        list.innerHTML = '';
+        partial.rule_hits.forEach(function(hit) {
+            const item = document.createElement('li');
+            item.className = 'list-group-item';
+            item.textContent = `${hit.message} (${Math.round(hit.ratio * 100)}% of frames)`;
+            list.appendChild(item);
+        });
+    }
+    
+    function render(status) {
+        renderPartial(status.partial);
+        if (progressBar) {
+            progressBar.style.width = status.progress + '%';
+            progressBar.textContent = status.progress + '%';
+        }
+        if (progressText && status.total_frames) {
+            progressText.textContent = `${status.frames_processed} / ${status.total_frames} frames processed`;
+        }
+        if (status.status !== 'pending' && status.status !== 'running') {
+            clearInterval(pollTimer);
+            window.location.reload();
+        }
+    }
+    
+    function poll() {
+        fetch(statusUrl)
+            .then(response => response.json())
+            .then(render)
+            .catch(error => console.error('Error fetching analysis status:', error));
+    }
+    
+    pollTimer = setInterval(poll, 2000);
+    poll();
+    
+    // Push updates when Socket.IO is available on the page
+    if (typeof io !== 'undefined') {
+        const socket = io();
+        socket.on('analysis_status', function(status) {
+            if (String(status.analysis_id) === String(statusUrl.split('/')[2])) {
+                render(status);
+            }
+        });
+    }
+    
+    if (cancelButton) {
+        cancelButton.addEventListener('click', function() {
+            cancelButton.disabled = true;
+            fetch(cancelUrl, { method: 'POST' })
+                .then(response => response.json())
+                .then(render)
+                .catch(error => {
+                    console.error('Error cancelling analysis:', error);
+                    cancelButton.disabled = false;
+                });
+        });
+    }
+}
+
 // Initialize visualization of pose data
 function initVisualization() {
     const visualizationCanvas = document.getElementById('poseVisualization');
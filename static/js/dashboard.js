@@ -247,7 +247,9 @@ function loadRecentActivity() {
                     <h5 class="card-title">Video Analysis - ${activity.data.sport}</h5>
                     <h6 class="card-subtitle mb-2 text-muted">${formattedDate}</h6>
                     <p class="card-text">
-                        Risk Level: <span class="risk-level risk-${activity.data.riskLevel.toLowerCase()}">${activity.data.riskLevel}</span>
+                        Risk Level: ${activity.data.riskLevel
+                            ? `<span class="risk-level risk-${activity.data.riskLevel.toLowerCase()}">${activity.data.riskLevel}</span>`
+                            : 'Not assessed yet'}
                     </p>
                     <a href="/analysis/${activity.data.id}" class="card-link">View Analysis</a>
                 </div>
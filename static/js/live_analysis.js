@@ -3,7 +3,8 @@ const config = {
     processingMode: 'client-side',  // Try 'client-side' or 'server-side'
     captureInterval: 50,            // How often to capture frames (ms)
     skipFrames: 1,                  // Process every N frames
-    imageQuality: 0.6,              // JPEG quality for server transmission
+    imageQuality: 0.6,              // JPEG/WebP quality for server transmission
+    useSocket: true,                // Send binary frames over Socket.IO (falls back to HTTP)
     predictionEnabled: true,        // Enable movement prediction
     useWebWorker: true              // Process in background thread
 };
@@ -18,6 +19,11 @@ let videoElement = null;
 let skeletonCanvas = null;
 let skeletonCtx = null;
 
+// Binary Socket.IO frame channel
+let liveSocket = null;
+let frameSeq = 0;
+let frameFormat = 'image/jpeg';
+
 // Variables for tracking video stream state
 let videoInitAttempts = 0;
 const MAX_VIDEO_INIT_ATTEMPTS = 5;
@@ -226,8 +232,12 @@ function captureAndAnalyze() {
     const currentTime = performance.now();
     const timeSinceLastProcess = currentTime - lastProcessedTime;
     
+    // Over the socket the server keeps only the newest frame, so frames are
+    // sent at the capture rate it suggests instead of waiting for each result
+    const useSocket = liveSocket && liveSocket.connected;
+    
     // Check if we should process this frame
-    if (processingQueue.length === 0 && timeSinceLastProcess >= config.captureInterval) {
+    if ((useSocket || processingQueue.length === 0) && timeSinceLastProcess >= config.captureInterval) {
         lastProcessedTime = currentTime;
         
         // Capture frame
@@ -245,10 +255,16 @@ function captureAndAnalyze() {
         const scaledContext = scaledCanvas.getContext('2d');
         scaledContext.drawImage(canvas, 0, 0, scaledCanvas.width, scaledCanvas.height);
         
-        // Add to processing queue
-        const imageData = scaledCanvas.toDataURL('image/jpeg', config.imageQuality);
+        if (useSocket) {
+            const sportSelect = document.getElementById('sportSelect');
+            sendFrameOverSocket(scaledCanvas, sportSelect ? sportSelect.value : 'general');
+            requestAnimationFrame(captureAndAnalyze);
+            return;
+        }
+        
+        // Add to processing queue; encoding happens when the frame is sent
         processingQueue.push({
-            imageData: imageData,
+            canvas: scaledCanvas,
             timestamp: currentTime
         });
         
@@ -281,27 +297,24 @@ function processNextInQueue() {
     const sportSelect = document.getElementById('sportSelect');
     const selectedSport = sportSelect ? sportSelect.value : 'general';
     
-    // Send to server for processing
+    // Fallback when the socket is unavailable: send to server as a base64 form POST
     fetch('/analyze_posture', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/x-www-form-urlencoded',
         },
         body: new URLSearchParams({
-            'image_data': frameToProcess.imageData,
+            'image_data': frameToProcess.canvas.toDataURL('image/jpeg', config.imageQuality),
             'sport': selectedSport
         })
     })
     .then(response => response.json())
     .then(data => {
-        if (data.error) {
-            console.error("Error from analyze_posture:", data.error);
-            clearSkeleton();
-        } else if (data.landmarks && data.landmarks.length > 0) {
-            drawSkeleton(data.landmarks);
-            if (data.feedback && data.feedback.length > 0) {
-                updateFeedback(data.feedback);
-            }
+        if (data.capture_interval_ms) {
+            config.captureInterval = data.capture_interval_ms;
+        }
+        if (!data.skipped) {
+            applyAnalysisResult(data);
         }
         
         // Process next frame
@@ -314,6 +327,59 @@ function processNextInQueue() {
     });
 }
 
+// Draw landmarks and feedback from a server analysis result
+function applyAnalysisResult(data) {
+    if (data.error) {
+        console.error("Error from pose analysis:", data.error);
+        clearSkeleton();
+    } else if (data.landmarks && data.landmarks.length > 0) {
+        drawSkeleton(data.landmarks);
+        if (data.feedback && data.feedback.length > 0) {
+            updateFeedback(data.feedback);
+        }
+    }
+}
+
+// Send a frame as raw JPEG/WebP bytes; the result arrives as 'live_result'
+function sendFrameOverSocket(canvas, sport) {
+    canvas.toBlob(function(blob) {
+        if (!blob || !liveSocket || !liveSocket.connected) return;
+        blob.arrayBuffer().then(function(buffer) {
+            frameSeq++;
+            liveSocket.emit('live_frame', {
+                frame: buffer,
+                sport: sport,
+                seq: frameSeq
+            });
+        });
+    }, frameFormat, config.imageQuality);
+}
+
+// Open the Socket.IO channel used for binary frames
+function initLiveSocket() {
+    if (!config.useSocket || typeof io === 'undefined') return;
+    
+    // Prefer WebP when the browser can encode it (smaller than JPEG at equal quality)
+    const probe = document.createElement('canvas');
+    probe.width = probe.height = 1;
+    if (probe.toDataURL('image/webp').startsWith('data:image/webp')) {
+        frameFormat = 'image/webp';
+    }
+    
+    liveSocket = io();
+    liveSocket.on('live_result', function(data) {
+        // Follow the server's capture-rate hint so frames are not sent
+        // faster than they can be analyzed
+        if (data.capture_interval_ms) {
+            config.captureInterval = data.capture_interval_ms;
+        }
+        // Frames superseded by a newer one carry no analysis
+        if (!data.skipped) {
+            applyAnalysisResult(data);
+        }
+    });
+}
+
 // Clear skeleton
 function clearSkeleton() {
     if (skeletonCanvas && skeletonCtx) {
@@ -385,6 +451,7 @@ function showErrorMessage(message) {
 // Initialize everything when page loads
 document.addEventListener('DOMContentLoaded', function() {
     initVideoStream();
+    initLiveSocket();
     
     // Add event listeners
     const startButton = document.getElementById('startAnalysis');
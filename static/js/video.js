@@ -13,11 +13,117 @@ document.addEventListener('DOMContentLoaded', function() {
         uploadForm.addEventListener('submit', function(event) {
             if (!validateVideoForm()) {
                 event.preventDefault();
+                return;
+            }
+            // Send the file in resumable chunks instead of one large form post
+            if (window.fetch && window.Blob && Blob.prototype.slice) {
+                event.preventDefault();
+                submitInChunks(uploadForm);
             }
         });
     }
 });
 
+// Resumable uploads: chunk size per request (below the server's request size limit)
+const UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024;
+const MAX_UPLOAD_SIZE = 2 * 1024 * 1024 * 1024;
+const UPLOAD_RETRIES = 5;
+
+// Base64 SHA-256 of a blob, or null where Web Crypto is unavailable (non-HTTPS)
+async function sha256Base64(blob) {
+    if (!(window.crypto && crypto.subtle)) return null;
+    const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+    return btoa(String.fromCharCode(...new Uint8Array(digest)));
+}
+
+async function currentUploadOffset(location) {
+    const response = await fetch(location, { method: 'HEAD' });
+    if (!response.ok) return null;
+    return parseInt(response.headers.get('Upload-Offset'), 10);
+}
+
+// Upload a file through the resumable upload API and return the finalize response.
+// An upload interrupted by a reload or network failure resumes from the last stored chunk.
+async function uploadInChunks(file, sportId, onProgress) {
+    const storageKey = `upload:${file.name}:${file.size}:${file.lastModified}:${sportId}`;
+    let location = localStorage.getItem(storageKey);
+    let offset = location ? await currentUploadOffset(location) : null;
+    
+    if (offset === null) {
+        const response = await fetch('/uploads', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: file.name, length: file.size, sport_id: parseInt(sportId, 10) })
+        });
+        const data = await response.json();
+        if (!response.ok) throw new Error(data.error || 'Could not start the upload');
+        location = data.location;
+        offset = data.offset;
+        localStorage.setItem(storageKey, location);
+    }
+    
+    let failures = 0;
+    while (offset < file.size) {
+        onProgress(offset / file.size);
+        const chunk = file.slice(offset, offset + UPLOAD_CHUNK_SIZE);
+        const headers = { 'Content-Type': 'application/offset+octet-stream', 'Upload-Offset': String(offset) };
+        const checksum = await sha256Base64(chunk);
+        if (checksum) headers['Upload-Checksum'] = `sha256 ${checksum}`;
+        
+        try {
+            const response = await fetch(location, { method: 'PATCH', headers: headers, body: chunk });
+            if (response.ok) {
+                offset = parseInt(response.headers.get('Upload-Offset'), 10);
+                failures = 0;
+                continue;
+            }
+            if (response.status === 404) {
+                localStorage.removeItem(storageKey);
+                throw new Error('The upload expired, please try again');
+            }
+            if (response.status !== 409 && response.status !== 460) {
+                const data = await response.json();
+                throw new Error(data.error || 'Upload failed');
+            }
+        } catch (error) {
+            if (!(error instanceof TypeError)) throw error;  // only network errors are retried
+        }
+        
+        // Network error, offset conflict or corrupted chunk: resync and retry
+        if (++failures > UPLOAD_RETRIES) throw new Error('Upload failed, please try again');
+        await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+        const serverOffset = await currentUploadOffset(location).catch(() => null);
+        if (serverOffset !== null) offset = serverOffset;
+    }
+    onProgress(1);
+    
+    const response = await fetch(`${location}/finalize`, { method: 'POST' });
+    const data = await response.json();
+    if (!response.ok) {
+        localStorage.removeItem(storageKey);
+        throw new Error(data.error || 'Upload could not be verified');
+    }
+    localStorage.removeItem(storageKey);
+    return data;
+}
+
+function submitInChunks(form) {
+    const file = document.getElementById('video').files[0];
+    const sportId = document.getElementById('sport').value;
+    const submitButton = form.querySelector('[type="submit"]');
+    const label = submitButton ? submitButton.value : '';
+    const setLabel = text => { if (submitButton) submitButton.value = text; };
+    if (submitButton) submitButton.disabled = true;
+    
+    uploadInChunks(file, sportId, fraction => setLabel(`Uploading... ${Math.floor(fraction * 100)}%`))
+        .then(result => { window.location.href = result.url; })
+        .catch(error => {
+            alert(error.message);
+            setLabel(label);
+            if (submitButton) submitButton.disabled = false;
+        });
+}
+
 // Handle video file input changes
 function setupVideoFileInput() {
     const videoInput = document.getElementById('video');
@@ -38,9 +144,9 @@ function setupVideoFileInput() {
                 return;
             }
             
-            // Check file size (max 16MB)
-            if (file.size > 16 * 1024 * 1024) {
-                alert('Video file is too large. Maximum size is 16MB.');
+            // Check file size
+            if (file.size > MAX_UPLOAD_SIZE) {
+                alert('Video file is too large. Maximum size is 2GB.');
                 videoInput.value = '';
                 return;
             }
@@ -56,20 +162,6 @@ function setupVideoFileInput() {
                 videoPreview.src = videoURL;
                 videoPreview.style.display = 'block';
                 videoPreview.controls = true;
-                
-                videoPreview.addEventListener('loadedmetadata', function() {
-                    if (!isNaN(videoPreview.duration) && videoPreview.duration > 120) {
-                        alert('Video is too long. Maximum duration is 2 minutes.');
-                        videoInput.value = '';
-                        videoPreview.src = '';
-                        videoPreview.style.display = 'none';
-                        if (uploadPlaceholder) {
-                            uploadPlaceholder.style.display = 'flex';
-                        }
-                        URL.revokeObjectURL(videoURL);
-                        return;
-                    }
-                });
 
                 // Revoke the object URL after usage
                 videoPreview.addEventListener('ended', function() {
@@ -0,0 +1,147 @@
+"""
+Running aggregates for streaming video analysis.
+
+Poses are fed in one at a time as the video is decoded. They are buffered
+into small fixed-size chunks, and each full chunk is evaluated with the
+same vectorized code used for whole clips (rules.RuleSet, pose_metrics).
+Only counters and running statistics are kept, so memory does not grow
+with clip length, and a snapshot of the feedback so far can be taken at
+any point while the job runs.
+"""
+import numpy as np
+
+from landmark_store import NUM_LANDMARKS, FIELDS
+from pose_metrics import posture_alignment, hip_height
+from rules import get_rule_set
+
+# Poses buffered before the rules are evaluated on them
+CHUNK_SIZE = 32
+
+# Rule hits included in a snapshot
+MAX_SNAPSHOT_ISSUES = 5
+
+
+class RunningStats:
+    """Count, mean, variance, min and max of a stream of values (Welford).
+
+    Values can be added in batches; each batch is folded in with Chan's
+    parallel update, so the result matches a single pass over all values.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(np.sum((values - batch_mean) ** 2))
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += batch_m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    @property
+    def variance(self):
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+
+class ClipAggregates:
+    """Posture score, hip oscillation and rule hits accumulated over a pose stream."""
+
+    def __init__(self, sport_name=None, chunk_size=CHUNK_SIZE):
+        self.sport_name = sport_name
+        self.rule_set = get_rule_set(sport_name)
+        rule_count = len(self.rule_set.rules)
+        self.frames = 0
+        self.aligned_frames = 0
+        self.hip_height = RunningStats()
+        # Per rule: failing frames and first failing frame index, below min / above max
+        self.low_hits = np.zeros(rule_count, dtype=np.int64)
+        self.high_hits = np.zeros(rule_count, dtype=np.int64)
+        self.first_low = np.full(rule_count, -1, dtype=np.int64)
+        self.first_high = np.full(rule_count, -1, dtype=np.int64)
+
+        self._frame_indices = np.empty(chunk_size, dtype=np.int32)
+        self._landmarks = np.empty((chunk_size, NUM_LANDMARKS, len(FIELDS)), dtype=np.float32)
+        self._pending = 0
+
+    def add(self, frame_index, landmarks):
+        """Add one detected pose ((33, 4) landmarks)."""
+        self._frame_indices[self._pending] = frame_index
+        self._landmarks[self._pending] = landmarks
+        self._pending += 1
+        if self._pending == len(self._frame_indices):
+            self.flush()
+
+    @property
+    def pending(self):
+        """Poses added but not evaluated yet."""
+        return self._pending
+
+    def flush(self):
+        """Evaluate the buffered poses."""
+        if self._pending:
+            count, self._pending = self._pending, 0
+            self.update(self._frame_indices[:count], self._landmarks[:count])
+
+    def update(self, frame_indices, landmarks):
+        """Add a batch of poses: frame indices and a (N, 33, 4) landmark array."""
+        if len(frame_indices) == 0:
+            return
+        frame_indices = np.asarray(frame_indices)
+        self.frames += len(frame_indices)
+        self.aligned_frames += int(np.count_nonzero(posture_alignment(landmarks, tolerance=10)))
+        self.hip_height.update(hip_height(landmarks))
+
+        evaluation = self.rule_set.evaluate(landmarks)
+        for mask, hits, first in ((evaluation.below & evaluation.active, self.low_hits, self.first_low),
+                                  (evaluation.above & evaluation.active, self.high_hits, self.first_high)):
+            counts = np.count_nonzero(mask, axis=0)
+            hits += counts
+            new = (counts > 0) & (first < 0)
+            first[new] = frame_indices[np.argmax(mask[:, new], axis=0)]
+
+    def rule_hits(self, limit=None):
+        """Failed checks so far, most frequent first (same fields as RuleEvaluation.clip_summary)."""
+        self.flush()
+        hits = []
+        for r, rule in enumerate(self.rule_set.rules):
+            for count, first, message in ((self.low_hits[r], self.first_low[r], rule.get('low')),
+                                          (self.high_hits[r], self.first_high[r], rule.get('high'))):
+                if not count or not message:
+                    continue
+                hits.append({
+                    'rule': rule['id'],
+                    'status': rule['severity'],
+                    'message': message,
+                    'frames': int(count),
+                    'ratio': round(int(count) / self.frames, 3),
+                    'first_frame': int(first)
+                })
+        hits.sort(key=lambda item: -item['frames'])
+        return hits[:limit] if limit else hits
+
+    def snapshot(self, limit=MAX_SNAPSHOT_ISSUES):
+        """JSON-serializable summary of everything seen so far."""
+        self.flush()
+        return {
+            'frames': self.frames,
+            'posture_score': round(100.0 * self.aligned_frames / self.frames, 1) if self.frames else None,
+            'hip_oscillation': round(self.hip_height.std, 4) if self.hip_height.count else None,
+            'rule_hits': self.rule_hits(limit)
+        }
@@ -0,0 +1,77 @@
+"""
+A pooled Pose instance never carries tracking state across sessions (see pose_pool).
+
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pose_pool import PosePool
+
+
+class FakePose:
+    def __init__(self):
+        self.resets = 0
+        self.closed = False
+
+    def reset(self):
+        self.resets += 1
+
+    def close(self):
+        self.closed = True
+
+
+class PosePoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.created = []
+        self.pool = PosePool(self.factory, size=1, checkout_timeout=0.1)
+
+    def factory(self):
+        pose = FakePose()
+        self.created.append(pose)
+        return pose
+
+    def checkout(self, session_id):
+        with self.pool.checkout(session_id) as pose:
+            return pose
+
+    def test_same_session_keeps_tracking_state(self):
+        first = self.checkout('a')
+        second = self.checkout('a')
+        self.assertIs(first, second)
+        self.assertEqual(first.resets, 0)
+
+    def test_reassigned_slot_is_reset(self):
+        pose = self.checkout('a')
+        # The only slot is taken over by another session
+        self.assertIs(self.checkout('b'), pose)
+        self.assertEqual(pose.resets, 1)
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(self.pool.stats()['reassignments'], 1)
+        self.assertEqual(self.pool.stats()['resets'], 1)
+
+        # Going back to the first session is a change of session too
+        self.checkout('a')
+        self.assertEqual(pose.resets, 2)
+
+    def test_released_slot_is_reset_for_the_next_session(self):
+        pose = self.checkout('a')
+        self.pool.release_session('a')
+        self.assertIs(self.checkout('b'), pose)
+        self.assertEqual(pose.resets, 1)
+        self.checkout('b')
+        self.assertEqual(pose.resets, 1)
+
+    def test_rebinding_the_same_session_after_release_keeps_state(self):
+        pose = self.checkout('a')
+        self.pool.release_session('a')
+        self.checkout('a')
+        self.assertEqual(pose.resets, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+The per-user history queries search an index (see query_plans).
+
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import text
+
+from models import db
+import query_plans
+
+
+class QueryPlanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def test_hot_queries_search_an_index(self):
+        results = query_plans.check_query_plans()
+        self.assertEqual(len(results), len(query_plans.HOT_QUERIES))
+        for name, lines, problems in results:
+            with self.subTest(name):
+                self.assertEqual(problems, [], '\n'.join(lines))
+
+    def test_missing_index_is_reported(self):
+        with db.engine.begin() as connection:
+            connection.execute(text('DROP INDEX ix_progress_user_date'))
+            connection.execute(text('DROP INDEX ix_progress_user_sport_metric_date'))
+        problems = dict((name, problems) for name, _, problems in query_plans.check_query_plans())
+        self.assertIn('no index search on progress', problems['progress: entries'])
+        self.assertTrue(any(p.startswith('full scan') for p in problems['progress: entries']))
+
+    def test_full_index_scan_is_reported(self):
+        # Answered from ix_training_log_user_date, but by reading all of it
+        sql = 'SELECT user_id, date FROM training_log ORDER BY user_id, date'
+        with db.engine.connect() as connection:
+            lines, problems = query_plans._sqlite_plan(connection, sql, 'training_log')
+        self.assertTrue(any('USING COVERING INDEX' in line for line in lines), lines)
+        self.assertIn('no index search on training_log', problems)
+        self.assertTrue(any(p.startswith('full scan') for p in problems))
+
+
+if __name__ == '__main__':
+    unittest.main()
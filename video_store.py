@@ -0,0 +1,146 @@
+"""
+Content-addressed storage of uploaded videos and reuse of their analysis.
+
+Uploads are streamed to disk in chunks while their SHA-256 is computed, and
+stored as <sha256><ext> in the upload folder. Re-uploading the same clip
+(common when athletes retry an upload) therefore never stores a second
+copy and can never overwrite a different video that happened to have the
+same name.
+
+A finished analysis is identified by its analysis key: a hash of the
+content hash, analysis.ANALYZER_VERSION and the sampling options. A new
+upload whose key matches a completed analysis reuses that analysis'
+result and landmark file instead of queueing the video again. One whose
+key matches an analysis that is still pending or running waits for it
+(see jobs.release_waiting).
+"""
+import os
+import json
+import uuid
+import hashlib
+import logging
+
+from werkzeug.utils import secure_filename
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the upload stream per iteration
+CHUNK_SIZE = 1024 * 1024
+
+DEFAULT_EXTENSION = '.mp4'
+
+
+def file_extension(filename):
+    """Lower-case extension of a client supplied file name ('.mp4' if none)."""
+    ext = os.path.splitext(secure_filename(filename or ''))[1].lower()
+    return ext or DEFAULT_EXTENSION
+
+
+def store_stream(stream, upload_folder, ext):
+    """Copy a binary stream into the upload folder under its content hash.
+
+    Args:
+        stream: File-like object to read from
+        upload_folder: Directory the video is stored in
+        ext: File extension, including the dot
+
+    Returns:
+        Tuple of (content hash, stored file name, size in bytes)
+    """
+    hasher = hashlib.sha256()
+    os.makedirs(upload_folder, exist_ok=True)
+    temp_path = os.path.join(upload_folder, f'.upload-{uuid.uuid4().hex}{ext}')
+    size = 0
+    try:
+        with open(temp_path, 'wb') as f:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        content_hash = hasher.hexdigest()
+        filename = store_file(temp_path, content_hash, upload_folder, ext)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return content_hash, filename, size
+
+
+def store_file(path, content_hash, upload_folder, ext):
+    """Move a fully written file to its content-addressed name.
+
+    If the same content is already stored, the existing file is kept.
+    Returns the stored file name.
+    """
+    filename = f'{content_hash}{ext}'
+    target = os.path.join(upload_folder, filename)
+    if os.path.exists(target):
+        logger.info(f"Video {filename} already stored, reusing it")
+        os.remove(path)
+    else:
+        os.replace(path, target)
+    return filename
+
+
+def save_upload(file_storage, upload_folder):
+    """Stream a Werkzeug FileStorage to content-addressed storage.
+
+    Returns:
+        Tuple of (content hash, stored file name, size in bytes)
+    """
+    return store_stream(file_storage.stream, upload_folder, file_extension(file_storage.filename))
+
+
+def analysis_key(content_hash, options, analyzer_version):
+    """Key of an analysis result: video content, analyzer version and sampling options."""
+    payload = json.dumps({
+        'content': content_hash,
+        'analyzer': analyzer_version,
+        'options': options or {}
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def cached_result(key, sport_name, upload_folder):
+    """Result JSON of a completed analysis with the same key, or None.
+
+    The stored feedback aggregates depend on the sport. When the cached
+    analysis was for another sport, they are recomputed from its landmark
+    file, which takes milliseconds.
+    """
+    from models import VideoAnalysis
+
+    source = (VideoAnalysis.query
+              .filter_by(analysis_key=key, status='completed')
+              .filter(VideoAnalysis.result.isnot(None))
+              .order_by(VideoAnalysis.id.desc())
+              .first())
+    if source is None:
+        return None
+    result = json.loads(source.result)
+    landmarks_file = result.get('landmarks_file')
+    if landmarks_file and not os.path.exists(os.path.join(upload_folder, landmarks_file)):
+        return None
+
+    if source.sport.name != sport_name and landmarks_file:
+        from landmark_store import load_landmarks
+        from stream_analysis import ClipAggregates
+
+        aggregates = ClipAggregates(sport_name)
+        aggregates.update(*load_landmarks(os.path.join(upload_folder, landmarks_file)))
+        result['aggregates'] = aggregates.snapshot(limit=None)
+    logger.info(f"Reusing analysis {source.id} for key {key[:12]}")
+    return result
+
+
+def active_analysis(key, exclude_id=None):
+    """Oldest pending or running analysis with the given key, or None."""
+    from models import VideoAnalysis
+
+    query = VideoAnalysis.query.filter(VideoAnalysis.analysis_key == key,
+                                       VideoAnalysis.status.in_(('pending', 'running')))
+    if exclude_id is not None:
+        query = query.filter(VideoAnalysis.id != exclude_id)
+    return query.order_by(VideoAnalysis.id).first()
@@ -0,0 +1,138 @@
+"""
+Model preloading and per-worker warm-up.
+
+The first pose inference in a process is slow: MediaPipe builds its
+graph, loads the TFLite models and initialises the interpreter, which
+adds about a second to whichever live frame happens to arrive first
+after a deploy or scale-up. With MODEL_WARMUP enabled:
+
+1. preload_assets() runs in create_app(). Under gunicorn with
+   preload_app (see gunicorn.conf.py) that is the master process, so
+   OpenCV, MediaPipe and the model files are loaded once and shared
+   copy-on-write with every forked worker.
+2. warm_worker() runs in each worker after the fork. It creates the
+   first live Pose instance and runs a dummy inference through it and
+   through the OpenCV codecs. No MediaPipe graph is ever created in the
+   master, since its threads would not survive the fork.
+3. GET /readyz answers 503 until the worker is warm, so a load balancer
+   only routes traffic to workers with predictable latency.
+"""
+import os
+import time
+import logging
+import threading
+
+import numpy as np
+
+import providers
+import inference_config
+
+logger = logging.getLogger(__name__)
+
+# Model files shared by all pose settings, relative to the mediapipe package
+MODEL_ASSETS = [
+    'modules/pose_detection/pose_detection.tflite',
+    'modules/pose_landmark/pose_landmark_cpu.binarypb',
+]
+
+# Session id the warm-up inference is run under in the live pose pool
+WARMUP_SESSION = '__warmup__'
+
+_state = {'preloaded': None, 'warm': None, 'error': None}
+_warm = threading.Event()
+_lock = threading.Lock()
+
+
+def warmup_enabled():
+    """Whether MODEL_WARMUP is set in the environment."""
+    return os.environ.get('MODEL_WARMUP', '').lower() in ('1', 'true', 'yes')
+
+
+def preload_assets():
+    """Import the vision libraries and read the pose model files into memory.
+
+    Safe to call before forking: nothing here starts threads. Returns the
+    seconds spent.
+    """
+    start = time.perf_counter()
+    providers.preload()
+    package_dir = os.path.dirname(providers.mediapipe.__file__)
+    complexities = {inference_config.get_settings(w).model_complexity for w in inference_config.DEFAULT_SETTINGS}
+    landmark_models = [inference_config.LANDMARK_MODELS[c] for c in sorted(complexities)]
+    for asset in MODEL_ASSETS + landmark_models:
+        path = os.path.join(package_dir, asset)
+        try:
+            # Pulls the file into the OS page cache shared by all workers
+            with open(path, 'rb') as f:
+                while f.read(1024 * 1024):
+                    pass
+        except OSError as e:
+            logger.warning(f"Could not preload model asset {asset}: {str(e)}")
+    elapsed = time.perf_counter() - start
+    _state['preloaded'] = round(elapsed, 3)
+    logger.info(f"Preloaded vision libraries and pose models in {elapsed:.2f}s")
+    return elapsed
+
+
+def warm_worker(background=False):
+    """Run a dummy inference through the live pose pool and the frame codecs.
+
+    Args:
+        background: Warm up in a daemon thread and return immediately
+
+    Returns:
+        Seconds spent (None when running in the background)
+    """
+    if background:
+        threading.Thread(target=warm_worker, name='model-warmup', daemon=True).start()
+        return None
+
+    with _lock:
+        if _warm.is_set():
+            return _state['warm']
+        start = time.perf_counter()
+        try:
+            from routes import pose_pool
+            from live_stream import decode_frame
+            from providers import cv2
+
+            frame = np.zeros((480, 640, 3), dtype=np.uint8)
+            _, encoded = cv2.imencode('.jpg', frame)
+            frame = decode_frame(encoded.tobytes())
+            with pose_pool.checkout(WARMUP_SESSION) as pose:
+                pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            # Keep the warmed instance in the pool for the first real session
+            pose_pool.release_session(WARMUP_SESSION)
+        except Exception as e:
+            # A failed warm-up must not keep the worker out of rotation forever
+            _state['error'] = str(e)
+            logger.error(f"Model warm-up failed: {str(e)}")
+        elapsed = time.perf_counter() - start
+        _state['warm'] = round(elapsed, 3)
+        _warm.set()
+        logger.info(f"Worker {os.getpid()} warmed up in {elapsed:.2f}s")
+        return elapsed
+
+
+def is_ready(app):
+    """Whether this process may receive traffic."""
+    return not app.config['MODEL_WARMUP'] or _warm.is_set()
+
+
+def status():
+    return {'pid': os.getpid(), 'warm': _warm.is_set(),
+            'preload_seconds': _state['preloaded'], 'warmup_seconds': _state['warm'],
+            'error': _state['error'], 'providers': providers.stats()}
+
+
+def init_app(app):
+    """Register the readiness endpoint and preload models if enabled."""
+    app.config.setdefault('MODEL_WARMUP', warmup_enabled())
+
+    @app.route('/readyz')
+    def readyz():
+        ready = is_ready(app)
+        return dict(status(), ready=ready), 200 if ready else 503
+
+    if app.config['MODEL_WARMUP']:
+        preload_assets()
@@ -0,0 +1,8 @@
+"""
+WSGI entry point for gunicorn (see gunicorn.conf.py).
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import create_app
+
+app = create_app()